@@ -14,3 +14,11 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_asgi_application()
+
+from django.conf import settings
+
+if settings.MODEL_WARM_UP:
+    import threading
+    from requirements_classifier.views import REQ_CLASSIFIER
+
+    threading.Thread(target=REQ_CLASSIFIER.warm_up, name="model-warm-up", daemon=True).start()
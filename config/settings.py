@@ -139,3 +139,114 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MEDIA_URL = '/media/'
 
 MEDIA_ROOT = BASE_DIR / 'media'
+
+# Cache of processed PDFs, keyed by the PDF content, prompts and models
+
+RESULT_CACHE_DIR = env('RESULT_CACHE_DIR', default=str(BASE_DIR / 'cache' / 'results'))
+
+RESULT_CACHE_MAX_BYTES = env.int('RESULT_CACHE_MAX_BYTES', default=512 * 1024 * 1024)
+
+# Number of background workers processing PDF jobs
+
+JOB_WORKERS = env.int('JOB_WORKERS', default=1)
+
+# Background jobs save their partial results at most every JOB_PROGRESS_SECONDS and refresh their
+# heartbeat every JOB_HEARTBEAT_SECONDS. Pending or running jobs without a heartbeat for
+# JOB_STALE_SECONDS (e.g. after a restart) are marked as failed
+
+JOB_PROGRESS_SECONDS = env.int('JOB_PROGRESS_SECONDS', default=2)
+JOB_HEARTBEAT_SECONDS = env.int('JOB_HEARTBEAT_SECONDS', default=30)
+JOB_STALE_SECONDS = env.int('JOB_STALE_SECONDS', default=300)
+
+# Load every model when the server starts instead of on the first request
+
+MODEL_WARM_UP = env.bool('MODEL_WARM_UP', default=False)
+
+# How the DistilBERT multitask classifier runs: eager, int8, torchscript or onnx
+
+CLASSIFIER_BACKEND = env('CLASSIFIER_BACKEND', default='eager')
+
+# Per-stage timings and counters, exported at /metrics/ in the Prometheus text format
+
+METRICS_ENABLED = env.bool('METRICS_ENABLED', default=True)
+
+# Number of conversations (page x prompt) generated together when processing a whole PDF.
+# 1 generates them one at a time, reusing the KV cache of the system prompts.
+# Only process_pdf batches: streamed results and background jobs always generate page by page
+
+GENERATION_BATCH_SIZE = env.int('GENERATION_BATCH_SIZE', default=8)
+
+# How requirements are generated for each page: 'separate' (one generation for user and another
+# for system requirements) or 'combined' (a single generation returning both as JSON)
+
+GENERATION_MODE = env('GENERATION_MODE', default='separate')
+
+# Page chunking ahead of generation: pages with fewer than CHUNK_MIN_WORDS words are skipped,
+# consecutive small pages are merged up to CHUNK_MAX_TOKENS and longer pages are split between sentences
+
+PAGE_CHUNKING = env.bool('PAGE_CHUNKING', default=False)
+CHUNK_MAX_TOKENS = env.int('CHUNK_MAX_TOKENS', default=1024)
+CHUNK_MIN_WORDS = env.int('CHUNK_MIN_WORDS', default=20)
+
+# PDF text extraction: worker processes for long PDFs (1 extracts in the web process)
+# and how many extracted PDFs are kept in memory
+
+PDF_EXTRACT_WORKERS = env.int('PDF_EXTRACT_WORKERS', default=1)
+PDF_TEXT_CACHE_SIZE = env.int('PDF_TEXT_CACHE_SIZE', default=16)
+
+# Saving requirements: rows per bulk insert, and whether re-saving a document appends new rows
+# ('append') or updates the requirements already saved with the same page and text ('upsert')
+
+REQUIREMENTS_SAVE_BATCH_SIZE = env.int('REQUIREMENTS_SAVE_BATCH_SIZE', default=500)
+REQUIREMENTS_SAVE_MODE = env('REQUIREMENTS_SAVE_MODE', default='append')
+
+# How requirements are marked in the highlighted PDF: 'rect' (a translucent filled box over each match)
+# or 'highlight' (one text highlight per sentence: fewer annotations, faster to write, but a different look)
+
+HIGHLIGHT_STYLE = env('HIGHLIGHT_STYLE', default='rect')
+
+# Rows read from the database per query (and per Parquet row group) when streaming exports
+
+EXPORT_CHUNK_SIZE = env.int('EXPORT_CHUNK_SIZE', default=2000)
+
+# Address of the inference server holding the models (http://127.0.0.1:8765 or unix:///path/to/socket),
+# started with 'manage.py run_inference_server'. Empty loads the models in every web process.
+# The models it runs (which key the result cache) are checked again every INFERENCE_SERVER_IDENTITY_TTL
+# seconds, and after any failed call
+
+INFERENCE_SERVER = env('INFERENCE_SERVER', default='')
+INFERENCE_SERVER_TIMEOUT = env.int('INFERENCE_SERVER_TIMEOUT', default=600)
+INFERENCE_SERVER_IDENTITY_TTL = env.int('INFERENCE_SERVER_IDENTITY_TTL', default=60)
+
+# Micro-batching of concurrent classification and embedding calls: a call waits up to MICRO_BATCH_WAIT_MS
+# for others to share its forward pass, up to MICRO_BATCH_SIZE sentences (0 ms runs every call on its own)
+
+MICRO_BATCH_SIZE = env.int('MICRO_BATCH_SIZE', default=32)
+MICRO_BATCH_WAIT_MS = env.int('MICRO_BATCH_WAIT_MS', default=5)
+
+# Threads running the model work of the async views (process_pdf, classify_manual_requirement),
+# and how many calls may be queued or running before new ones are answered with 503
+
+MODEL_EXECUTOR_WORKERS = env.int('MODEL_EXECUTOR_WORKERS', default=4)
+MODEL_EXECUTOR_MAX_PENDING = env.int('MODEL_EXECUTOR_MAX_PENDING', default=32)
+
+# Uploaded PDFs, stored once per content: uploads over UPLOAD_MAX_BYTES are refused, files unused for
+# UPLOAD_TTL_SECONDS are removed, and so are the least recently used ones past UPLOAD_STORE_MAX_BYTES
+
+UPLOAD_DIR = env('UPLOAD_DIR', default=str(BASE_DIR / 'cache' / 'uploads'))
+UPLOAD_MAX_BYTES = env.int('UPLOAD_MAX_BYTES', default=100 * 1024 * 1024)
+UPLOAD_TTL_SECONDS = env.int('UPLOAD_TTL_SECONDS', default=24 * 60 * 60)
+UPLOAD_STORE_MAX_BYTES = env.int('UPLOAD_STORE_MAX_BYTES', default=2 * 1024 * 1024 * 1024)
+
+# How Phi-4 is loaded: auto (fp16 on GPU, bf16 on CPU), fp16, bf16, fp32, int8 (quantized, CPU, but loaded
+# in fp32 first, so it peaks at the fp32 size while loading) or int4 (requires torchao).
+# Compare them with 'manage.py compare_phi4_profiles'
+
+PHI4_PROFILE = env('PHI4_PROFILE', default='auto')
+
+# The upload page runs PDFs as background jobs and polls them. With STREAM_RESULTS it reads the NDJSON
+# stream instead (under ASGI only). While a page is generated, the stream sends a heartbeat line every
+# STREAM_HEARTBEAT_SECONDS so proxies don't close the idle connection (0 disables it)
+
+STREAM_RESULTS = env.bool('STREAM_RESULTS', default=False)
+STREAM_HEARTBEAT_SECONDS = env.int('STREAM_HEARTBEAT_SECONDS', default=15)
@@ -14,3 +14,11 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings
+
+if settings.MODEL_WARM_UP:
+    import threading
+    from requirements_classifier.views import REQ_CLASSIFIER
+
+    threading.Thread(target=REQ_CLASSIFIER.warm_up, name="model-warm-up", daemon=True).start()
@@ -1,6 +1,7 @@
 from django.contrib import admin
-from requirements_classifier.models import Requirements, Documents
+from requirements_classifier.models import Requirements, Documents, ProcessingJobs
 # Register your models here.
 
 admin.site.register(Documents)
 admin.site.register(Requirements)
+admin.site.register(ProcessingJobs)
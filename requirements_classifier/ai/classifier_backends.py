@@ -0,0 +1,202 @@
+import os
+import time
+import torch
+import torch.nn as nn
+
+BACKENDS = ("eager", "int8", "torchscript", "onnx")
+
+# Requirements used to check and benchmark the backends when no sentences are given
+SAMPLE_SENTENCES = [
+    "The system shall encrypt all stored passwords",
+    "As a manager, I want to export monthly reports for auditing purposes",
+    "The application must respond to search queries within two seconds",
+    "The system shall be available 99.9% of the time during business hours",
+    "As a student, I want to see my grades for tracking my progress",
+    "The interface shall follow the corporate color palette",
+    "The system must run on Windows and Linux servers",
+    "The platform shall support up to ten thousand concurrent users",
+    "As an administrator, I want to reset user passwords for restoring access",
+    "The system shall keep working if one database replica fails",
+    "The software must comply with the GDPR",
+    "The source code shall be documented for future maintenance",
+    "The system shall log every failed login attempt",
+    "As a customer, I want to pay with a credit card for finishing my order quickly",
+    "The reports module shall generate PDF files",
+    "The system must allow new users to complete registration in under five minutes",
+]
+
+
+class _LogitsOnly(nn.Module):
+    """
+    Wraps BertForMultiTask so it returns only the (logits_bin, logits_cat) tensors,
+    which is what tracing and ONNX export need.
+    """
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        out = self.model(input_ids=input_ids, attention_mask=attention_mask)
+        return out["logits_bin"], out["logits_cat"]
+
+
+class TorchBackend:
+    """
+    Runs a torch module (eager, int8 quantized or TorchScript) and returns the multitask logits,
+    like calling BertForMultiTask directly.
+    """
+
+    def __init__(self, module, device, name):
+        self.module = module
+        self.device = torch.device(device)
+        self.name = name
+
+    def __call__(self, input_ids, attention_mask):
+        logits_bin, logits_cat = self.module(input_ids, attention_mask)
+        return {"loss": None, "logits_bin": logits_bin, "logits_cat": logits_cat}
+
+
+class OnnxBackend:
+    """
+    Runs the exported ONNX graph with onnxruntime on CPU.
+    """
+
+    def __init__(self, onnx_path, name="onnx"):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise RuntimeError("The 'onnx' classifier backend requires the onnxruntime package")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self.device = torch.device("cpu")
+        self.name = name
+
+    def __call__(self, input_ids, attention_mask):
+        logits_bin, logits_cat = self.session.run(
+            ["logits_bin", "logits_cat"],
+            {"input_ids": input_ids.cpu().numpy(), "attention_mask": attention_mask.cpu().numpy()}
+        )
+        return {"loss": None, "logits_bin": torch.from_numpy(logits_bin), "logits_cat": torch.from_numpy(logits_cat)}
+
+
+def build_backend(model, backend, bin_path, device):
+    """
+    Wraps a loaded BertForMultiTask (in eval mode) into the requested inference backend.
+    Every backend except 'eager' runs on CPU.
+    """
+    if backend == "eager":
+        return TorchBackend(_LogitsOnly(model).to(device), device, backend)
+
+    model = model.to("cpu")
+
+    if backend == "int8":
+        quantized = torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+        return TorchBackend(_LogitsOnly(quantized), "cpu", backend)
+
+    if backend == "torchscript":
+        example = (torch.ones((2, 16), dtype=torch.long), torch.ones((2, 16), dtype=torch.long))
+        with torch.no_grad():
+            traced = torch.jit.trace(_LogitsOnly(model).eval(), example, check_trace=False)
+        return TorchBackend(torch.jit.freeze(traced), "cpu", backend)
+
+    if backend == "onnx":
+        onnx_path = os.path.splitext(bin_path)[0] + ".onnx"
+        if not os.path.exists(onnx_path) or os.path.getmtime(onnx_path) < os.path.getmtime(bin_path):
+            export_onnx(model, onnx_path)
+        return OnnxBackend(onnx_path)
+
+    raise ValueError(f"Unknown classifier backend '{backend}'. Expected one of: {', '.join(BACKENDS)}")
+
+
+def export_onnx(model, onnx_path):
+    """
+    Exports the multitask model to ONNX with dynamic batch and sequence axes.
+    """
+    example = (torch.ones((2, 16), dtype=torch.long), torch.ones((2, 16), dtype=torch.long))
+    dynamic_axes = {
+        "input_ids": {0: "batch", 1: "sequence"},
+        "attention_mask": {0: "batch", 1: "sequence"},
+        "logits_bin": {0: "batch"},
+        "logits_cat": {0: "batch"},
+    }
+    tmp_path = onnx_path + ".tmp"
+    with torch.no_grad():
+        torch.onnx.export(
+            _LogitsOnly(model).eval(),
+            example,
+            tmp_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["logits_bin", "logits_cat"],
+            dynamic_axes=dynamic_axes,
+            opset_version=17,
+            dynamo=False
+        )
+    os.replace(tmp_path, onnx_path)
+
+
+def check_parity(tokenizer, reference, candidate, sentences, atol=5e-2):
+    """
+    Compares the logits of 'candidate' against 'reference' (usually the eager model)
+    on the same sentences, and the labels both would pick.
+    """
+    encodings = tokenizer(list(sentences), truncation=True, padding=True, max_length=256, return_tensors="pt")
+
+    with torch.no_grad():
+        expected = reference(
+            input_ids=encodings["input_ids"].to(reference.device),
+            attention_mask=encodings["attention_mask"].to(reference.device)
+        )
+        actual = candidate(
+            input_ids=encodings["input_ids"].to(candidate.device),
+            attention_mask=encodings["attention_mask"].to(candidate.device)
+        )
+
+    report = {}
+    for key in ["logits_bin", "logits_cat"]:
+        expected_logits = expected[key].float().cpu()
+        actual_logits = actual[key].float().cpu()
+        report[f"max_abs_diff_{key}"] = round((expected_logits - actual_logits).abs().max().item(), 6)
+        report[f"label_agreement_{key}"] = round(
+            (expected_logits.argmax(dim=1) == actual_logits.argmax(dim=1)).float().mean().item(), 4
+        )
+
+    report["passed"] = report["max_abs_diff_logits_bin"] <= atol and report["max_abs_diff_logits_cat"] <= atol
+    return report
+
+
+def benchmark(tokenizer, model, sentences, batch_size=32, repeats=3):
+    """
+    Measures how many sentences per second 'model' classifies, tokenization included.
+    """
+    sentences = list(sentences)
+
+    def run_once():
+        for start in range(0, len(sentences), batch_size):
+            encodings = tokenizer(
+                sentences[start:start + batch_size],
+                truncation=True,
+                padding=True,
+                max_length=256,
+                return_tensors="pt"
+            )
+            with torch.no_grad():
+                model(
+                    input_ids=encodings["input_ids"].to(model.device),
+                    attention_mask=encodings["attention_mask"].to(model.device)
+                )
+
+    run_once()
+
+    started = time.perf_counter()
+    for _ in range(repeats):
+        run_once()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "sentences": len(sentences) * repeats,
+        "seconds": round(elapsed, 4),
+        "sentences_per_sec": round(len(sentences) * repeats / elapsed, 2) if elapsed else None
+    }
@@ -0,0 +1,176 @@
+import os
+import sys
+import time
+import torch
+import torch.nn as nn
+from transformers import AutoModelForCausalLM
+
+# How Phi-4 is loaded:
+# - fp16: half precision, the original profile, meant for GPUs.
+# - bf16: bfloat16, half the memory of fp32 with CPU matmul kernels that fp16 lacks.
+# - fp32: full precision, for CPUs without bf16 support.
+# - int8: weights quantized to int8 (dynamic quantization of the linear layers, in place), on CPU.
+#   The fp32 weights are loaded first, so while loading it still peaks at the fp32 size (about 15 GB
+#   for Phi-4-mini); only afterwards does it hold about a quarter of that.
+# - int4: int4 weight-only quantization with torchao (loaded in bf16 first).
+# - auto: fp16 on GPU, bf16 on CPU.
+# Every profile loads the safetensors weights memory-mapped, with low_cpu_mem_usage, so loading
+# doesn't make an extra copy of the weights in the precision they are loaded in.
+PROFILES = ("auto", "fp16", "bf16", "fp32", "int8", "int4")
+
+_DTYPES = {"fp16": torch.float16, "bf16": torch.bfloat16, "fp32": torch.float32}
+
+# What to keep in mind when reading the report of each profile
+PROFILE_NOTES = {
+    "int8": "Loads the fp32 weights before quantizing them: load_peak_rss_mb is about the fp32 size, "
+            "rss_after_load_mb is what it holds once loaded.",
+    "int4": "Loads the bf16 weights before quantizing them: load_peak_rss_mb is about the bf16 size."
+}
+
+# Page used to measure generation speed when no text is given
+SAMPLE_PAGE = (
+    "The library system allows members to search the catalogue by title, author or subject. "
+    "Members can reserve books that are on loan and are notified by e-mail when they are returned. "
+    "Librarians register new books, update their location and remove damaged copies. "
+    "The system must keep the loan history of each member for five years and must be available "
+    "during the opening hours of every branch. Searches should answer in less than two seconds."
+)
+
+
+def resolve_profile(profile, device):
+    """
+    Returns the concrete profile that 'auto' stands for on 'device', or 'profile' itself.
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown Phi-4 profile '{profile}'. Expected one of: {', '.join(PROFILES)}")
+    if profile == "auto":
+        return "fp16" if device == "cuda" else "bf16"
+    return profile
+
+
+def load_generator_model(model_path, profile, device):
+    """
+    Loads the causal LM at 'model_path' with the given profile.
+    Returns (model, device it runs on): quantized profiles run on CPU.
+    """
+    profile = resolve_profile(profile, device)
+
+    if profile in _DTYPES:
+        model = _from_pretrained(model_path, _DTYPES[profile])
+        return model.to(device), device
+
+    if profile == "int8":
+        model = _from_pretrained(model_path, torch.float32)
+        # In place: the default deep-copies the model, doubling the fp32 peak
+        return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8, inplace=True), "cpu"
+
+    if profile == "int4":
+        try:
+            from torchao.quantization import quantize_
+        except ImportError:
+            raise RuntimeError("The 'int4' Phi-4 profile requires the torchao package")
+        try:
+            from torchao.quantization import Int4WeightOnlyConfig
+            config = Int4WeightOnlyConfig(group_size=128)
+        except ImportError:
+            from torchao.quantization import int4_weight_only
+            config = int4_weight_only(group_size=128)
+
+        model = _from_pretrained(model_path, torch.bfloat16).to(device)
+        quantize_(model, config)
+        return model, device
+
+
+def _from_pretrained(model_path, dtype):
+    return AutoModelForCausalLM.from_pretrained(
+        model_path,
+        torch_dtype=dtype,
+        low_cpu_mem_usage=True,
+        trust_remote_code=True
+    ).eval()
+
+
+def profile_report(model_path, profile, texts, prompt, max_new_tokens=64, repeats=1):
+    """
+    Loads the generator with 'profile' and measures its load time, resident memory and generation
+    speed on 'texts'. Meant to run in a fresh process (see the compare_phi4_profiles command),
+    so the memory of one profile doesn't count against the next.
+    """
+    from .networks import _chat_input_ids, device, load_phi4_model
+
+    started = time.perf_counter()
+    try:
+        phi_pipeline = load_phi4_model(model_path, profile)
+    except Exception as e:
+        return {"profile": profile, "error": str(e)}
+    load_seconds = time.perf_counter() - started
+    load_rss_mb = current_rss_mb()
+    load_peak_rss_mb = _peak_rss_mb()
+
+    tokenizer = phi_pipeline.tokenizer
+    model = phi_pipeline.model
+    pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+
+    def generate(text):
+        input_ids = _chat_input_ids(
+            tokenizer,
+            [{"role": "system", "content": prompt}, {"role": "user", "content": text}],
+            add_generation_prompt=True
+        ).to(model.device)
+        with torch.no_grad():
+            output_ids = model.generate(
+                input_ids=input_ids,
+                attention_mask=torch.ones_like(input_ids),
+                pad_token_id=pad_token_id,
+                max_new_tokens=max_new_tokens,
+                do_sample=False
+            )
+        return output_ids[0, input_ids.shape[1]:]
+
+    # Untimed run, so lazy initialization doesn't count against the first text
+    generate(texts[0])
+
+    tokens = 0
+    outputs = []
+    started = time.perf_counter()
+    for _ in range(repeats):
+        outputs = [generate(text) for text in texts]
+        tokens += sum(len(output) for output in outputs)
+    generation_seconds = time.perf_counter() - started
+
+    return {
+        "profile": resolve_profile(profile, device),
+        "device": str(model.device),
+        "load_seconds": round(load_seconds, 3),
+        "load_peak_rss_mb": load_peak_rss_mb,
+        "rss_after_load_mb": load_rss_mb,
+        "rss_after_generation_mb": current_rss_mb(),
+        "peak_rss_mb": _peak_rss_mb(),
+        "generated_tokens": tokens,
+        "generation_seconds": round(generation_seconds, 3),
+        "tokens_per_sec": round(tokens / generation_seconds, 2) if generation_seconds else None,
+        "sample_output": tokenizer.decode(outputs[0], skip_special_tokens=True),
+        "notes": PROFILE_NOTES.get(resolve_profile(profile, device), "")
+    }
+
+
+def current_rss_mb():
+    """
+    Resident memory of this process right now, in MB (None where it can't be measured).
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            resident_pages = int(statm.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 2)
+
+
+def _peak_rss_mb():
+    # Like benchmark.pipeline.peak_rss_mb, which can't be imported before Django is set up
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 2)
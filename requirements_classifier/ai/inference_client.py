@@ -0,0 +1,172 @@
+import base64
+import http.client
+import json
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+from requirements_classifier.services.metrics import METRICS
+
+# Client of the inference server (see inference_server.py). It only needs the standard
+# library, so web workers using it never import torch or load model weights, apart
+# from the tensors handed to DocumentIndex.
+
+
+class InferenceServerError(RuntimeError):
+    pass
+
+
+def parse_address(address):
+    """
+    Splits an inference server address into ("unix", socket_path) or ("http", (host, port)).
+    Addresses are either http://host:port (localhost) or unix:///path/to/socket.
+    """
+    parts = urlsplit(address)
+    if parts.scheme == "unix":
+        path = parts.path or parts.netloc
+        if not path:
+            raise ValueError(f"Missing socket path in inference server address '{address}'")
+        return "unix", path
+    if parts.scheme == "http":
+        if not parts.hostname:
+            raise ValueError(f"Missing host in inference server address '{address}'")
+        return "http", (parts.hostname, parts.port or 80)
+    raise ValueError(f"Unsupported inference server address '{address}'. Expected http://host:port or unix:///path")
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout):
+        super().__init__("localhost", timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+class InferenceClient:
+    """
+    Calls the models held by the inference server.
+    - generate(conversations) returns the generated text of each (text, prompt) pair.
+    - classify(sentences) returns the multitask classification of each sentence.
+    - embed(sentences) returns their L2-normalized embeddings as a float32 tensor.
+    - model_identity() describes the models the server runs. It is asked to the server at most
+      every 'identity_ttl' seconds, and again after any failed call (the server may have been
+      restarted with other models).
+    """
+
+    def __init__(self, address, timeout=600, identity_ttl=60):
+        self.address = address
+        self.timeout = timeout
+        self.identity_ttl = identity_ttl
+        self._kind, self._target = parse_address(address)
+
+        self._identity = None
+        self._identity_expires = 0
+        self._identity_lock = threading.Lock()
+
+    def health(self):
+        return self._request("GET", "/health")
+
+    def model_identity(self):
+        """
+        The models the server runs, which key the cached results of the clients.
+        """
+        with self._identity_lock:
+            if self._identity is not None and time.monotonic() < self._identity_expires:
+                return self._identity
+
+        identity = self.health()["model_identity"]
+        with self._identity_lock:
+            self._identity = identity
+            self._identity_expires = time.monotonic() + self.identity_ttl
+        return identity
+
+    def forget_identity(self):
+        with self._identity_lock:
+            self._identity = None
+
+    def generate(self, conversations, batched=True):
+        payload = {
+            "conversations": [{"text": text, "prompt": prompt} for text, prompt in conversations],
+            "batched": batched
+        }
+        return self._request("POST", "/generate", payload)["generated"]
+
+    def classify(self, sentences):
+        return self._request("POST", "/classify", {"sentences": list(sentences)})["results"]
+
+    def embed(self, sentences):
+        import torch
+
+        response = self._request("POST", "/embed", {"sentences": list(sentences)})
+        data = bytearray(base64.b64decode(response["embeddings"]))
+        rows, dim = response["shape"]
+        if not data:
+            return torch.empty((rows, dim), dtype=torch.float32)
+        return torch.frombuffer(data, dtype=torch.float32).reshape(rows, dim)
+
+    def _connection(self):
+        if self._kind == "unix":
+            return _UnixHTTPConnection(self._target, self.timeout)
+        host, port = self._target
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def _request(self, method, path, payload=None):
+        try:
+            return self._send(method, path, payload)
+        except InferenceServerError:
+            self.forget_identity()
+            raise
+
+    def _send(self, method, path, payload=None):
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+
+        connection = self._connection()
+        try:
+            with METRICS.span("inference_request"):
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                data = response.read()
+        except OSError as e:
+            raise InferenceServerError(f"Inference server at {self.address} is unreachable: {e}")
+        finally:
+            connection.close()
+
+        METRICS.incr("inference_requests")
+        try:
+            content = json.loads(data)
+        except ValueError:
+            raise InferenceServerError(f"Invalid response from the inference server (HTTP {response.status})")
+        if response.status != 200:
+            raise InferenceServerError(content.get("error", f"Inference server error (HTTP {response.status})"))
+        return content
+
+
+class RemoteEmbeddingModel:
+    """
+    Stands in for the sentence-transformers model on top of InferenceClient.embed,
+    with the part of its interface used by the classifier and DocumentIndex.
+    """
+
+    def __init__(self, client):
+        import torch
+
+        self.client = client
+        self.device = torch.device("cpu")
+        self._dimension = None
+
+    def get_sentence_embedding_dimension(self):
+        if self._dimension is None:
+            self._dimension = self.client.embed([]).shape[1]
+        return self._dimension
+
+    def encode(self, sentences, convert_to_tensor=True, normalize_embeddings=True):
+        # The server always returns normalized embeddings, which is what the classifier asks for
+        single = isinstance(sentences, str)
+        embeddings = self.client.embed([sentences] if single else sentences)
+        if not convert_to_tensor:
+            embeddings = embeddings.numpy()
+        return embeddings[0] if single else embeddings
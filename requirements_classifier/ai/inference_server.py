@@ -0,0 +1,152 @@
+import base64
+import json
+import os
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from requirements_classifier.services.metrics import METRICS
+from .inference_client import parse_address
+
+# Standalone process holding the models (Phi-4, the multitask DistilBERT and MiniLM), so web
+# workers send it their inference instead of each loading a copy of the weights.
+#
+# Requests and responses are JSON:
+# - POST /generate  {"conversations": [{"text": ..., "prompt": ...}], "batched": true}
+#                   -> {"generated": ["...", ...]}, one text per conversation
+# - POST /classify  {"sentences": ["...", ...]}
+#                   -> {"results": [{"requirement", "confidence", "type"}, ...]}
+# - POST /embed     {"sentences": ["...", ...]}
+#                   -> {"embeddings": base64 of float32 little-endian rows, "shape": [rows, dim]}
+# - GET /health     -> {"status": "ok", "models": [names of the loaded models],
+#                       "model_identity": {the models served, see RequirementsClassifier.model_identity}}
+# - GET /metrics    -> timings and counters of the server, in the Prometheus text format
+# Errors are answered as {"error": "..."} with status 400 (bad request) or 500.
+
+
+class InferenceRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, self.server.inference.health())
+        elif self.path == "/metrics":
+            self._send(200, METRICS.render_prometheus().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8")
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        handlers = {
+            "/generate": self.server.inference.generate,
+            "/classify": self.server.inference.classify,
+            "/embed": self.server.inference.embed
+        }
+        handler = handlers.get(self.path)
+        if handler is None:
+            self._send_json(404, {"error": "Not found"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length))
+            if not isinstance(payload, dict):
+                raise ValueError("The request body must be a JSON object")
+            response = handler(payload)
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+
+        self._send_json(200, response)
+
+    def address_string(self):
+        # Unix socket clients have no (host, port) address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, content):
+        self._send(status, json.dumps(content).encode("utf-8"), "application/json")
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class InferenceService:
+    """
+    Runs the requests of the inference server on a local RequirementsClassifier.
+    Generations run one at a time, so concurrent clients don't stack their batches in GPU memory.
+    """
+
+    def __init__(self, classifier):
+        self.classifier = classifier
+        self._generation_lock = threading.Lock()
+
+    def health(self):
+        registry = self.classifier.registry
+        return {
+            "status": "ok",
+            "models": [name for name in self.classifier.model_keys() if registry.is_loaded(name)],
+            "model_identity": self.classifier.model_identity()
+        }
+
+    def generate(self, payload):
+        conversations = []
+        for conversation in _list_field(payload, "conversations"):
+            if not isinstance(conversation, dict) or "text" not in conversation or "prompt" not in conversation:
+                raise ValueError("Every conversation must have a 'text' and a 'prompt'")
+            conversations.append((conversation["text"], conversation["prompt"]))
+
+        with self._generation_lock, METRICS.span("generation"):
+            generated = self.classifier.generate_conversations(conversations, batched=bool(payload.get("batched", True)))
+        return {"generated": generated}
+
+    def classify(self, payload):
+        return {"results": self.classifier.classify_batch(_list_field(payload, "sentences"))}
+
+    def embed(self, payload):
+        sentences = _list_field(payload, "sentences")
+        if sentences:
+            embeddings = self.classifier.encode(sentences).float().cpu().numpy()
+            shape = list(embeddings.shape)
+            data = embeddings.astype("<f4").tobytes()
+        else:
+            shape = [0, self.classifier.embedding_model.get_sentence_embedding_dimension()]
+            data = b""
+        return {"embeddings": base64.b64encode(data).decode("ascii"), "shape": shape}
+
+
+def _list_field(payload, name):
+    value = payload.get(name)
+    if not isinstance(value, list):
+        raise ValueError(f"'{name}' must be a list")
+    return value
+
+
+class _UnixInferenceServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(classifier, address, verbose=False):
+    """
+    Returns the inference server of 'classifier', listening on 'address'
+    (http://host:port or unix:///path/to/socket). Call serve_forever() on it to run it.
+    """
+    kind, target = parse_address(address)
+    if kind == "unix":
+        if os.path.exists(target):
+            os.remove(target)
+        server = _UnixInferenceServer(target, InferenceRequestHandler)
+    else:
+        server = ThreadingHTTPServer(target, InferenceRequestHandler)
+
+    server.inference = InferenceService(classifier)
+    server.verbose = verbose
+    return server
@@ -1,12 +1,28 @@
+import copy
+import hashlib
+import json
+import re
+import threading
 import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
+from collections import OrderedDict
+from transformers import AutoTokenizer, DynamicCache, pipeline
 from requirements_classifier.ai.classifier import BertForMultiTask
+from requirements_classifier.ai.classifier_backends import build_backend
+from requirements_classifier.ai.generator_profiles import load_generator_model
+from requirements_classifier.services.metrics import METRICS
 
 device = "cuda" if torch.cuda.is_available() else "cpu"
 
-def load_multitask_classifier(model_name, bin_path, tokenizer_path):
+GENERATION_PARAMS = {
+    "max_new_tokens": 500,
+    "do_sample": False
+}
+
+def load_multitask_classifier(model_name, bin_path, tokenizer_path, backend="eager"):
     """
     Loads the multitask learning model, in this version DistilBERT.
+    'backend' selects how it runs (eager, int8, torchscript or onnx); every backend is called
+    like the model itself and returns the same logits_bin/logits_cat dict.
     """
     tokenizer = AutoTokenizer.from_pretrained(tokenizer_path)
 
@@ -18,42 +34,278 @@ def load_multitask_classifier(model_name, bin_path, tokenizer_path):
 
     state_dict = torch.load(bin_path, map_location=torch.device("cuda" if torch.cuda.is_available() else "cpu"))
     model.load_state_dict(state_dict)
-    model.eval().to(device)
+    model.eval()
 
-    return tokenizer, model
+    return tokenizer, build_backend(model, backend, bin_path, device)
 
-def load_phi4_model(model_Path):
+def load_phi4_model(model_Path, profile="auto"):
     """
     Loads the phi-4-mini-instruct (Microsoft) from HuggingFace Transformers library.
+    'profile' selects the precision or quantization it runs with (see generator_profiles.PROFILES).
     """
     tokenizer = AutoTokenizer.from_pretrained(model_Path)
-    model = AutoModelForCausalLM.from_pretrained(
-        model_Path,
-        torch_dtype=torch.float16,
-        trust_remote_code= True
-    ).to(device)
+    model, model_device = load_generator_model(model_Path, profile, device)
 
     text_gen = pipeline(
         "text-generation",
         model=model,
         tokenizer=tokenizer,
-        device=0 if device == "cuda" else -1 
+        device=0 if model_device == "cuda" else -1 
     )
 
     return text_gen
 
-def generate_requirements(phi_pipeline, text, prompt):
+class GenerationCache:
+    """
+    In-memory LRU memo of generated texts.
+    Keys are a hash of (model, prompt, page text, generation params), so repeated
+    boilerplate pages are only generated once.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def make_key(self, model_id, prompt, text, params):
+        payload = json.dumps([model_id, prompt, text, params], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+class PromptPrefixCache:
+    """
+    Keeps the precomputed KV cache of each fixed system prompt, so generating for a new
+    page only prefills the page-specific tokens.
+    """
+
+    def __init__(self, phi_pipeline):
+        self.phi_pipeline = phi_pipeline
+        self._prefixes = {}
+        self._lock = threading.Lock()
+
+    def get(self, prompt):
+        """
+        Returns (prefix_ids, past_key_values) for the system turn of 'prompt'.
+        The returned cache must be copied before being handed to generate().
+        """
+        with self._lock:
+            if prompt not in self._prefixes:
+                self._prefixes[prompt] = self._build(prompt)
+            return self._prefixes[prompt]
+
+    def _build(self, prompt):
+        tokenizer = self.phi_pipeline.tokenizer
+        model = self.phi_pipeline.model
+
+        prefix_ids = _chat_input_ids(
+            tokenizer,
+            [{"role": "system", "content": prompt}],
+            add_generation_prompt=False
+        ).to(model.device)
+
+        with torch.no_grad():
+            out = model(input_ids=prefix_ids, past_key_values=DynamicCache(), use_cache=True)
+
+        return prefix_ids, out.past_key_values
+
+def generate_requirements(phi_pipeline, text, prompt, generation_cache=None, prefix_cache=None):
     """
     Uses Phi-4-mini-instruct to generate requirements.
     Always returns a string (content of the assistant).
+    - generation_cache: optional GenerationCache to memoize the outputs.
+    - prefix_cache: optional PromptPrefixCache to reuse the KV cache of the system prompt.
+    """
+    if generation_cache is not None:
+        model_id = getattr(phi_pipeline.model, "name_or_path", "")
+        key = generation_cache.make_key(model_id, prompt, text, GENERATION_PARAMS)
+        cached = generation_cache.get(key)
+        if cached is not None:
+            METRICS.incr("generation_cache_hits")
+            return cached
+
+    generated = None
+    if prefix_cache is not None:
+        generated = _generate_with_prefix(phi_pipeline, text, prompt, prefix_cache)
+    if generated is None:
+        generated = _generate_with_pipeline(phi_pipeline, text, prompt)
+
+    if METRICS.enabled and getattr(phi_pipeline, "tokenizer", None) is not None:
+        METRICS.incr("tokens_generated", len(phi_pipeline.tokenizer.encode(generated, add_special_tokens=False)))
+
+    if generation_cache is not None:
+        generation_cache.set(key, generated)
+
+    return generated
+
+def generate_requirements_batch(phi_pipeline, conversations, generation_cache=None, batch_size=8):
     """
+    Batched version of generate_requirements, for many (text, prompt) conversations at once.
+    Returns one string per conversation, in the same order.
+    - Conversations are sorted by length and left-padded per batch, so each batch only
+      pads up to its own longest prompt.
+    - Decoding is greedy: in fp32 every output matches the sequential path (see GenerationBatchTests).
+      In fp16/bf16 the padded batch rounds differently, so where two tokens are almost tied an output
+      may pick the other one and diverge from the sequential text from there on.
+    """
+    generated = [None] * len(conversations)
+    keys = [None] * len(conversations)
+    pending = []
+
+    model_id = getattr(phi_pipeline.model, "name_or_path", "")
+    for i, (text, prompt) in enumerate(conversations):
+        if generation_cache is not None:
+            keys[i] = generation_cache.make_key(model_id, prompt, text, GENERATION_PARAMS)
+            generated[i] = generation_cache.get(keys[i])
+            if generated[i] is not None:
+                METRICS.incr("generation_cache_hits")
+                continue
+        pending.append(i)
+
+    if getattr(phi_pipeline, "tokenizer", None) is None or batch_size <= 1:
+        # pipelines without a tokenizer (benchmark stubs) or batch_size 1: one conversation at a time
+        for i in pending:
+            text, prompt = conversations[i]
+            generated[i] = generate_requirements(phi_pipeline, text, prompt, generation_cache=generation_cache)
+        return generated
+
+    tokenizer = phi_pipeline.tokenizer
+    input_ids = {
+        i: _chat_input_ids(
+            tokenizer,
+            [{"role": "system", "content": conversations[i][1]}, {"role": "user", "content": conversations[i][0]}],
+            add_generation_prompt=True
+        )[0]
+        for i in pending
+    }
+    pending.sort(key=lambda i: len(input_ids[i]))
+
+    for start in range(0, len(pending), batch_size):
+        batch_idx = pending[start:start + batch_size]
+        outputs = _generate_left_padded(phi_pipeline, [input_ids[i] for i in batch_idx])
+
+        for i, output in zip(batch_idx, outputs):
+            generated[i] = output
+            if generation_cache is not None:
+                generation_cache.set(keys[i], output)
+
+    if METRICS.enabled:
+        METRICS.incr("tokens_generated", sum(
+            len(tokenizer.encode(generated[i], add_special_tokens=False)) for i in pending
+        ))
+
+    return generated
+
+def _generate_left_padded(phi_pipeline, sequences):
+    """
+    Generates for several tokenized prompts in one call, padding them on the left
+    so every sequence ends right before its first generated token.
+    """
+    tokenizer = phi_pipeline.tokenizer
+    model = phi_pipeline.model
+    pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+
+    longest = max(len(ids) for ids in sequences)
+    input_ids = torch.full((len(sequences), longest), pad_token_id, dtype=torch.long)
+    attention_mask = torch.zeros((len(sequences), longest), dtype=torch.long)
+    for row, ids in enumerate(sequences):
+        input_ids[row, longest - len(ids):] = ids
+        attention_mask[row, longest - len(ids):] = 1
+
+    with torch.no_grad():
+        output_ids = model.generate(
+            input_ids=input_ids.to(model.device),
+            attention_mask=attention_mask.to(model.device),
+            pad_token_id=pad_token_id,
+            **GENERATION_PARAMS
+        )
+
+    return [tokenizer.decode(row[longest:], skip_special_tokens=True) for row in output_ids]
+
+def parse_combined_requirements(generated):
+    """
+    Splits the output of the combined prompt into (user_text, system_text), shaped like the
+    outputs of the user and system prompts: requirements ending with a dot, separated by spaces.
+    Expects a JSON object with "user_requirements" and "system_requirements" lists; when the
+    model doesn't produce valid JSON, sentences starting with "As a" go to the user text and
+    the others to the system text.
+    """
+    start, end = generated.find("{"), generated.rfind("}")
+    try:
+        sections = json.loads(generated[start:end + 1]) if start != -1 and end > start else None
+    except ValueError:
+        sections = None
+
+    if isinstance(sections, dict):
+        user_reqs = sections.get("user_requirements") or []
+        system_reqs = sections.get("system_requirements") or []
+        if isinstance(user_reqs, str):
+            user_reqs = [user_reqs]
+        if isinstance(system_reqs, str):
+            system_reqs = [system_reqs]
+    else:
+        sentences = [s.strip(" \t\n-*`\"") for s in re.split(r"\.\s*", generated)]
+        sentences = [s for s in sentences if s]
+        user_reqs = [s for s in sentences if re.match(r"^As a ", s, re.IGNORECASE)]
+        system_reqs = [s for s in sentences if not re.match(r"^As a ", s, re.IGNORECASE)]
+
+    return _join_requirements(user_reqs), _join_requirements(system_reqs)
+
+def _join_requirements(requirements):
+    requirements = [str(req).strip() for req in requirements if str(req).strip()]
+    return " ".join(req if req.endswith(".") else req + "." for req in requirements)
+
+def _generate_with_prefix(phi_pipeline, text, prompt, prefix_cache):
+    """
+    Generates starting from the cached KV of the system prompt.
+    Returns None when the chat template does not tokenize the system turn as a prefix
+    of the full conversation, so the caller can fall back to the pipeline.
+    """
+    tokenizer = phi_pipeline.tokenizer
+    model = phi_pipeline.model
+    prompt_msg = [{"role": "system", "content": prompt}, {"role": "user", "content": text}]
+
+    input_ids = _chat_input_ids(tokenizer, prompt_msg, add_generation_prompt=True).to(model.device)
+
+    prefix_ids, prefix_kv = prefix_cache.get(prompt)
+    prefix_len = prefix_ids.shape[1]
+    if input_ids.shape[1] <= prefix_len or not torch.equal(input_ids[0, :prefix_len], prefix_ids[0]):
+        return None
+
+    with torch.no_grad():
+        output_ids = model.generate(
+            input_ids=input_ids,
+            attention_mask=torch.ones_like(input_ids),
+            past_key_values=copy.deepcopy(prefix_kv),
+            pad_token_id=tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id,
+            **GENERATION_PARAMS
+        )
+
+    return tokenizer.decode(output_ids[0, input_ids.shape[1]:], skip_special_tokens=True)
+
+def _chat_input_ids(tokenizer, messages, add_generation_prompt):
+    chat_text = tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=add_generation_prompt)
+    return tokenizer(chat_text, add_special_tokens=False, return_tensors="pt")["input_ids"]
+
+def _generate_with_pipeline(phi_pipeline, text, prompt):
     prompt_msg = [{"role": "system", "content": prompt}, {"role": "user", "content": text}]
 
     outputs = phi_pipeline(
         prompt_msg,
-        max_new_tokens=500,
-        do_sample=False,
-        temperature=0.0
+        temperature=0.0,
+        **GENERATION_PARAMS
     )
 
     generated = outputs[0].get("generated_text", [])
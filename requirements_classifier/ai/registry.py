@@ -0,0 +1,70 @@
+import gc
+import sys
+import threading
+
+
+class ModelRegistry:
+    """
+    Process-wide registry of lazily loaded models.
+    - Each model is registered under a name with a loader, and only loaded the first time it is requested.
+    - Loaded instances are shared by everything that asks for the same name.
+    - warm_up() and unload() load or release models ahead of time.
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, loader, replace=False):
+        """
+        Registers 'loader' under 'name'. Registering an already known name keeps the first loader,
+        so several users of the same model share one instance, unless 'replace' is set
+        (which also drops the instance already loaded).
+        """
+        with self._lock:
+            if name not in self._loaders or replace:
+                self._loaders[name] = loader
+                self._locks[name] = threading.Lock()
+                self._models.pop(name, None)
+
+    def get(self, name):
+        """
+        Returns the model registered under 'name', loading it if needed.
+        """
+        if name in self._models:
+            return self._models[name]
+        if name not in self._loaders:
+            raise KeyError(f"No model registered as '{name}'")
+
+        with self._locks[name]:
+            if name not in self._models:
+                self._models[name] = self._loaders[name]()
+            return self._models[name]
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def warm_up(self, names=None):
+        """
+        Loads the given models (all registered models by default).
+        """
+        for name in names if names is not None else list(self._loaders):
+            self.get(name)
+
+    def unload(self, names=None):
+        """
+        Drops the given models (all loaded models by default) and releases their memory.
+        """
+        with self._lock:
+            for name in names if names is not None else list(self._models):
+                self._models.pop(name, None)
+
+        gc.collect()
+        torch = sys.modules.get("torch")
+        if torch is not None and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+
+MODEL_REGISTRY = ModelRegistry()
@@ -0,0 +1,101 @@
+import time
+import re
+
+
+def generate_candidates_per_page(classifier, page_texts):
+    """
+    Generates the candidate requirements of every non-empty page with 'classifier'.
+    Returns ({page_number: candidates}, seconds spent generating).
+    """
+    text_pages = [
+        (page_number, page_content)
+        for page_number, page_content in enumerate(page_texts, start=1)
+        if page_content and page_content.strip()
+    ]
+
+    started = time.perf_counter()
+    generations = classifier.generate_pages_requirements([page_content for _, page_content in text_pages])
+    seconds = time.perf_counter() - started
+
+    candidates = {
+        page_number: classifier.extract_candidates(req_texts)
+        for (page_number, _), req_texts in zip(text_pages, generations)
+    }
+    return candidates, seconds
+
+
+def compare_generation_modes(separate, combined, page_texts, similarity_threshold=0.8):
+    """
+    Generates the requirements of 'page_texts' with a 'separate' and a 'combined' mode classifier
+    and compares them page by page:
+    - how many user ("As a ...") and system requirements each mode produced,
+    - how many are exactly the same (case-insensitive),
+    - how many of each mode have a requirement of the other mode with a cosine similarity
+      of at least 'similarity_threshold'.
+    """
+    separate_candidates, separate_seconds = generate_candidates_per_page(separate, page_texts)
+    combined_candidates, combined_seconds = generate_candidates_per_page(combined, page_texts)
+
+    pages = []
+    for page_number in separate_candidates:
+        page = {"page": page_number}
+        page.update(_compare_page(
+            separate,
+            separate_candidates[page_number],
+            combined_candidates[page_number],
+            similarity_threshold
+        ))
+        pages.append(page)
+
+    totals = {
+        key: sum(page[key] for page in pages)
+        for key in ["separate_user", "separate_system", "combined_user", "combined_system",
+                    "exact_overlap", "separate_matched", "combined_matched"]
+    }
+    separate_count = totals["separate_user"] + totals["separate_system"]
+    combined_count = totals["combined_user"] + totals["combined_system"]
+
+    return {
+        "pages": pages,
+        "totals": totals,
+        "summary": {
+            "separate_seconds": round(separate_seconds, 4),
+            "combined_seconds": round(combined_seconds, 4),
+            "speedup": round(separate_seconds / combined_seconds, 2) if combined_seconds else None,
+            "separate_requirements": separate_count,
+            "combined_requirements": combined_count,
+            # share of the requirements of one mode that have a close match in the other
+            "separate_recall": round(totals["separate_matched"] / separate_count, 4) if separate_count else None,
+            "combined_precision": round(totals["combined_matched"] / combined_count, 4) if combined_count else None,
+            "similarity_threshold": similarity_threshold
+        }
+    }
+
+
+def _compare_page(classifier, separate_candidates, combined_candidates, similarity_threshold):
+    separate_user = [c for c in separate_candidates if _is_user_requirement(c)]
+    combined_user = [c for c in combined_candidates if _is_user_requirement(c)]
+
+    exact_overlap = len(
+        {c.strip().lower() for c in separate_candidates} & {c.strip().lower() for c in combined_candidates}
+    )
+
+    separate_matched = combined_matched = 0
+    if separate_candidates and combined_candidates:
+        similarities = classifier.encode(separate_candidates) @ classifier.encode(combined_candidates).T
+        separate_matched = int((similarities.max(dim=1).values >= similarity_threshold).sum().item())
+        combined_matched = int((similarities.max(dim=0).values >= similarity_threshold).sum().item())
+
+    return {
+        "separate_user": len(separate_user),
+        "separate_system": len(separate_candidates) - len(separate_user),
+        "combined_user": len(combined_user),
+        "combined_system": len(combined_candidates) - len(combined_user),
+        "exact_overlap": exact_overlap,
+        "separate_matched": separate_matched,
+        "combined_matched": combined_matched
+    }
+
+
+def _is_user_requirement(sentence):
+    return re.match(r"^As a ", sentence.strip(), re.IGNORECASE) is not None
@@ -0,0 +1,192 @@
+import os
+import platform
+import random
+import sys
+import time
+import fitz
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import transaction
+from requirements_classifier.ai.registry import ModelRegistry
+from requirements_classifier.services.db_services import save_requirements_to_db
+from requirements_classifier.services.requirements_classifier import RequirementsClassifier
+from .stubs import StubClassifier, StubEmbeddingModel, StubGenerator, StubTokenizer
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+STUBBABLE_MODELS = ("phi4", "multitask", "embedding")
+
+_SUBJECTS = ["system", "billing module", "user portal", "report service", "mobile app", "admin console",
+             "search engine", "payment gateway", "audit log", "notification service"]
+_VERBS = ["validates", "stores", "exports", "encrypts", "displays", "schedules", "archives", "synchronizes",
+          "authenticates", "monitors"]
+_OBJECTS = ["invoices", "user profiles", "monthly reports", "access tokens", "order history", "sensor readings",
+            "support tickets", "backup files", "contracts", "audit trails"]
+_QUALIFIERS = ["within two seconds", "before every export", "for all registered users", "on a daily basis",
+               "without manual intervention", "according to the GDPR", "during business hours",
+               "in under five minutes", "using TLS 1.3", "for at least five years"]
+
+
+def make_synthetic_pdf(pdf_path, pages, sentences_per_page=12, seed=0):
+    """
+    Writes a PDF with 'pages' pages of requirement-like prose, always the same for a given seed.
+    """
+    rng = random.Random(seed)
+    doc = fitz.open()
+
+    for _ in range(pages):
+        page = doc.new_page()
+        sentences = [
+            f"The {rng.choice(_SUBJECTS)} {rng.choice(_VERBS)} {rng.choice(_OBJECTS)} {rng.choice(_QUALIFIERS)}."
+            for _ in range(sentences_per_page)
+        ]
+        area = fitz.Rect(50, 60, page.rect.width - 50, page.rect.height - 50)
+        page.insert_textbox(area, " ".join(sentences), fontsize=11, fontname="Times-Roman")
+
+    doc.save(pdf_path)
+    doc.close()
+
+
+def build_classifier(stubs, reference=None, generation_mode="separate"):
+    """
+    Builds a RequirementsClassifier on its own registry, with the models listed in 'stubs'
+    replaced by deterministic stubs. The real models use the paths of 'reference'.
+    """
+    classifier = RequirementsClassifier(
+        phi4_model_path=reference.phi4_model_path if reference else "microsoft/phi-4-mini-instruct",
+        multitask_model_name=reference.multitask_model_name if reference else "distilbert-base-uncased",
+        multitask_bin_path=reference.multitask_bin_path if reference else "",
+        multitask_tokenizer_path=reference.multitask_tokenizer_path if reference else "",
+        classifier_backend=reference.classifier_backend if reference else "eager",
+        phi4_profile=reference.phi4_profile if reference else "auto",
+        reuse_prompt_prefix="phi4" not in stubs,
+        generation_mode=generation_mode,
+        registry=ModelRegistry()
+    )
+
+    if "phi4" in stubs:
+        classifier.override_model("phi4", StubGenerator)
+    if "multitask" in stubs:
+        classifier.override_model("multitask", lambda: (StubTokenizer(), StubClassifier()))
+    if "embedding" in stubs:
+        classifier.override_model("embedding", StubEmbeddingModel)
+
+    return classifier
+
+
+class StageTimer:
+    """
+    Records the latency and throughput of each named stage.
+    """
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name, unit):
+        record = {"unit": unit, "items": 0}
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            seconds = time.perf_counter() - started
+            record["seconds"] = round(seconds, 4)
+            record["throughput"] = round(record["items"] / seconds, 2) if seconds else None
+            self.stages[name] = record
+
+
+def benchmark_pdf(classifier, pdf_path):
+    """
+    Runs every stage of the pipeline on 'pdf_path' and returns their timings.
+    The database writes are rolled back and the highlighted PDF is deleted afterwards.
+    """
+    timer = StageTimer()
+
+    with timer.stage("extract_text", "pages") as record:
+        page_texts = classifier.pdf_utils.extract_text(pdf_path)
+        record["items"] = len(page_texts)
+
+    with timer.stage("generation", "pages") as record:
+        pages = []
+        for page_number, page_content in enumerate(page_texts, start=1):
+            if page_content and page_content.strip():
+                candidates = classifier.extract_candidates(classifier.generate_page_requirements(page_content))
+                pages.append((page_number, page_content, candidates))
+        record["items"] = len(pages)
+
+    sentences = [sentence for _, _, candidates in pages for sentence in candidates]
+    sentence_pages = [page_number for page_number, _, candidates in pages for _ in candidates]
+
+    with timer.stage("classification", "sentences") as record:
+        results = classifier.classify_batch(sentences)
+        record["items"] = len(sentences)
+
+    with timer.stage("similarity", "sentences") as record:
+        document_index = classifier.get_document_index(pdf_path, page_texts)
+        if sentences:
+            req_embeddings = classifier.encode(sentences)
+            best_matches = document_index.best_matches(req_embeddings, pages=sentence_pages)
+        else:
+            best_matches = []
+        record["items"] = len(sentences)
+
+    requirements = []
+    for result, best_match, page_number in zip(results, best_matches, sentence_pages):
+        requirements.append({
+            "text": result["requirement"],
+            "classification_ai": result["type"],
+            "confidence_ai": result["confidence"],
+            "classification_user": "---",
+            "project": f"benchmark-{os.path.basename(pdf_path)}",
+            "original_text": best_match["original_text"],
+            "match_score": best_match["match_score"],
+            "page": page_number,
+        })
+
+    with timer.stage("highlight_pdf", "requirements") as record:
+        grouped_by_page = classifier.pdf_utils.group_requirements_by_page(requirements)
+        highlighted_url = classifier.pdf_utils.highligh_pdf(pdf_path, grouped_by_page)
+        record["items"] = len(requirements)
+
+    highlighted_path = os.path.join(settings.MEDIA_ROOT, "highlighted", os.path.basename(highlighted_url))
+    if os.path.exists(highlighted_path):
+        os.remove(highlighted_path)
+
+    with timer.stage("save_requirements_to_db", "requirements") as record:
+        with transaction.atomic():
+            save_requirements_to_db(requirements, batch_size=settings.REQUIREMENTS_SAVE_BATCH_SIZE)
+            transaction.set_rollback(True)
+        record["items"] = len(requirements)
+
+    return {
+        "stages": timer.stages,
+        "total_seconds": round(sum(stage["seconds"] for stage in timer.stages.values()), 4),
+        "requirements": len(requirements),
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+def peak_rss_mb():
+    """
+    Peak resident memory of this process so far, in MB (None where it can't be measured).
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 2)
+
+
+def environment_info(stubs):
+    import torch
+
+    return {
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "pymupdf": fitz.VersionBind,
+        "platform": platform.platform(),
+        "stubs": sorted(stubs)
+    }
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import re
+import torch
+import torch.nn.functional as F
+
+# Deterministic, lightweight stand-ins for the models of the pipeline.
+# They follow the same interfaces as the real ones, so the benchmark measures the
+# pipeline around the models without downloading or running them.
+
+
+def _stable_hash(text):
+    return int.from_bytes(hashlib.md5(text.encode("utf-8")).digest()[:8], "little")
+
+
+class _StubModelInfo:
+    name_or_path = "stub-phi4"
+
+
+class StubGenerator:
+    """
+    Stands in for the Phi-4 text-generation pipeline.
+    Turns the first sentences of the page into requirement-shaped sentences
+    (as JSON sections for the combined prompt).
+    """
+
+    def __init__(self, max_requirements=5):
+        self.max_requirements = max_requirements
+        self.model = _StubModelInfo()
+
+    def __call__(self, prompt_msg, **kwargs):
+        prompt = prompt_msg[0]["content"]
+        text = prompt_msg[1]["content"]
+        sentences = [s.strip() for s in re.split(r"[.!?]\s+", text) if s.strip()][:self.max_requirements]
+
+        user_requirements = [f"As a user, I want to {s.lower()} for doing my work." for s in sentences]
+        system_requirements = [f"The system shall {s.lower()}." for s in sentences]
+
+        if "JSON" in prompt:
+            content = json.dumps({"user_requirements": user_requirements, "system_requirements": system_requirements})
+        elif "user software requirements" in prompt:
+            content = " ".join(user_requirements)
+        else:
+            content = " ".join(system_requirements)
+
+        assistant = {"role": "assistant", "content": content}
+        return [{"generated_text": prompt_msg + [assistant]}]
+
+
+class StubTokenizer:
+    """
+    Whitespace tokenizer with the subset of the Hugging Face tokenizer API used by the classifier.
+    """
+
+    def __call__(self, sentences, truncation=True, max_length=256, padding=False, return_tensors=None):
+        input_ids = [
+            [1] + [_stable_hash(word) % 30000 + 2 for word in sentence.split()][:max_length - 1]
+            for sentence in sentences
+        ]
+        attention_mask = [[1] * len(ids) for ids in input_ids]
+        encodings = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if padding or return_tensors:
+            return self.pad(encodings, padding=True, return_tensors=return_tensors)
+        return encodings
+
+    def pad(self, encodings, padding=True, return_tensors=None):
+        longest = max(len(ids) for ids in encodings["input_ids"])
+        input_ids = [ids + [0] * (longest - len(ids)) for ids in encodings["input_ids"]]
+        attention_mask = [mask + [0] * (longest - len(mask)) for mask in encodings["attention_mask"]]
+        return {"input_ids": torch.tensor(input_ids), "attention_mask": torch.tensor(attention_mask)}
+
+
+class StubClassifier:
+    """
+    Stands in for the multitask DistilBERT: derives fixed logits from the token ids.
+    """
+
+    def __init__(self, num_categories=11):
+        self.num_categories = num_categories
+        self.device = torch.device("cpu")
+
+    def __call__(self, input_ids, attention_mask):
+        seed = (input_ids * attention_mask).sum(dim=1)
+        logits_bin = torch.stack([(seed % 7).float(), (seed % 5).float()], dim=1)
+        logits_cat = torch.stack([((seed + i) % 13).float() for i in range(self.num_categories)], dim=1)
+        return {"loss": None, "logits_bin": logits_bin, "logits_cat": logits_cat}
+
+
+class StubEmbeddingModel:
+    """
+    Stands in for the sentence-transformers model with hashed bag-of-words vectors,
+    so sentences that share words are similar.
+    """
+
+    def __init__(self, dim=64):
+        self.dim = dim
+        self.device = torch.device("cpu")
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def encode(self, sentences, convert_to_tensor=True, normalize_embeddings=False):
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+
+        embeddings = torch.zeros((len(sentences), self.dim))
+        for row, sentence in enumerate(sentences):
+            for word in sentence.lower().split():
+                embeddings[row, _stable_hash(word) % self.dim] += 1.0
+        if normalize_embeddings:
+            embeddings = F.normalize(embeddings, dim=1)
+
+        return embeddings[0] if single else embeddings
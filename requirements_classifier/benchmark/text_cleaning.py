@@ -0,0 +1,94 @@
+import random
+import re
+import time
+
+# Pieces the random page texts are made of: words, sentence endings, whitespace
+# (including the Unicode line breaks str.splitlines() splits on) and empty lines.
+_WORDS = ["The", "system", "shall", "export", "reports", "As", "a", "user,", "I", "want", "1.3", "e.g.",
+          "TLS", "GDPR", "(see", "section", "4)", "-", "•", "Ação", "usuário", "naïve", "日本語"]
+_ENDINGS = ["", "", "", ".", ":", "!", "?", ";", ",", ". ", ".\t", "?  ", "...", ".)", "! "]
+_SPACES = ["", " ", "  ", "\t", " ", " ", "\x0c"]
+_BREAKS = ["\n", "\n", "\n", "\r\n", "\r", "\x0b", "\x1c", "\x85", " ", " "]
+
+
+def clean_page_text_reference(text):
+    """
+    The original line-by-line PDFUtils.clean_page_text, kept to check and benchmark the single-pass version.
+    """
+    lines = text.splitlines()
+    merged = []
+
+    for i, line in enumerate(lines):
+        line = line.strip()
+        if not line:
+            merged.append("")
+            continue
+
+        if i + 1 < len(lines) and not re.match(r".*[\.\:\!\?]\s*$", line):
+            next_line = lines[i+1].strip()
+            line += " " + next_line
+            lines[i+1] = ""
+        merged.append(line)
+
+    cleaned = []
+    last_blank = False
+    for line in merged:
+        if line == "":
+            if not last_blank:
+                cleaned.append(line)
+            last_blank = True
+        else:
+            cleaned.append(line)
+            last_blank = False
+
+    return "\n".join(cleaned)
+
+
+def random_page_text(rng, max_lines=40):
+    """
+    A random page of text with wrapped sentences, blank lines, odd whitespace and line breaks.
+    """
+    parts = []
+    for _ in range(rng.randint(0, max_lines)):
+        if rng.random() < 0.2:
+            parts.append(rng.choice(_SPACES))
+        else:
+            words = [rng.choice(_WORDS) for _ in range(rng.randint(1, 12))]
+            parts.append(rng.choice(_SPACES) + " ".join(words) + rng.choice(_ENDINGS) + rng.choice(_SPACES))
+        parts.append(rng.choice(_BREAKS))
+    if parts and rng.random() < 0.5:
+        parts.pop()
+    return "".join(parts)
+
+
+def random_corpus(size, seed=0, max_lines=40):
+    rng = random.Random(seed)
+    return [random_page_text(rng, max_lines) for _ in range(size)]
+
+
+def benchmark_clean_page_text(clean_page_text, pages=200, lines_per_page=80, repeats=5, seed=0):
+    """
+    Compares the per-page time of 'clean_page_text' with the reference implementation on a random corpus.
+    """
+    corpus = random_corpus(pages, seed, lines_per_page)
+
+    def best_of(function):
+        best = None
+        for _ in range(repeats):
+            started = time.perf_counter()
+            for text in corpus:
+                function(text)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    reference_seconds = best_of(clean_page_text_reference)
+    seconds = best_of(clean_page_text)
+
+    return {
+        "pages": pages,
+        "characters": sum(len(text) for text in corpus),
+        "reference_us_per_page": round(reference_seconds / pages * 1e6, 2),
+        "us_per_page": round(seconds / pages * 1e6, 2),
+        "speedup": round(reference_seconds / seconds, 2) if seconds else None
+    }
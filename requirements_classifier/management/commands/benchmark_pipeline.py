@@ -0,0 +1,56 @@
+import json
+import os
+import tempfile
+from django.core.management.base import BaseCommand
+from requirements_classifier.benchmark.pipeline import (
+    STUBBABLE_MODELS, benchmark_pdf, build_classifier, environment_info, make_synthetic_pdf
+)
+
+
+class Command(BaseCommand):
+    help = "Benchmarks every stage of the PDF pipeline on synthetic PDFs and prints the timings as JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pages", nargs="+", type=int, default=[1, 10, 40], help="Page counts of the synthetic PDFs")
+        parser.add_argument("--sentences-per-page", type=int, default=12)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--real-models",
+            nargs="*",
+            choices=STUBBABLE_MODELS,
+            default=[],
+            help="Models to run for real instead of their stub (phi4, multitask, embedding)"
+        )
+        parser.add_argument("--output", help="Also write the report to this file")
+
+    def handle(self, *args, **options):
+        stubs = set(STUBBABLE_MODELS) - set(options["real_models"])
+
+        reference = None
+        if options["real_models"]:
+            from requirements_classifier.views import REQ_CLASSIFIER
+            reference = REQ_CLASSIFIER
+
+        classifier = build_classifier(stubs, reference)
+        report = {"environment": environment_info(stubs), "runs": []}
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # Untimed run, so model loading and lazy imports don't count against the first PDF
+            warm_up_path = os.path.join(tmp_dir, "warm_up.pdf")
+            make_synthetic_pdf(warm_up_path, 1, options["sentences_per_page"], options["seed"])
+            classifier.warm_up()
+            benchmark_pdf(classifier, warm_up_path)
+
+            for pages in options["pages"]:
+                pdf_path = os.path.join(tmp_dir, f"synthetic_{pages}_pages.pdf")
+                make_synthetic_pdf(pdf_path, pages, options["sentences_per_page"], options["seed"])
+
+                run = benchmark_pdf(classifier, pdf_path)
+                run["pages"] = pages
+                report["runs"].append(run)
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as output_file:
+                output_file.write(output)
+        self.stdout.write(output)
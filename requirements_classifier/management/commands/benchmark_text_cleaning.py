@@ -0,0 +1,24 @@
+import json
+from django.core.management.base import BaseCommand
+from requirements_classifier.benchmark.text_cleaning import benchmark_clean_page_text
+from requirements_classifier.services.pdf_services import PDFUtils
+
+
+class Command(BaseCommand):
+    help = "Times PDFUtils.clean_page_text against the original implementation on random pages and prints the result as JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pages", type=int, default=200)
+        parser.add_argument("--lines-per-page", type=int, default=80)
+        parser.add_argument("--repeats", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        report = benchmark_clean_page_text(
+            PDFUtils().clean_page_text,
+            pages=options["pages"],
+            lines_per_page=options["lines_per_page"],
+            repeats=options["repeats"],
+            seed=options["seed"]
+        )
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,47 @@
+import json
+from django.core.management.base import BaseCommand
+from requirements_classifier.ai.classifier_backends import BACKENDS, SAMPLE_SENTENCES, benchmark, check_parity
+from requirements_classifier.ai.networks import load_multitask_classifier
+from requirements_classifier.views import REQ_CLASSIFIER
+
+
+class Command(BaseCommand):
+    help = "Checks every classifier backend against the eager model and reports its throughput as JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+        parser.add_argument("--sentences-file", help="Text file with one sentence per line (defaults to built-in samples)")
+        parser.add_argument("--batch-size", type=int, default=32)
+        parser.add_argument("--repeats", type=int, default=3)
+        parser.add_argument("--atol", type=float, default=5e-2, help="Maximum logit difference accepted by the parity check")
+
+    def handle(self, *args, **options):
+        sentences = SAMPLE_SENTENCES
+        if options["sentences_file"]:
+            with open(options["sentences_file"], encoding="utf-8") as sentences_file:
+                sentences = [line.strip() for line in sentences_file if line.strip()]
+
+        tokenizer, reference = self._load("eager")
+        report = {}
+
+        for backend in options["backends"]:
+            try:
+                _, model = (tokenizer, reference) if backend == "eager" else self._load(backend)
+            except Exception as e:
+                report[backend] = {"error": str(e)}
+                continue
+
+            report[backend] = {
+                "parity": check_parity(tokenizer, reference, model, sentences, atol=options["atol"]),
+                "benchmark": benchmark(tokenizer, model, sentences, batch_size=options["batch_size"], repeats=options["repeats"])
+            }
+
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def _load(self, backend):
+        return load_multitask_classifier(
+            model_name=REQ_CLASSIFIER.multitask_model_name,
+            bin_path=REQ_CLASSIFIER.multitask_bin_path,
+            tokenizer_path=REQ_CLASSIFIER.multitask_tokenizer_path,
+            backend=backend
+        )
@@ -0,0 +1,62 @@
+import json
+import os
+import tempfile
+from django.core.management.base import BaseCommand, CommandError
+from requirements_classifier.benchmark.generation_modes import compare_generation_modes
+from requirements_classifier.benchmark.pipeline import (
+    STUBBABLE_MODELS, build_classifier, environment_info, make_synthetic_pdf
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates the requirements of a PDF in the 'separate' and 'combined' generation modes and "
+        "prints their latency, requirement counts and overlap as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("pdf_path", nargs="?", help="PDF to compare on (a synthetic PDF by default)")
+        parser.add_argument("--pages", type=int, default=10, help="Page count of the synthetic PDF")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--similarity-threshold", type=float, default=0.8)
+        parser.add_argument(
+            "--real-models",
+            nargs="*",
+            choices=STUBBABLE_MODELS,
+            default=["phi4", "embedding"],
+            help="Models to run for real instead of their stub (phi4, multitask, embedding)"
+        )
+        parser.add_argument("--output", help="Also write the report to this file")
+
+    def handle(self, *args, **options):
+        stubs = set(STUBBABLE_MODELS) - set(options["real_models"])
+
+        reference = None
+        if options["real_models"]:
+            from requirements_classifier.views import REQ_CLASSIFIER
+            reference = REQ_CLASSIFIER
+
+        separate = build_classifier(stubs, reference, generation_mode="separate")
+        combined = build_classifier(stubs, reference, generation_mode="combined")
+        # Both modes share the same models, so they are only loaded once
+        combined.registry = separate.registry
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            pdf_path = options["pdf_path"]
+            if pdf_path is None:
+                pdf_path = os.path.join(tmp_dir, "synthetic.pdf")
+                make_synthetic_pdf(pdf_path, options["pages"], seed=options["seed"])
+            elif not os.path.exists(pdf_path):
+                raise CommandError(f"PDF not found: {pdf_path}")
+
+            page_texts = separate.pdf_utils.extract_text(pdf_path)
+            separate.warm_up()
+
+            report = compare_generation_modes(separate, combined, page_texts, options["similarity_threshold"])
+            report["environment"] = environment_info(stubs)
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as output_file:
+                output_file.write(output)
+        self.stdout.write(output)
@@ -0,0 +1,57 @@
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from django.core.management.base import BaseCommand
+from requirements_classifier.ai.generator_profiles import PROFILES, SAMPLE_PAGE, profile_report
+from requirements_classifier.services.requirements_classifier import build_classifier_from_settings
+
+
+class Command(BaseCommand):
+    help = (
+        "Loads Phi-4 with each loading profile, in a fresh process each, and reports its load time, "
+        "resident memory (peak while loading, once loaded and after generating) and generation speed "
+        "(tokens/sec) as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--profiles",
+            nargs="+",
+            choices=PROFILES,
+            default=[profile for profile in PROFILES if profile != "auto"]
+        )
+        parser.add_argument("--model", help="Model path or Hugging Face id (defaults to the classifier's Phi-4)")
+        parser.add_argument("--text-file", help="Text file with one page per paragraph (defaults to a built-in sample page)")
+        parser.add_argument("--max-new-tokens", type=int, default=64)
+        parser.add_argument("--repeats", type=int, default=1)
+        parser.add_argument("--output", help="Also write the report to this file")
+
+    def handle(self, *args, **options):
+        classifier = build_classifier_from_settings()
+        model_path = options["model"] or classifier.phi4_model_path
+
+        texts = [SAMPLE_PAGE]
+        if options["text_file"]:
+            with open(options["text_file"], encoding="utf-8") as text_file:
+                texts = [page.strip() for page in text_file.read().split("\n\n") if page.strip()]
+
+        report = {"model": model_path, "max_new_tokens": options["max_new_tokens"], "profiles": []}
+        for profile in options["profiles"]:
+            self.stderr.write(f"Profiling {profile}...")
+            # A fresh process per profile, so each one's memory is measured on its own
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                report["profiles"].append(executor.submit(
+                    profile_report,
+                    model_path,
+                    profile,
+                    texts,
+                    classifier.user_prompt,
+                    max_new_tokens=options["max_new_tokens"],
+                    repeats=options["repeats"]
+                ).result())
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as output_file:
+                output_file.write(output)
+        self.stdout.write(output)
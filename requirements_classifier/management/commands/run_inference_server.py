@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from requirements_classifier.ai.inference_server import make_server
+from requirements_classifier.benchmark.pipeline import STUBBABLE_MODELS, build_classifier
+from requirements_classifier.services.requirements_classifier import build_classifier_from_settings
+
+DEFAULT_ADDRESS = "http://127.0.0.1:8765"
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs the inference server: a single process holding the models, used by the web workers "
+        "when INFERENCE_SERVER is set to its address."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--address",
+            default=settings.INFERENCE_SERVER or DEFAULT_ADDRESS,
+            help=f"http://host:port or unix:///path/to/socket (INFERENCE_SERVER, or {DEFAULT_ADDRESS})"
+        )
+        parser.add_argument("--no-warm-up", action="store_true", help="Load the models on first use instead of at start")
+        parser.add_argument(
+            "--stub-models",
+            nargs="*",
+            choices=STUBBABLE_MODELS,
+            default=[],
+            help="Models replaced by their deterministic stub, e.g. to try the server without a GPU"
+        )
+
+    def handle(self, *args, **options):
+        if options["stub_models"]:
+            classifier = build_classifier(set(options["stub_models"]), build_classifier_from_settings())
+        else:
+            classifier = build_classifier_from_settings()
+
+        if not options["no_warm_up"]:
+            self.stdout.write("Loading models...")
+            classifier.warm_up()
+
+        try:
+            server = make_server(classifier, options["address"], verbose=options["verbosity"] > 1)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not listen on {options['address']}: {e}")
+
+        self.stdout.write(self.style.SUCCESS(f"Inference server listening on {options['address']}"))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
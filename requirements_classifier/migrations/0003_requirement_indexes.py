@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-18 14:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requirements_classifier', '0002_processing_jobs'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='requirements',
+            index=models.Index(fields=['project', 'page'], name='requirement_project_page_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requirements',
+            index=models.Index(fields=['project', 'classification_ai'], name='requirement_project_class_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requirements',
+            index=models.Index(fields=['classification_ai'], name='requirement_class_ai_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requirements',
+            index=models.Index(fields=['classification_user'], name='requirement_class_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requirements',
+            index=models.Index(fields=['created_at'], name='requirement_created_at_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-18 16:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requirements_classifier', '0003_requirement_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='requirements',
+            index=models.Index(fields=['project', 'id'], name='requirement_project_id_idx'),
+        ),
+    ]
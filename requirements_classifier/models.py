@@ -1,3 +1,4 @@
+import uuid
 from django.db import models
 
 # Create your models here.
@@ -21,5 +22,43 @@ class Requirements(models.Model):
 
     project = models.ForeignKey(Documents, on_delete=models.CASCADE, related_name="requirements")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["project", "page"], name="requirement_project_page_idx"),
+            models.Index(fields=["project", "classification_ai"], name="requirement_project_class_idx"),
+            models.Index(fields=["classification_ai"], name="requirement_class_ai_idx"),
+            models.Index(fields=["classification_user"], name="requirement_class_user_idx"),
+            models.Index(fields=["created_at"], name="requirement_created_at_idx"),
+            # Keyset pagination of a project's requirements (project=..., id > cursor, ordered by id)
+            models.Index(fields=["project", "id"], name="requirement_project_id_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.text[:50]}... ({self.classification_ai})"
+
+class ProcessingJobs(models.Model):
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_DONE, "Done"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    pdf_path = models.CharField(max_length=500)
+    cache_key = models.CharField(max_length=64, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    total_pages = models.IntegerField(default=0)
+    processed_pages = models.IntegerField(default=0)
+    results = models.JSONField(default=list)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
     def __str__(self):
-        return f"{self.text[:50]}... ({self.classification_ai})"
\ No newline at end of file
+        return f"{self.id} ({self.status})"
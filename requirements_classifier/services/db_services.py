@@ -1,18 +1,96 @@
+from django.db import transaction
 from ..models import Requirements, Documents
 
-def save_requirements_to_db(requirements):
-    
-    for requirement in requirements:
-        document, _ = Documents.objects.get_or_create(document_name=requirement["project"])
-
-        Requirements.objects.create(
-            text = requirement["text"],
-            classification_ai = requirement["classification_ai"],
-            confidence_ai = requirement["confidence_ai"],
-            classification_user = requirement["classification_user"] if requirement["classification_user"] != "---" else "",
-            original_text = requirement["original_text"],
-            match_score = requirement["match_score"],
-            page = requirement["page"],
-
-            project = document
-        )
\ No newline at end of file
+SAVE_MODES = ("append", "upsert")
+
+# Fields a re-saved requirement takes from the new save in upsert mode
+UPSERT_FIELDS = ["classification_ai", "confidence_ai", "classification_user", "original_text", "match_score"]
+
+def save_requirements_to_db(requirements, batch_size=500, mode="append"):
+    """
+    Saves the requirements in a single transaction, with bulk inserts of 'batch_size' rows.
+    - append: every requirement is inserted as a new row.
+    - upsert: a requirement already saved for the same project, page and text is updated
+      instead of being inserted again.
+    Returns the number of (created, updated) rows.
+    """
+    if mode not in SAVE_MODES:
+        raise ValueError(f"Unknown save mode '{mode}'. Expected one of: {', '.join(SAVE_MODES)}")
+
+    with transaction.atomic():
+        documents = _get_or_create_documents({requirement["project"] for requirement in requirements})
+        rows = [_build_requirement(requirement, documents[requirement["project"]]) for requirement in requirements]
+
+        to_update = []
+        if mode == "upsert":
+            existing = _existing_requirements(rows, batch_size)
+
+            to_create = []
+            for row in rows:
+                saved = existing.get((row.project_id, row.page, row.text))
+                if saved is None:
+                    to_create.append(row)
+                    # a requirement repeated in the same save is only inserted once
+                    existing[(row.project_id, row.page, row.text)] = row
+                elif saved.pk is not None:
+                    for field in UPSERT_FIELDS:
+                        setattr(saved, field, getattr(row, field))
+                    to_update.append(saved)
+            rows = to_create
+            to_update = list({row.pk: row for row in to_update}.values())
+
+        Requirements.objects.bulk_create(rows, batch_size=batch_size)
+        if to_update:
+            Requirements.objects.bulk_update(to_update, UPSERT_FIELDS, batch_size=batch_size)
+
+    return len(rows), len(to_update)
+
+def _existing_requirements(rows, batch_size):
+    """
+    Returns {(project_id, page, text): saved requirement} for the saved requirements matching 'rows'.
+    Only the rows' own texts are queried, 'batch_size' at a time, loading just the fields needed to update them.
+    """
+    texts = sorted({row.text for row in rows})
+    project_ids = {row.project_id for row in rows}
+    pages = {row.page for row in rows}
+
+    existing = {}
+    for start in range(0, len(texts), batch_size):
+        saved = Requirements.objects.filter(
+            project_id__in=project_ids,
+            page__in=pages,
+            text__in=texts[start:start + batch_size]
+        ).only("id", "project_id", "page", "text").order_by("id")
+        for row in saved:
+            existing.setdefault((row.project_id, row.page, row.text), row)
+
+    return existing
+
+def _get_or_create_documents(names):
+    """
+    Returns {name: Documents} for every project name, creating the missing ones.
+    """
+    documents = {document.document_name: document for document in Documents.objects.filter(document_name__in=names)}
+
+    missing = [name for name in names if name not in documents]
+    if missing:
+        # ignore_conflicts covers a concurrent save creating the same project
+        Documents.objects.bulk_create([Documents(document_name=name) for name in missing], ignore_conflicts=True)
+        documents.update(
+            (document.document_name, document) for document in Documents.objects.filter(document_name__in=missing)
+        )
+
+    return documents
+
+def _build_requirement(requirement, document):
+    return Requirements(
+        text = requirement["text"],
+        classification_ai = requirement["classification_ai"],
+        confidence_ai = requirement["confidence_ai"],
+        classification_user = requirement["classification_user"] if requirement["classification_user"] != "---" else "",
+        original_text = requirement["original_text"],
+        match_score = requirement["match_score"],
+        page = requirement["page"],
+
+        project = document
+    )
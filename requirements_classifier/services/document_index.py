@@ -0,0 +1,125 @@
+import torch
+from nltk.tokenize.punkt import PunktSentenceTokenizer, PunktParameters
+from .metrics import METRICS
+
+
+class DocumentIndex:
+    """
+    Sentence embeddings of a whole document, built once per PDF.
+    - Keeps every sentence with its character span and page number.
+    - Keeps an L2-normalized embedding matrix, so matching is a single matrix product.
+    """
+
+    def __init__(self, sentences, spans, pages, embeddings):
+        self.sentences = sentences
+        self.spans = spans
+        self.pages = pages
+        self.embeddings = embeddings
+        self.pages_tensor = torch.tensor(pages, dtype=torch.long, device=embeddings.device)
+
+    @classmethod
+    def build(cls, page_texts, embedding_model, first_page=1):
+        """
+        Splits each page with Punkt and encodes all the sentences of the document at once.
+        """
+        sentence_splitter = PunktSentenceTokenizer(PunktParameters())
+        sentences, spans, pages = [], [], []
+
+        with METRICS.span("sentence_split"):
+            for page_number, page_content in enumerate(page_texts, start=first_page):
+                if not page_content:
+                    continue
+                for start, end in sentence_splitter.span_tokenize(page_content):
+                    sentence = page_content[start:end].strip()
+                    if sentence:
+                        sentences.append(sentence)
+                        spans.append((start, end))
+                        pages.append(page_number)
+
+        if sentences:
+            with METRICS.span("embedding"):
+                embeddings = embedding_model.encode(sentences, convert_to_tensor=True, normalize_embeddings=True)
+        else:
+            dim = embedding_model.get_sentence_embedding_dimension()
+            embeddings = torch.empty((0, dim), device=embedding_model.device)
+
+        return cls(sentences, spans, pages, embeddings)
+
+    def __len__(self):
+        return len(self.sentences)
+
+    def query(self, req_embeddings, k=1, pages=None):
+        """
+        Returns the top-k matches of each requirement embedding, as lists of
+        {"original_text", "match_score", "page"} dicts ordered by score.
+        'pages' optionally holds one page number per requirement to restrict its search
+        (None in a position means the whole document, and a list or tuple any of its pages).
+        """
+        matches = []
+        for row_scores, row_idx in self._top_k(req_embeddings, k, pages):
+            matches.append([
+                self._match(idx, score)
+                for score, idx in zip(row_scores, row_idx)
+                if score != float("-inf")
+            ])
+        return matches
+
+    def best_matches(self, req_embeddings, pages=None):
+        """
+        Returns the single best match of each requirement.
+        Requirements without a positive similarity get an empty match, with page None.
+        """
+        best = []
+        for row_scores, row_idx in self._top_k(req_embeddings, 1, pages):
+            if row_scores and row_scores[0] > 0.0:
+                best.append(self._match(row_idx[0], row_scores[0]))
+            else:
+                best.append({"original_text": "", "match_score": 0.0, "page": None})
+        return best
+
+    def _match(self, idx, score):
+        return {
+            "original_text": self.sentences[idx],
+            "match_score": round(score, 4),
+            "page": self.pages[idx]
+        }
+
+    def _top_k(self, req_embeddings, k, pages):
+        if len(req_embeddings) == 0:
+            return []
+        if len(self) == 0:
+            return [([], []) for _ in range(len(req_embeddings))]
+
+        req_embeddings = req_embeddings.to(self.embeddings.device)
+        scores = req_embeddings @ self.embeddings.T
+
+        if pages is not None:
+            scores = scores.masked_fill(self._outside_pages(pages, scores.device), float("-inf"))
+
+        k = min(k, len(self))
+        if k == 1:
+            # argmax keeps the first sentence on ties, like a sequential scan over the pages
+            top_idx = scores.argmax(dim=1, keepdim=True)
+            top_scores = scores.gather(1, top_idx)
+        else:
+            top_scores, top_idx = scores.topk(k, dim=1)
+
+        return list(zip(top_scores.tolist(), top_idx.tolist()))
+
+    def _outside_pages(self, pages, device):
+        """
+        Boolean (requirements x sentences) mask of the sentences outside each requirement's pages.
+        """
+        if not any(isinstance(p, (list, tuple)) for p in pages):
+            req_pages = torch.tensor([p if p is not None else -1 for p in pages], device=device)
+            return (req_pages[:, None] != self.pages_tensor[None, :]) & (req_pages[:, None] != -1)
+
+        outside = torch.zeros((len(pages), len(self)), dtype=torch.bool, device=device)
+        for row, req_pages in enumerate(pages):
+            if req_pages is None:
+                continue
+            if not isinstance(req_pages, (list, tuple)):
+                req_pages = [req_pages]
+            allowed = torch.tensor(list(req_pages), dtype=torch.long, device=device)
+            outside[row] = ~torch.isin(self.pages_tensor, allowed)
+        return outside
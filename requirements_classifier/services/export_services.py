@@ -0,0 +1,178 @@
+import asyncio
+import csv
+import json
+from concurrent.futures import ThreadPoolExecutor
+from django.db import connections
+from django.db.models import F
+from .query_services import REQUIREMENT_FIELDS, filter_requirements
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "jsonl": ("application/x-ndjson", "jsonl"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+EXPORT_FIELDS = REQUIREMENT_FIELDS + ["project"]
+
+
+def iter_export_rows(params, chunk_size=2000):
+    """
+    Yields the filtered requirements as dicts, reading them from the database in chunks
+    of 'chunk_size' rows, so memory stays flat whatever the size of the export.
+    """
+    # Built before the generator starts, so invalid filters raise here and not mid-stream
+    queryset = (
+        filter_requirements(params)
+        .order_by("id")
+        .annotate(project_name=F("project__document_name"))
+        .values(*REQUIREMENT_FIELDS, "project_name")
+    )
+
+    def rows():
+        for row in queryset.iterator(chunk_size=chunk_size):
+            row["project"] = row.pop("project_name")
+            yield row
+
+    return rows()
+
+
+def stream_export(rows, export_format, batch_size=2000):
+    """
+    Serializes the rows of iter_export_rows in 'export_format', yielding the file piece by piece.
+    """
+    if export_format == "csv":
+        return _stream_csv(rows)
+    if export_format == "jsonl":
+        return _stream_jsonl(rows)
+    if export_format == "parquet":
+        return _stream_parquet(rows, batch_size)
+    raise ValueError(f"Unknown export format '{export_format}'. Expected one of: {', '.join(EXPORT_FORMATS)}")
+
+
+async def iterate_in_thread(content):
+    """
+    Async iterator over the pieces of stream_export, for ASGI servers (which would otherwise
+    read a sync iterator whole before sending anything).
+    Every piece is produced on the same dedicated thread, so the database cursor reading the
+    rows stays on its connection; the thread's connections are closed when the export ends.
+    """
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="export")
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            piece = await loop.run_in_executor(executor, next, content, None)
+            if piece is None:
+                break
+            yield piece
+    finally:
+        # Queued after any piece still being produced, so it never runs alongside it
+        executor.submit(_close_export, content)
+        executor.shutdown(wait=False)
+
+
+def _close_export(content):
+    content.close()
+    connections.close_all()
+
+
+def check_export_format(export_format):
+    """
+    Raises ValueError for unknown formats, and RuntimeError when the format needs a missing package.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{export_format}'. Expected one of: {', '.join(EXPORT_FORMATS)}")
+    if export_format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise RuntimeError("Parquet exports require the pyarrow package")
+
+
+class _Echo:
+    # csv.writer target that hands back each formatted row instead of buffering it
+    def write(self, value):
+        return value
+
+
+def _stream_csv(rows):
+    writer = csv.writer(_Echo())
+    # BOM, so spreadsheet applications detect UTF-8 (like export_csv)
+    yield "\ufeff" + writer.writerow(EXPORT_FIELDS)
+    yield from _grouped(
+        writer.writerow([row[field] if field != "created_at" else row[field].isoformat() for field in EXPORT_FIELDS])
+        for row in rows
+    )
+
+
+def _stream_jsonl(rows):
+    yield from _grouped(
+        json.dumps(dict(row, created_at=row["created_at"].isoformat()), ensure_ascii=False) + "\n"
+        for row in rows
+    )
+
+
+def _grouped(lines, lines_per_chunk=500):
+    # Sends lines in groups, rather than one response chunk per row
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= lines_per_chunk:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+class _ChunkSink:
+    # Write-only file object that keeps what pyarrow writes until it is drained
+    closed = False
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _stream_parquet(rows, batch_size):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("text", pa.string()),
+        ("classification_ai", pa.string()),
+        ("confidence_ai", pa.float64()),
+        ("classification_user", pa.string()),
+        ("original_text", pa.string()),
+        ("match_score", pa.float64()),
+        ("page", pa.int64()),
+        ("created_at", pa.timestamp("us", tz="UTC")),
+        ("project", pa.string()),
+    ])
+
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+
+    # Every batch becomes a row group, sent as soon as it is written
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+            batch = []
+            yield sink.drain()
+
+    if batch:
+        writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+    writer.close()
+    yield sink.drain()
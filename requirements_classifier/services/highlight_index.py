@@ -0,0 +1,99 @@
+import fitz
+from collections import defaultdict
+
+
+class PageWordIndex:
+    """
+    The words of a PDF page, from get_text("words"), indexed by their lowercased text.
+    - find(text) locates every occurrence of a sentence as a run of consecutive words,
+      without rescanning the page like page.search_for() does for each sentence.
+    - Hits are returned as one rectangle per line, like search_for().
+    - 'words' can be given if the page was already parsed (see PageWordsCache).
+    """
+
+    def __init__(self, page, words=None):
+        self.words = words if words is not None else page.get_text("words")
+        self.tokens = [word[4].lower() for word in self.words]
+        self.positions = defaultdict(list)
+        for position, token in enumerate(self.tokens):
+            self.positions[token].append(position)
+
+    def find(self, text):
+        tokens = text.lower().split()
+        if not tokens:
+            return []
+
+        rects = []
+        last_end = 0
+        for start in self.positions.get(tokens[0], []):
+            end = start + len(tokens)
+            # Like search_for, occurrences don't overlap
+            if start < last_end or self.tokens[start:end] != tokens:
+                continue
+            rects.extend(self._line_rects(start, end))
+            last_end = end
+        return rects
+
+    def _line_rects(self, start, end):
+        lines = []
+        current_line = None
+        for x0, y0, x1, y1, _, block_no, line_no, _ in self.words[start:end]:
+            if (block_no, line_no) != current_line:
+                lines.append([x0, y0, x1, y1])
+                current_line = (block_no, line_no)
+            else:
+                bounds = lines[-1]
+                bounds[0], bounds[1] = min(bounds[0], x0), min(bounds[1], y0)
+                bounds[2], bounds[3] = max(bounds[2], x1), max(bounds[3], y1)
+        return [fitz.Rect(bounds) for bounds in lines]
+
+
+# How highlights are drawn:
+# - rect: a filled, translucent rectangle annotation over each hit (the original look).
+# - highlight: one text highlight annotation per sentence, covering all its hits. Fewer annotations,
+#   so faster to write, but it looks like a marker highlight instead of a filled box.
+HIGHLIGHT_STYLES = ("rect", "highlight")
+
+
+class HighlightWriter:
+    """
+    Collects the highlights of a page and writes them in one go, in the given style (see HIGHLIGHT_STYLES).
+    Each annotation gets its colors, note and opacity set before a single update() call, which is
+    what regenerates its appearance.
+    """
+
+    def __init__(self, page, style="rect", opacity=0.4):
+        if style not in HIGHLIGHT_STYLES:
+            raise ValueError(f"Unknown highlight style '{style}'. Expected one of: {', '.join(HIGHLIGHT_STYLES)}")
+        self.page = page
+        self.style = style
+        self.opacity = opacity
+        self._highlights = []
+
+    def add(self, rects, color, note):
+        if rects:
+            self._highlights.append((rects, color, note))
+
+    def write(self):
+        """
+        Writes the collected highlights. Returns how many annotations were added.
+        """
+        written = 0
+        for rects, color, note in self._highlights:
+            if self.style == "highlight":
+                annot = self.page.add_highlight_annot(rects)
+                annot.set_colors(stroke=color)
+                annot.set_info({"title": "Requirement", "content": note})
+                annot.update(opacity=self.opacity)
+                written += 1
+                continue
+
+            for rect in rects:
+                annot = self.page.add_rect_annot(rect)
+                annot.set_colors(stroke=color, fill=color)
+                annot.set_info({"title": "Requirement", "content": note})
+                annot.update(opacity=self.opacity)
+                written += 1
+
+        self._highlights = []
+        return written
@@ -0,0 +1,158 @@
+import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.db import close_old_connections
+from django.utils.timezone import now
+from ..models import ProcessingJobs
+from .requirements_classifier import append_page
+
+ACTIVE_STATUSES = (ProcessingJobs.STATUS_PENDING, ProcessingJobs.STATUS_RUNNING)
+
+STALE_JOB_ERROR = "The job was interrupted (the server restarted or the worker stopped). Start it again."
+
+
+class JobRunner:
+    """
+    Runs PDF processing jobs in a local worker pool.
+    - Jobs are stored in the database, so any web worker can report their status.
+    - Results are saved as pages are done, at most every 'progress_seconds' (and when the job ends),
+      so partial results can be polled without rewriting them after every page.
+    - While a job is queued or running, its 'updated_at' is refreshed every 'heartbeat_seconds'.
+      A pending or running job not updated for 'stale_seconds' lost its worker (e.g. to a restart)
+      and is marked as failed, see fail_stale_jobs().
+    """
+
+    def __init__(self, classifier, result_cache, max_workers=1, progress_seconds=2, heartbeat_seconds=30, stale_seconds=300):
+        self.classifier = classifier
+        self.result_cache = result_cache
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pdf-job")
+        self.progress_seconds = progress_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.stale_seconds = stale_seconds
+
+        self._active = set()
+        self._lock = threading.Lock()
+        self._heartbeat = None
+        self._recovered = False
+
+    def submit(self, pdf_path, cache_key):
+        """
+        Creates a job for 'pdf_path' and queues it. Returns the job.
+        """
+        self.recover()
+        job = ProcessingJobs.objects.create(pdf_path=pdf_path, cache_key=cache_key)
+
+        with self._lock:
+            self._active.add(job.id)
+            if self._heartbeat is None:
+                self._heartbeat = threading.Thread(target=self._beat, name="pdf-job-heartbeat", daemon=True)
+                self._heartbeat.start()
+
+        self.executor.submit(self._run, job.id)
+        return job
+
+    def recover(self):
+        """
+        Fails the jobs left pending or running by a previous process, the first time it is called.
+        """
+        with self._lock:
+            if self._recovered:
+                return
+            self._recovered = True
+        self.fail_stale_jobs()
+
+    def fail_stale_jobs(self):
+        """
+        Marks as failed the pending or running jobs not updated for 'stale_seconds'.
+        Returns how many were failed.
+        """
+        with self._lock:
+            active = list(self._active)
+        return ProcessingJobs.objects.filter(
+            status__in=ACTIVE_STATUSES,
+            updated_at__lt=now() - datetime.timedelta(seconds=self.stale_seconds)
+        ).exclude(id__in=active).update(
+            status=ProcessingJobs.STATUS_FAILED,
+            error=STALE_JOB_ERROR,
+            updated_at=now()
+        )
+
+    def is_stale(self, job):
+        """
+        Whether 'job' is pending or running without any worker updating it.
+        """
+        with self._lock:
+            if job.id in self._active:
+                return False
+        return (
+            job.status in ACTIVE_STATUSES
+            and job.updated_at < now() - datetime.timedelta(seconds=self.stale_seconds)
+        )
+
+    def _beat(self):
+        while True:
+            time.sleep(self.heartbeat_seconds)
+            with self._lock:
+                active = list(self._active)
+            if not active:
+                continue
+            try:
+                ProcessingJobs.objects.filter(id__in=active, status__in=ACTIVE_STATUSES).update(updated_at=now())
+            except Exception:
+                pass
+            finally:
+                close_old_connections()
+
+    def _run(self, job_id):
+        close_old_connections()
+        job = ProcessingJobs.objects.get(id=job_id)
+
+        try:
+            page_texts = self.classifier.pdf_utils.extract_text(job.pdf_path)
+            chunks = self.classifier.schedule_pages(page_texts)
+
+            job.status = ProcessingJobs.STATUS_RUNNING
+            job.total_pages = len(chunks)
+            job.save(update_fields=["status", "total_pages", "updated_at"])
+
+            analysis = {"page_texts": page_texts, "generations": [], "results": job.results}
+            last_saved = time.monotonic()
+            for page in self.classifier.iter_pdf(job.pdf_path, page_texts, chunks):
+                append_page(analysis, page)
+                job.processed_pages += 1
+
+                if time.monotonic() - last_saved >= self.progress_seconds:
+                    job.save(update_fields=["results", "processed_pages", "updated_at"])
+                    last_saved = time.monotonic()
+
+            if job.cache_key:
+                self.result_cache.set(job.cache_key, analysis)
+
+            job.status = ProcessingJobs.STATUS_DONE
+            job.save(update_fields=["status", "results", "processed_pages", "updated_at"])
+        except Exception as e:
+            job.status = ProcessingJobs.STATUS_FAILED
+            job.error = str(e)
+            job.save(update_fields=["status", "results", "processed_pages", "error", "updated_at"])
+        finally:
+            with self._lock:
+                self._active.discard(job_id)
+            close_old_connections()
+
+
+def job_status(job, offset=0):
+    """
+    Serializes a job for the status endpoint.
+    Only the results after 'offset' are returned, so pollers can fetch just the new ones.
+    """
+    return {
+        "job_id": str(job.id),
+        "status": job.status,
+        "pdf_path": job.pdf_path,
+        "total_pages": job.total_pages,
+        "processed_pages": job.processed_pages,
+        "results": job.results[offset:],
+        "results_count": len(job.results),
+        "error": job.error
+    }
@@ -0,0 +1,151 @@
+import contextvars
+import json
+import threading
+import time
+from asgiref.sync import iscoroutinefunction
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from django.conf import settings
+from django.http import JsonResponse
+
+METRIC_PREFIX = "requirements_classifier"
+
+_NULL_SPAN = nullcontext()
+
+# Timings collected for the current request. A context variable rather than a thread local,
+# so spans of async views and of the work they hand to other threads (with the context) are included
+_REQUEST_TIMINGS = contextvars.ContextVar("request_timings", default=None)
+
+
+class Metrics:
+    """
+    Process-wide timing spans, counters and gauges.
+    - span(name) times a stage; incr(name) and set_gauge(name) track counts and levels.
+    - Everything is exported in the Prometheus text format by render_prometheus().
+    - collect_request() gathers the spans of the current context, for per-request timings.
+    When disabled, spans are only recorded for contexts collecting request timings.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._span_seconds = defaultdict(float)
+        self._span_calls = defaultdict(int)
+        self._counters = defaultdict(float)
+        self._gauges = {}
+
+    def span(self, name):
+        if not self.enabled and _REQUEST_TIMINGS.get() is None:
+            return _NULL_SPAN
+        return self._span(name)
+
+    @contextmanager
+    def _span(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            if self.enabled:
+                with self._lock:
+                    self._span_seconds[name] += elapsed
+                    self._span_calls[name] += 1
+
+            timings = _REQUEST_TIMINGS.get()
+            if timings is not None:
+                timings[name] = timings.get(name, 0.0) + elapsed
+
+    def incr(self, name, value=1):
+        if self.enabled:
+            with self._lock:
+                self._counters[name] += value
+
+    def set_gauge(self, name, value):
+        if self.enabled:
+            self._gauges[name] = value
+
+    @contextmanager
+    def collect_request(self):
+        """
+        Collects the time spent in each span by the current context, as a {name: seconds} dict.
+        """
+        timings = {}
+        token = _REQUEST_TIMINGS.set(timings)
+        try:
+            yield timings
+        finally:
+            _REQUEST_TIMINGS.reset(token)
+
+    def render_prometheus(self):
+        with self._lock:
+            span_seconds = dict(self._span_seconds)
+            span_calls = dict(self._span_calls)
+            counters = dict(self._counters)
+        gauges = dict(self._gauges)
+
+        lines = [
+            f"# HELP {METRIC_PREFIX}_stage_seconds_total Time spent in each pipeline stage.",
+            f"# TYPE {METRIC_PREFIX}_stage_seconds_total counter",
+        ]
+        lines += [f'{METRIC_PREFIX}_stage_seconds_total{{stage="{name}"}} {seconds:.6f}' for name, seconds in sorted(span_seconds.items())]
+        lines += [
+            f"# HELP {METRIC_PREFIX}_stage_calls_total Number of times each pipeline stage ran.",
+            f"# TYPE {METRIC_PREFIX}_stage_calls_total counter",
+        ]
+        lines += [f'{METRIC_PREFIX}_stage_calls_total{{stage="{name}"}} {calls}' for name, calls in sorted(span_calls.items())]
+
+        for name, value in sorted(counters.items()):
+            lines += [f"# TYPE {METRIC_PREFIX}_{name}_total counter", f"{METRIC_PREFIX}_{name}_total {value:g}"]
+        for name, value in sorted(gauges.items()):
+            lines += [f"# TYPE {METRIC_PREFIX}_{name} gauge", f"{METRIC_PREFIX}_{name} {value:g}"]
+
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics(enabled=getattr(settings, "METRICS_ENABLED", True))
+
+
+def instrument_view(name):
+    """
+    Times a view as the 'view.<name>' span. When the query string has timings=1,
+    the time spent in each stage is added to its JSON response as a 'timings' block.
+    Works on both sync and async views.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if request.GET.get("timings") != "1":
+                    with METRICS.span(f"view.{name}"):
+                        return await view(request, *args, **kwargs)
+
+                with METRICS.collect_request() as timings:
+                    with METRICS.span(f"view.{name}"):
+                        response = await view(request, *args, **kwargs)
+
+                return _with_timings(response, timings)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.GET.get("timings") != "1":
+                with METRICS.span(f"view.{name}"):
+                    return view(request, *args, **kwargs)
+
+            with METRICS.collect_request() as timings:
+                with METRICS.span(f"view.{name}"):
+                    response = view(request, *args, **kwargs)
+
+            return _with_timings(response, timings)
+        return wrapper
+    return decorator
+
+
+def _with_timings(response, timings):
+    if isinstance(response, JsonResponse):
+        payload = json.loads(response.content)
+        if isinstance(payload, dict):
+            payload["timings"] = {stage: round(seconds, 4) for stage, seconds in timings.items()}
+            return JsonResponse(payload, status=response.status_code)
+    return response
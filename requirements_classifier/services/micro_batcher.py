@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from .metrics import METRICS
+
+
+class MicroBatcher:
+    """
+    Merges concurrent calls of a batched function into a single call.
+    - submit(items) queues 'items' and blocks until their results are ready.
+    - A worker thread takes the first queued call, waits up to 'max_wait_ms' for others to join it
+      (until 'max_batch_size' items are queued), calls 'process_batch' once with all their items
+      and hands each caller its slice of the results.
+    - Calls of 'max_batch_size' items or more are a full batch on their own and run directly,
+      like every call when 'max_wait_ms' is 0.
+    - Metrics: the '<name>_queue_depth' gauge (items waiting), and the '<name>_batches' and
+      '<name>_batched_items' counters (merged calls and the items they carried).
+    """
+
+    def __init__(self, process_batch, name, max_batch_size=32, max_wait_ms=0):
+        self.process_batch = process_batch
+        self.name = name
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+
+        self._pending = deque()
+        self._pending_items = 0
+        self._condition = threading.Condition()
+        self._worker = None
+
+    @property
+    def enabled(self):
+        return self.max_wait_ms > 0 and self.max_batch_size > 1
+
+    def submit(self, items):
+        """
+        Returns process_batch(items), computed together with the other calls queued meanwhile.
+        'process_batch' must return one result per item, in a sliceable sequence (list, tensor...).
+        """
+        items = list(items)
+        if not self.enabled or not items or len(items) >= self.max_batch_size:
+            return self.process_batch(items)
+
+        future = Future()
+        with self._condition:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name=f"micro-batcher-{self.name}", daemon=True)
+                self._worker.start()
+            self._pending.append((items, future))
+            self._pending_items += len(items)
+            METRICS.set_gauge(f"{self.name}_queue_depth", self._pending_items)
+            self._condition.notify()
+
+        return future.result()
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            items = [item for call_items, _ in batch for item in call_items]
+
+            try:
+                results = self.process_batch(items)
+            except BaseException as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            METRICS.incr(f"{self.name}_batches")
+            METRICS.incr(f"{self.name}_batched_items", len(items))
+
+            start = 0
+            for call_items, future in batch:
+                future.set_result(results[start:start + len(call_items)])
+                start += len(call_items)
+
+    def _next_batch(self):
+        """
+        Waits for a queued call, gives others 'max_wait_ms' to join it, and dequeues
+        the calls that fit in one batch.
+        """
+        with self._condition:
+            while not self._pending:
+                self._condition.wait()
+
+            deadline = time.monotonic() + self.max_wait_ms / 1000
+            while self._pending_items < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            batch = []
+            batch_items = 0
+            while self._pending and (not batch or batch_items + len(self._pending[0][0]) <= self.max_batch_size):
+                call_items, future = self._pending.popleft()
+                batch.append((call_items, future))
+                batch_items += len(call_items)
+
+            self._pending_items -= batch_items
+            METRICS.set_gauge(f"{self.name}_queue_depth", self._pending_items)
+            return batch
@@ -0,0 +1,73 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .metrics import METRICS
+
+_END = object()
+
+
+class ExecutorBusy(RuntimeError):
+    pass
+
+
+class ModelExecutor:
+    """
+    Bounded thread pool running the model work of async views, so it never blocks the event loop.
+    - run(func, *args) awaits func(*args) on one of 'max_workers' threads, in the caller's context
+      (so the spans of a request collecting its timings are still counted).
+    - At most 'max_pending' calls are queued or running at once; past that, run() raises ExecutorBusy
+      instead of piling up work no client will wait for.
+    - The 'model_executor_pending' gauge tracks the calls queued or running.
+    - iterate(iterator) steps through a sync iterator (e.g. the events of a stream) the same way.
+    """
+
+    def __init__(self, max_workers=4, max_pending=32):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="model")
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    async def run(self, func, *args, **kwargs):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                METRICS.incr("model_executor_rejected")
+                raise ExecutorBusy("The server is busy, try again later")
+            self._pending += 1
+            METRICS.set_gauge("model_executor_pending", self._pending)
+
+        context = contextvars.copy_context()
+        future = self._executor.submit(functools.partial(context.run, func, *args, **kwargs))
+        # Released when the work ends, even if the request was cancelled meanwhile
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    async def iterate(self, iterator, retry_seconds=0.5):
+        """
+        Async iterator over a sync 'iterator', each next() running like run().
+        When the executor is busy, a step waits for room instead of raising ExecutorBusy,
+        since the client already holds a partial response.
+        """
+        try:
+            while True:
+                try:
+                    item = await self.run(next, iterator, _END)
+                except ExecutorBusy:
+                    await asyncio.sleep(retry_seconds)
+                    continue
+                if item is _END:
+                    return
+                yield item
+        finally:
+            try:
+                iterator.close()
+            except (AttributeError, ValueError):
+                # Not a generator, or still running a step the client stopped waiting for
+                pass
+
+    def _release(self, future):
+        with self._lock:
+            self._pending -= 1
+            METRICS.set_gauge("model_executor_pending", self._pending)
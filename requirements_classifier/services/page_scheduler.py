@@ -0,0 +1,94 @@
+from nltk.tokenize.punkt import PunktSentenceTokenizer, PunktParameters
+
+
+class PageChunk:
+    """
+    A piece of the document sent to the LLM as a single page.
+    - pages: the page numbers its text comes from (several for merged pages).
+    - text: the text to generate requirements from.
+    """
+
+    def __init__(self, pages, text):
+        self.pages = pages
+        self.text = text
+
+    def __repr__(self):
+        return f"PageChunk(pages={self.pages}, chars={len(self.text)})"
+
+
+class PageScheduler:
+    """
+    Turns the page texts of a document into the chunks requirements are generated from:
+    - pages with fewer than 'min_words' words (covers, tables of contents, blank pages) are skipped,
+    - consecutive small pages are merged while they fit in 'max_tokens',
+    - pages longer than 'max_tokens' are split on sentence boundaries.
+    'count_tokens' measures a text; by default words are counted, scaled to approximate LLM tokens.
+    """
+
+    def __init__(self, max_tokens=1024, min_words=20, count_tokens=None):
+        self.max_tokens = max_tokens
+        self.min_words = min_words
+        self.count_tokens = count_tokens or approximate_tokens
+
+    def schedule(self, page_texts, first_page=1):
+        chunks = []
+        pending_pages, pending_texts, pending_tokens = [], [], 0
+
+        def flush():
+            if pending_pages:
+                chunks.append(PageChunk(list(pending_pages), "\n\n".join(pending_texts)))
+                pending_pages.clear()
+                pending_texts.clear()
+
+        for page_number, page_content in enumerate(page_texts, start=first_page):
+            if not page_content or len(page_content.split()) < self.min_words:
+                continue
+
+            tokens = self.count_tokens(page_content)
+            if tokens > self.max_tokens:
+                flush()
+                pending_tokens = 0
+                chunks.extend(PageChunk([page_number], part) for part in self.split_page(page_content))
+                continue
+
+            if pending_tokens + tokens > self.max_tokens:
+                flush()
+                pending_tokens = 0
+
+            pending_pages.append(page_number)
+            pending_texts.append(page_content)
+            pending_tokens += tokens
+
+        flush()
+        return chunks
+
+    def split_page(self, page_content):
+        """
+        Splits a page into parts of at most 'max_tokens', cutting between sentences.
+        A single sentence longer than the budget becomes a part of its own.
+        """
+        sentence_splitter = PunktSentenceTokenizer(PunktParameters())
+        parts = []
+        part_start = part_end = None
+        part_tokens = 0
+
+        for start, end in sentence_splitter.span_tokenize(page_content):
+            tokens = self.count_tokens(page_content[start:end])
+            if part_start is not None and part_tokens + tokens > self.max_tokens:
+                parts.append(page_content[part_start:part_end].strip())
+                part_start = None
+
+            if part_start is None:
+                part_start, part_tokens = start, 0
+            part_end = end
+            part_tokens += tokens
+
+        if part_start is not None:
+            parts.append(page_content[part_start:part_end].strip())
+
+        return [part for part in parts if part]
+
+
+def approximate_tokens(text):
+    # English text averages about 4 tokens for every 3 words with BPE tokenizers
+    return (len(text.split()) * 4 + 2) // 3
@@ -3,16 +3,27 @@ import fitz
 import random
 import os 
 import uuid
-import tempfile
-import re
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from django.conf import settings
+from .highlight_index import HighlightWriter, PageWordIndex
+from .metrics import METRICS
+from .text_layout import font_metrics, wrap_text
+from .upload_store import UPLOADS
 
 class PDFUtils:
     """
     A utility class for handling PDF files.
     """
 
-    def __init__(self):
+    def __init__(self, extract_workers=None, text_cache=None, upload_store=None, words_cache=None, highlight_style=None):
+        self.extract_workers = extract_workers or settings.PDF_EXTRACT_WORKERS
+        self.highlight_style = highlight_style or settings.HIGHLIGHT_STYLE
+        self.text_cache = text_cache if text_cache is not None else EXTRACTED_TEXTS
+        self.upload_store = upload_store if upload_store is not None else UPLOADS
+        self.words_cache = words_cache if words_cache is not None else PAGE_WORDS
         self.pre_defined_colors = [
             ((255/255), (153/255), (153/255)),  # Red
             ((255/255), (204/255), (153/255)),  # Orange
@@ -25,55 +36,85 @@ class PDFUtils:
 
     def save_pdf(self, uploaded_file):
         """
-        Saves the uploaded PDF as a temporary file.
-        Returns the path of the temporary file
+        Saves the uploaded PDF in the upload store (see UploadStore).
+        Returns the path of the stored file, the same for every upload of the same PDF.
         """
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-            for chunk in uploaded_file.chunks():
-                tmp_file.write(chunk)
-            tmp_pdf_path = tmp_file.name
-
-            return tmp_pdf_path
+        with METRICS.span("save_pdf"):
+            return self.upload_store.save(uploaded_file)
 
     def extract_text(self, pdf_path):
         """
         Extracts the texts from each page of the PDF and returns a list of Strings.
+        - Results are memoized per PDF path and modification time, so repeated calls on the same upload are free.
+        - With extract_workers > 1, long PDFs are split in page ranges extracted by a process pool.
         """
+        key = _file_key(pdf_path)
+        texts = self.text_cache.get(key)
+        if texts is not None:
+            METRICS.incr("extract_text_cache_hits")
+            return list(texts)
+
+        with METRICS.span("extract_text"):
+            doc = fitz.open(pdf_path)
+            page_count = len(doc)
+
+            if self.extract_workers > 1 and page_count >= 2 * MIN_PAGES_PER_WORKER:
+                doc.close()
+                texts = self._extract_text_parallel(pdf_path, page_count)
+            else:
+                texts = []
+                for page in doc:
+                    raw_text = page.get_text()
+                    clean_text = self.clean_page_text(raw_text)
+                    texts.append(clean_text)
+                doc.close()
+
+        self.text_cache.set(key, texts)
+        METRICS.incr("pages_extracted", len(texts))
+        return list(texts)
+
+    def _extract_text_parallel(self, pdf_path, page_count):
+        workers = min(self.extract_workers, page_count // MIN_PAGES_PER_WORKER)
+        shard_size = -(-page_count // workers)
+        ranges = [(start, min(start + shard_size, page_count)) for start in range(0, page_count, shard_size)]
+
+        executor = _extract_executor(self.extract_workers)
+        futures = [executor.submit(_extract_page_range, pdf_path, start, end) for start, end in ranges]
 
-        doc = fitz.open(pdf_path)
         texts = []
-        for page in doc:
-            raw_text = page.get_text()
-            clean_text = self.clean_page_text(raw_text)
-            texts.append(clean_text)
+        for future in futures:
+            texts.extend(future.result())
         return texts
     
     def clean_page_text(self, text):
-        lines = text.splitlines()
-        merged = []
-        
-        for i, line in enumerate(lines):
-            line = line.strip()
-            if not line:
-                merged.append("")
-                continue
-
-            if i + 1 < len(lines) and not re.match(r".*[\.\:\!\?]\s*$", line):
-                next_line = lines[i+1].strip()
-                line += " " + next_line
-                lines[i+1] = ""
-            merged.append(line)
-
+        """
+        Joins lines broken in the middle of a sentence and collapses runs of blank lines.
+        A line that doesn't end with . : ! or ? is joined with the next one, which becomes a blank line.
+        Runs in a single pass over the stripped lines.
+        """
+        lines = [line.strip() for line in text.splitlines()]
+        line_count = len(lines)
         cleaned = []
+        append = cleaned.append
         last_blank = False
-        for line in merged:
-            if line == "":
+        i = 0
+
+        while i < line_count:
+            line = lines[i]
+            if not line:
                 if not last_blank:
-                    cleaned.append(line)
+                    append("")
+                    last_blank = True
+                i += 1
+            elif i + 1 < line_count and line[-1] not in _SENTENCE_ENDINGS:
+                append(line + " " + lines[i + 1])
+                append("")
                 last_blank = True
+                i += 2
             else:
-                cleaned.append(line)
+                append(line)
                 last_blank = False
+                i += 1
 
         return "\n".join(cleaned)
     
@@ -81,6 +122,10 @@ class PDFUtils:
         """
         Highlights the specified texts in the PDF and saves it to a new file.
         """
+        with METRICS.span("highlight_pdf"):
+            return self._highligh_pdf(input_pdf_path, requirements_by_page)
+
+    def _highligh_pdf(self, input_pdf_path, requirements_by_page):
         doc = fitz.open(input_pdf_path)
         color_by_text = {}
         text_to_requirement = {}
@@ -98,29 +143,39 @@ class PDFUtils:
                 text_to_requirement[key].append((requirement_counter, requirement))
                 requirement_counter += 1
         
+        texts_by_page = {}
         for (page_number, text), requirement_list in text_to_requirement.items():
+            texts_by_page.setdefault(page_number, []).append((text, requirement_list))
+
+        file_key = _file_key(input_pdf_path)
+        for page_number, page_texts in texts_by_page.items():
             if page_number > len(doc):
                 continue
             page = doc[page_number - 1]
-            text_instances = page.search_for(text)
-            if not text_instances:
-                continue
+            word_index = PageWordIndex(page, self.words_cache.get(file_key, page_number, page))
+            writer = HighlightWriter(page, style=self.highlight_style)
+
+            for text, requirement_list in page_texts:
+                text_instances = word_index.find(text)
+                if not text_instances:
+                    # Text the word index can't match (e.g. split inside a word): search the page
+                    text_instances = page.search_for(text)
+                    METRICS.incr("highlight_page_searches")
+                if not text_instances:
+                    continue
 
-            if text not in color_by_text:
-                color_by_text[text] = random.choice(self.pre_defined_colors)
-            color = color_by_text[text]
+                if text not in color_by_text:
+                    color_by_text[text] = random.choice(self.pre_defined_colors)
+                color = color_by_text[text]
 
-            requirement_numbers = [str(num) for num, _ in requirement_list]
-            note = f"Requirements: {','.join(requirement_numbers)}"
+                requirement_numbers = [str(num) for num, _ in requirement_list]
+                note = f"Requirements: {','.join(requirement_numbers)}"
+                writer.add(text_instances, color, note)
 
-            for text_instance in text_instances:
-                annot = page.add_rect_annot(text_instance)
-                annot.set_colors(stroke=color, fill=color)
-                annot.set_opacity(0.4)
-                annot.set_info({"title": "Requirement", "content": note})
-                annot.update()
+            METRICS.incr("annotations_written", writer.write())
 
-        self.append_summary_page(doc, requirements_by_page, color_by_text)
+        with METRICS.span("summary_page"):
+            self.append_summary_page(doc, requirements_by_page, color_by_text)
         
     
         dest_path = os.path.join(settings.MEDIA_ROOT, "highlighted", f"highlighted_{uuid.uuid4().hex}.pdf")
@@ -231,25 +286,28 @@ class PDFUtils:
         lead = 1.35  # line height factor
 
         # Nova página + cabeçalho
+        # O texto de cada página é acumulado num Shape e gravado uma única vez, em add_footer
         def new_page():
             p = doc.new_page(-1)
-            p.insert_text((margin_left, margin_top - 10), "GENERATED REQUIREMENTS", fontsize=title_fs, fontname="Times-Roman")
-            return p, margin_top + 20  # y inicial após o título
+            s = p.new_shape()
+            s.insert_text((margin_left, margin_top - 10), "GENERATED REQUIREMENTS", fontsize=title_fs, fontname="Times-Roman")
+            return p, s, margin_top + 20  # y inicial após o título
 
-        page, y = new_page()
+        page, shape, y = new_page()
         page_w, page_h = page.rect.width, page.rect.height
         text_w = page_w - margin_left - margin_right
         line_h_body = body_fs * lead
         line_h_head = head_fs * lead
 
         # footer opcional com número da página
-        def add_footer(p):
+        def add_footer(p, s):
             try:
                 idx = p.number + 1
             except Exception:
                 idx = len(doc)
             footer_y = page_h - 25
-            p.insert_text((page_w/2 - 10, footer_y), f"{idx}", fontsize=9, fontname="Times-Roman")
+            s.insert_text((page_w/2 - 10, footer_y), f"{idx}", fontsize=9, fontname="Times-Roman")
+            s.commit()
 
         for row in rows:
             # Bloco: cabeçalho
@@ -257,10 +315,10 @@ class PDFUtils:
             # Quebra de página se necessário (espaço para header + 2 linhas mínimas de corpo)
             min_block = int(line_h_head + 2*line_h_body + 20)
             if y + min_block > page_h - margin_bottom:
-                add_footer(page)
-                page, y = new_page()
+                add_footer(page, shape)
+                page, shape, y = new_page()
 
-            page.insert_text((margin_left, y), header, fontsize=head_fs, fontname="Times-Roman")
+            shape.insert_text((margin_left, y), header, fontsize=head_fs, fontname="Times-Roman")
             y += line_h_head
 
             # Corpo (parágrafo com wrap)
@@ -268,20 +326,20 @@ class PDFUtils:
             lines = self._wrap_lines(page, body, text_w, fontsize=body_fs, fontname="Times-Roman")
             for ln in lines:
                 if y + line_h_body > page_h - margin_bottom:
-                    add_footer(page)
-                    page, y = new_page()
-                page.insert_text((margin_left, y), ln, fontsize=body_fs, fontname="Times-Roman")
+                    add_footer(page, shape)
+                    page, shape, y = new_page()
+                shape.insert_text((margin_left, y), ln, fontsize=body_fs, fontname="Times-Roman")
                 y += line_h_body
 
             # Metadados
             meta = f"Page: {row['page']} | Confidence: {round(row['confidence']*100, 2)}% | Classified by: {row['classified_by']}"
             if y + line_h_body > page_h - margin_bottom:
-                add_footer(page)
-                page, y = new_page()
-            page.insert_text((margin_left, y), meta, fontsize=10, fontname="Times-Roman")
+                add_footer(page, shape)
+                page, shape, y = new_page()
+            shape.insert_text((margin_left, y), meta, fontsize=10, fontname="Times-Roman")
             y += line_h_body + 10  # espaçamento entre blocos
 
-        add_footer(page)
+        add_footer(page, shape)
 
 
     def _page_size(self, doc):
@@ -297,66 +355,125 @@ class PDFUtils:
 
     def _wrap_lines(self, page, text, max_width, fontsize=10, fontname="Times-Roman"):
         """
-        Quebra 'text' em linhas que caibam em 'max_width' medindo cada tentativa.
+        Quebra 'text' em linhas que caibam em 'max_width' (ver text_layout.wrap_text).
         Retorna lista de strings (linhas).
         """
-        words = text.split()
-        lines, cur = [], ""
-        for w in words:
-            test = (cur + " " + w).strip()
-            if self._text_width(page, test, fontsize=fontsize, fontname=fontname) <= max_width:
-                cur = test
-            else:
-                if cur:
-                    lines.append(cur)
-                cur = w
-        if cur:
-            lines.append(cur)
-        # preserva linhas em branco (parágrafos) se houver
-        out = []
-        for para in text.split("\n"):
-            if not para.strip():
-                out.append("")  # linha em branco
-            else:
-                # re-wrap para cada parágrafo
-                words = para.split()
-                cur = ""
-                for w in words:
-                    test = (cur + " " + w).strip()
-                    if self._text_width(page, test, fontsize=fontsize, fontname=fontname) <= max_width:
-                        cur = test
-                    else:
-                        if cur:
-                            out.append(cur)
-                        cur = w
-                if cur:
-                    out.append(cur)
-        return [ln for ln in out]
+        return wrap_text(text, max_width, fontsize=fontsize, fontname=fontname)
 
     def _text_width(self, page, s, fontsize=10, fontname="Times-Roman"):
         """
-        Mede a largura do texto compatível com várias versões do PyMuPDF
-        e com fallback de fonte (Times-Roman) e aproximação final.
+        Mede a largura do texto com as larguras de caractere em cache da fonte
+        (fallback para Times-Roman e, por último, aproximação monoespaçada).
         """
-        # 1) tenta medir com a fonte pedida
-        try:
-            return page.get_text_length(s, fontsize=fontsize, fontname=fontname)
-        except Exception:
-            pass
-        try:
-            return fitz.get_text_length(s, fontsize=fontsize, fontname=fontname)
-        except Exception:
-            pass
-
-        # 2) fallback de fonte garantida
-        try:
-            return page.get_text_length(s, fontsize=fontsize, fontname="Times-Roman")
-        except Exception:
-            pass
-        try:
-            return fitz.get_text_length(s, fontsize=fontsize, fontname="Times-Roman")
-        except Exception:
-            pass
-
-        # 3) última linha de defesa: aproximação monoespaçada
-        return len(s) * fontsize * 0.5
+        return font_metrics(fontname).text_width(s, fontsize=fontsize)
+
+
+# Characters that end a line of text without joining it to the next one
+_SENTENCE_ENDINGS = frozenset(".:!?")
+
+# Smallest number of pages worth sending to an extraction worker
+MIN_PAGES_PER_WORKER = 16
+
+_EXTRACT_EXECUTOR = None
+_EXTRACT_EXECUTOR_LOCK = threading.Lock()
+
+
+class ExtractedTextCache:
+    """
+    In-memory LRU of extracted page texts, keyed by PDF path, modification time and size.
+    """
+
+    def __init__(self, max_entries=16):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def set(self, key, texts):
+        with self._lock:
+            self._entries[key] = list(texts)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+EXTRACTED_TEXTS = ExtractedTextCache(settings.PDF_TEXT_CACHE_SIZE)
+
+
+class PageWordsCache:
+    """
+    In-memory LRU of the words of PDF pages (page.get_text("words")), kept per PDF like ExtractedTextCache,
+    so highlighting an upload again doesn't parse its pages again.
+    """
+
+    def __init__(self, max_documents=16):
+        self.max_documents = max_documents
+        self._documents = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, page_number, page):
+        """
+        Returns the words of 'page' (page 'page_number' of the PDF keyed by 'key'), parsing it only once.
+        """
+        with self._lock:
+            pages = self._documents.get(key)
+            if pages is not None:
+                self._documents.move_to_end(key)
+                if page_number in pages:
+                    METRICS.incr("page_words_cache_hits")
+                    return pages[page_number]
+
+        words = page.get_text("words")
+
+        with self._lock:
+            self._documents.setdefault(key, {})[page_number] = words
+            self._documents.move_to_end(key)
+            while len(self._documents) > self.max_documents:
+                self._documents.popitem(last=False)
+        return words
+
+
+PAGE_WORDS = PageWordsCache(settings.PDF_TEXT_CACHE_SIZE)
+
+
+def _file_key(pdf_path):
+    stat = os.stat(pdf_path)
+    return (os.path.abspath(pdf_path), stat.st_mtime_ns, stat.st_size)
+
+
+def _extract_executor(max_workers):
+    """
+    Process pool shared by every PDFUtils. Workers are spawned rather than forked,
+    since the web process may already hold threads and loaded models.
+    """
+    global _EXTRACT_EXECUTOR
+    with _EXTRACT_EXECUTOR_LOCK:
+        if _EXTRACT_EXECUTOR is None:
+            _EXTRACT_EXECUTOR = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _EXTRACT_EXECUTOR
+
+
+def _extract_page_range(pdf_path, start, end):
+    """
+    Runs in an extraction worker: opens its own copy of the PDF and returns the cleaned
+    texts of pages [start, end).
+    """
+    pdf_utils = PDFUtils(extract_workers=1, text_cache=ExtractedTextCache(0))
+    doc = fitz.open(pdf_path)
+    try:
+        return [pdf_utils.clean_page_text(doc[page_index].get_text()) for page_index in range(start, end)]
+    finally:
+        doc.close()
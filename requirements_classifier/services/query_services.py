@@ -0,0 +1,127 @@
+import datetime
+from django.db.models import Count, F, Q, Value
+from django.db.models.functions import Coalesce, NullIf
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from ..models import Requirements
+from .requirements_classifier import nfLabelMap
+
+MAX_PAGE_SIZE = 500
+
+AGGREGATE_GROUPS = ("classification", "classification_ai", "page")
+
+REQUIREMENT_FIELDS = [
+    "id", "text", "classification_ai", "confidence_ai", "classification_user",
+    "original_text", "match_score", "page", "created_at",
+]
+
+
+def filter_requirements(params):
+    """
+    Builds the Requirements queryset for the filters of a request:
+    project (document name), classification (user classification if any, otherwise the AI one),
+    page, created_after and created_before (ISO dates or datetimes).
+    Raises ValueError for malformed values.
+    """
+    queryset = Requirements.objects.all()
+
+    if params.get("project"):
+        queryset = queryset.filter(project__document_name=params["project"])
+    if params.get("classification"):
+        # Spelled out instead of filtering on the effective classification, so both indexes can be used
+        queryset = queryset.filter(
+            Q(classification_user=params["classification"])
+            | Q(classification_user="", classification_ai=params["classification"])
+        )
+    if params.get("page"):
+        queryset = queryset.filter(page=_parse_int(params["page"], "page"))
+    if params.get("created_after"):
+        queryset = queryset.filter(created_at__gte=_parse_datetime(params["created_after"], "created_after"))
+    if params.get("created_before"):
+        queryset = queryset.filter(created_at__lt=_parse_datetime(params["created_before"], "created_before"))
+
+    return queryset
+
+
+def list_requirements(params, page_size=100):
+    """
+    Returns one page of the filtered requirements in id order, using keyset pagination:
+    the response carries 'next_cursor' (the last id), which is sent back as 'cursor' for the next page.
+    Every page costs the same index range scan, however deep the client goes.
+    """
+    limit = min(_parse_int(params.get("limit", page_size), "limit"), MAX_PAGE_SIZE)
+    if limit < 1:
+        raise ValueError("'limit' must be positive")
+
+    queryset = filter_requirements(params)
+    if params.get("cursor"):
+        queryset = queryset.filter(id__gt=_parse_int(params["cursor"], "cursor"))
+
+    rows = list(
+        queryset.order_by("id")
+        .annotate(project_name=F("project__document_name"))
+        .values(*REQUIREMENT_FIELDS, "project_name")[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    for row in rows:
+        row["project"] = row.pop("project_name")
+
+    return {
+        "results": rows,
+        "next_cursor": rows[-1]["id"] if has_more else None
+    }
+
+
+def aggregate_requirements(params):
+    """
+    Counts the filtered requirements per document and per 'group_by':
+    classification (the effective one), classification_ai or page.
+    nf_only=1 only counts the non-functional classes.
+    """
+    group_by = params.get("group_by", "classification")
+    if group_by not in AGGREGATE_GROUPS:
+        raise ValueError(f"'group_by' must be one of: {', '.join(AGGREGATE_GROUPS)}")
+
+    queryset = filter_requirements(params).annotate(classification=_effective_classification())
+    if params.get("nf_only", "").lower() in ("1", "true"):
+        queryset = queryset.filter(
+            Q(classification__startswith="NF - ") | Q(classification__in=list(nfLabelMap.values()))
+        )
+
+    counts = (
+        queryset.values("project__document_name", group_by)
+        .annotate(count=Count("id"))
+        .order_by("project__document_name", group_by)
+    )
+
+    return [
+        {"project": row["project__document_name"], group_by: row[group_by], "count": row["count"]}
+        for row in counts
+    ]
+
+
+def _effective_classification():
+    # classification_user is saved as "" when the user kept the AI classification
+    return Coalesce(NullIf("classification_user", Value("")), "classification_ai")
+
+
+def _parse_int(value, name):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"'{name}' must be an integer")
+
+
+def _parse_datetime(value, name):
+    parsed = parse_datetime(value)
+    if parsed is None:
+        date = parse_date(value)
+        if date is not None:
+            parsed = datetime.datetime.combine(date, datetime.time.min)
+    if parsed is None:
+        raise ValueError(f"'{name}' must be an ISO date or datetime")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
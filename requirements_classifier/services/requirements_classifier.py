@@ -1,16 +1,15 @@
-import torch
+import os
 import re
-import nltk
-from sentence_transformers import SentenceTransformer, util
-from nltk.tokenize.punkt import PunktSentenceTokenizer, PunktParameters
+from collections import OrderedDict
 from .pdf_services import PDFUtils
-from requirements_classifier.ai.networks import load_phi4_model, load_multitask_classifier, generate_requirements
+from requirements_classifier.ai.registry import MODEL_REGISTRY
+from .metrics import METRICS
 import requests
 import re
 from config.settings import BASE_DIR
 
-# Definir dispositivo para GPU
-device = "cuda" if torch.cuda.is_available() else "cpu"
+# torch, transformers and sentence-transformers are only imported when a model is
+# actually used, so importing the app (manage.py commands, migrations, tests) stays fast.
 
 ####
 # Label IA
@@ -37,6 +36,11 @@ nfLabelMap = {
     "LABEL_10": "NF - Maintenability"
 }
 
+# How requirements are generated for each page:
+# - separate: one generation with user_prompt and another with system_prompt.
+# - combined: a single generation with combined_prompt, which returns both as JSON sections.
+GENERATION_MODES = ("separate", "combined")
+
 class RequirementsClassifier:
     """
     Class that:
@@ -51,20 +55,73 @@ class RequirementsClassifier:
                  phi4_model_path, 
                  multitask_model_name, 
                  multitask_bin_path, 
-                 multitask_tokenizer_path
+                 multitask_tokenizer_path,
+                 classify_batch_size=32,
+                 index_cache_size=8,
+                 generation_cache_size=1024,
+                 generation_batch_size=8,
+                 generation_mode="separate",
+                 page_chunking=False,
+                 chunk_max_tokens=1024,
+                 chunk_min_words=20,
+                 reuse_prompt_prefix=True,
+                 classifier_backend="eager",
+                 registry=None,
+                 inference_client=None,
+                 micro_batch_size=32,
+                 micro_batch_wait_ms=0,
+                 phi4_profile="auto"
                  ):
         
-        self.phi4_pipeline = load_phi4_model(phi4_model_path)
-        self.multitask_tokenizer, self.multitask_model = load_multitask_classifier(
-            model_name=multitask_model_name,
-            bin_path=multitask_bin_path,
-            tokenizer_path=multitask_tokenizer_path
-        )
+        self.phi4_model_path = phi4_model_path
+        self.phi4_profile = phi4_profile
+        self.multitask_model_name = multitask_model_name
+        self.multitask_bin_path = multitask_bin_path
+        self.multitask_tokenizer_path = multitask_tokenizer_path
+        self.classifier_backend = classifier_backend
+        self.embedding_model_name = "all-MiniLM-L6-v2"
+
+        self.registry = registry or MODEL_REGISTRY
+        # With an inference client, generation, classification and embeddings run in the
+        # inference server process and this one never loads the models
+        self.inference_client = inference_client
+        self._remote_embedding_model = None
+        self.reuse_prompt_prefix = reuse_prompt_prefix
+        self.generation_batch_size = generation_batch_size
+
+        if generation_mode not in GENERATION_MODES:
+            raise ValueError(f"Unknown generation mode '{generation_mode}'. Expected one of: {', '.join(GENERATION_MODES)}")
+        self.generation_mode = generation_mode
+
+        self.page_chunking = page_chunking
+        self.chunk_max_tokens = chunk_max_tokens
+        self.chunk_min_words = chunk_min_words
+
+        self._phi4_key = f"phi4:{phi4_model_path}:{phi4_profile}"
+        self._prefix_cache_key = f"phi4-prefix-cache:{phi4_model_path}"
+        self._generation_cache_key = f"phi4-generation-cache:{phi4_model_path}"
+        self._multitask_key = f"multitask:{multitask_model_name}:{multitask_bin_path}:{classifier_backend}"
+        self._embedding_key = f"embedding:{self.embedding_model_name}"
+
+        self.registry.register(self._phi4_key, lambda: _load_phi4(phi4_model_path, phi4_profile))
+        self.registry.register(self._prefix_cache_key, lambda: _load_prefix_cache(self.phi4_pipeline))
+        self.registry.register(self._generation_cache_key, lambda: _load_generation_cache(generation_cache_size))
+        self.registry.register(self._multitask_key, lambda: _load_multitask(
+            multitask_model_name, multitask_bin_path, multitask_tokenizer_path, classifier_backend
+        ))
+        self.registry.register(self._embedding_key, lambda: _load_embedding_model(self.embedding_model_name))
+
+        self.classify_batch_size = classify_batch_size
+
+        # Concurrent small classify and encode calls (e.g. manual requirements added by several
+        # reviewers at once) are merged into one forward pass, see MicroBatcher
+        from .micro_batcher import MicroBatcher
+        self._classify_batcher = MicroBatcher(self._classify_now, "classify", micro_batch_size, micro_batch_wait_ms)
+        self._embed_batcher = MicroBatcher(self._encode_now, "embed", micro_batch_size, micro_batch_wait_ms)
+        self.index_cache_size = index_cache_size
+        self._document_indexes = OrderedDict()
 
         self.pdf_utils = PDFUtils()
-        self.embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
-        
-        nltk.download("punkt")
 
         # env = environ.Env()
 
@@ -106,6 +163,102 @@ class RequirementsClassifier:
         End each requirement only with a dot.
         """
 
+        self.combined_prompt = """
+        Extract information and generate both user and system software requirements explicitly from the document.
+        The user is a person who benefits from the system being developed.
+        The system is a set of interacting components that work together to achieve a specific goal or fulfill a defined purpose.
+
+        Follow these steps strictly:
+
+        1. Identify potential software requirements from the text.
+        2. For user requirements, identify the user who benefits, the objective and, explicitly from the text, the reason.
+        3. Structure each user requirement exactly as: “As a <user>, I want to <objective> for <reason>”.
+           Ignore technical aspects of the system in user requirements.
+        4. For system requirements, identify the type of system or entity and classify clearly if the feature
+           is mandatory ("shall") or desirable ("must").
+        5. Structure each system requirement exactly as: “The <system/entity> shall/must <feature> <description>”.
+           System requirements must explicitly include technical aspects.
+        6. Ensure each requirement is concise, clearly described and no longer than two sentences.
+
+        Answer only with a JSON object in this format:
+        {"user_requirements": ["As a ...", ...], "system_requirements": ["The ...", ...]}
+        """
+
+    @property
+    def phi4_pipeline(self):
+        return self.registry.get(self._phi4_key)
+
+    @property
+    def prefix_cache(self):
+        if not self.reuse_prompt_prefix:
+            return None
+        return self.registry.get(self._prefix_cache_key)
+
+    @property
+    def generation_cache(self):
+        return self.registry.get(self._generation_cache_key)
+
+    @property
+    def multitask_tokenizer(self):
+        return self.registry.get(self._multitask_key)[0]
+
+    @property
+    def multitask_model(self):
+        return self.registry.get(self._multitask_key)[1]
+
+    @property
+    def embedding_model(self):
+        if self.inference_client is not None:
+            if self._remote_embedding_model is None:
+                from requirements_classifier.ai.inference_client import RemoteEmbeddingModel
+                self._remote_embedding_model = RemoteEmbeddingModel(self.inference_client)
+            return self._remote_embedding_model
+        return self.registry.get(self._embedding_key)
+
+    def override_model(self, kind, loader):
+        """
+        Replaces the loader of one of the models ('phi4', 'multitask' or 'embedding'),
+        e.g. with a stub. 'multitask' loaders return a (tokenizer, model) tuple.
+        """
+        keys = {
+            "phi4": self._phi4_key,
+            "multitask": self._multitask_key,
+            "embedding": self._embedding_key
+        }
+        self.registry.register(keys[kind], loader, replace=True)
+        if kind == "phi4":
+            self.registry.unload([self._prefix_cache_key, self._generation_cache_key])
+
+    def model_keys(self):
+        return [
+            self._phi4_key,
+            self._prefix_cache_key,
+            self._generation_cache_key,
+            self._multitask_key,
+            self._embedding_key
+        ]
+
+    def warm_up(self):
+        """
+        Loads every model used by the classifier, so the first request doesn't pay for it.
+        With an inference client, only checks that the inference server answers.
+        """
+        if self.inference_client is not None:
+            self.inference_client.health()
+            return
+
+        keys = self.model_keys()
+        if not self.reuse_prompt_prefix:
+            keys.remove(self._prefix_cache_key)
+        self.registry.warm_up(keys)
+
+    def unload(self):
+        """
+        Releases the models used by the classifier. They are loaded again on next use.
+        """
+        self.registry.unload(self.model_keys())
+        self._document_indexes.clear()
+
     def search_web(self, text, k=3):
         url = "https://serpapi.com/search"
         params = {
@@ -212,59 +365,238 @@ class RequirementsClassifier:
 
     
     def process_pdf(self, pdf_path):
+        return self.analyze_pdf(pdf_path)["results"]
+
+    def analyze_pdf(self, pdf_path):
+        """
+        Runs the whole pipeline on a PDF and returns everything it produced:
+        the extracted page texts, the raw LLM outputs per page and the classified requirements.
+        Each generation records the [start, end) slice of the results it produced (see page_results).
+        """
+        # Uploads being processed are kept out of the upload store cleanup
+        with self.pdf_utils.upload_store.lease(pdf_path):
+            return self._analyze_pdf(pdf_path)
+
+    def _analyze_pdf(self, pdf_path):
         page_texts = self.pdf_utils.extract_text(pdf_path=pdf_path)
-        flat_results = []
+        document_index = self.get_document_index(pdf_path, page_texts)
+        pages = []
+        generations = []
+
+        chunks = self.schedule_pages(page_texts)
+        page_generations = self.generate_pages_requirements([chunk.text for chunk in chunks])
+
+        results_count = 0
+        for chunk, (user_req_text, system_req_text) in zip(chunks, page_generations):
+            candidates = self.extract_candidates([user_req_text, system_req_text])
+            pages.append((_chunk_pages(chunk), chunk.text, candidates))
+
+            # classify_pages returns one result per candidate, in order
+            generations.append({
+                "page": chunk.pages[0],
+                "pages": chunk.pages,
+                "user": user_req_text,
+                "system": system_req_text,
+                "results": [results_count, results_count + len(candidates)]
+            })
+            results_count += len(candidates)
+
+        results = self.classify_pages(pages, document_index)
+        METRICS.incr("pages_processed", len(pages))
+
+        return {
+            "page_texts": page_texts,
+            "generations": generations,
+            "results": results
+        }
 
-        for page_number, page_content in enumerate(page_texts, start=1):
-            if page_content and page_content.strip():
-                page_reqs = self.process_page(page_content, page_number)
-                flat_results.extend(page_reqs)
+    def iter_pdf(self, pdf_path, page_texts=None, chunks=None):
+        """
+        Processes a PDF page by page, yielding each page as soon as it is done, as a dict with
+        the page number, its raw LLM outputs ('generation') and its classified requirements.
+        Pages are scheduled by schedule_pages ('chunks' can be given if already scheduled);
+        'page' is the first page of merged pages and 'pages' all of them.
+        Pages are generated one at a time (reusing the system prompt KV cache), so
+        'generation_batch_size' doesn't apply here: it only batches analyze_pdf.
+        """
+        with self.pdf_utils.upload_store.lease(pdf_path):
+            if page_texts is None:
+                page_texts = self.pdf_utils.extract_text(pdf_path=pdf_path)
+            if chunks is None:
+                chunks = self.schedule_pages(page_texts)
+            document_index = self.get_document_index(pdf_path, page_texts)
+
+            for chunk in chunks:
+                generation, results = self.analyze_page(_chunk_pages(chunk), chunk.text, document_index)
+                yield {"page": chunk.pages[0], "pages": chunk.pages, "generation": generation, "results": results}
+
+    def analyze_page(self, page_number, page_content, document_index):
+        """
+        Generates, classifies and matches the requirements of a single page.
+        'page_number' can also be a list of the pages merged in 'page_content'.
+        Returns the raw LLM outputs of the page and its classified requirements.
+        """
+        user_req_text, system_req_text = self.generate_page_requirements(page_content)
+        pages = page_number if isinstance(page_number, list) else [page_number]
+        generation = {"page": pages[0], "pages": pages, "user": user_req_text, "system": system_req_text}
 
-        return flat_results
+        candidates = self.extract_candidates([user_req_text, system_req_text])
+        results = self.classify_pages([(page_number, page_content, candidates)], document_index)
+        METRICS.incr("pages_processed")
 
-    def find_most_similar(self, sentence, page_texts):
-        punkt_params = PunktParameters()
-        sentence_splitter = PunktSentenceTokenizer(punkt_params)
+        return generation, results
+
+    def cache_identity(self):
+        """
+        Everything besides the PDF itself that changes the output of the pipeline.
+        Used to key cached results.
+        """
+        return {
+            **self.model_identity(),
+            "generation_mode": self.generation_mode,
+            "prompts": self.generation_prompts(),
+            "page_chunking": [self.chunk_max_tokens, self.chunk_min_words] if self.page_chunking else None
+        }
 
-        best_match = {
-            "original_text": "",
-            "match_score": 0.0,
-            "page": None
+    def model_identity(self):
+        """
+        The models the pipeline runs, as part of cache_identity().
+        With an inference client, those of the inference server, since this process may not have the weights.
+        """
+        if self.inference_client is not None:
+            return self.inference_client.model_identity()
+
+        try:
+            bin_mtime = os.path.getmtime(self.multitask_bin_path)
+        except OSError:
+            bin_mtime = None
+
+        return {
+            "phi4_model": self.phi4_model_path,
+            "phi4_profile": self.phi4_profile,
+            "multitask_model": self.multitask_model_name,
+            "multitask_bin": [os.path.basename(self.multitask_bin_path), bin_mtime],
+            "classifier_backend": self.classifier_backend,
+            "embedding_model": self.embedding_model_name
         }
 
-        req_embedding = self.embedding_model.encode(sentence, convert_to_tensor=True)
+    def schedule_pages(self, page_texts):
+        """
+        Splits the pages of a document into the chunks requirements are generated from (see PageScheduler).
+        Without page chunking, every page with text is a chunk of its own.
+        """
+        from .page_scheduler import PageChunk, PageScheduler
 
-        for page_number, page_content in enumerate(page_texts, start=1):
-            sentences = sentence_splitter.tokenize(page_content)
-            sentences = [s.strip() for s in sentences if s.strip()]
-            if not sentences:
-                continue
-            
-            embeddings = self.embedding_model.encode(sentences, convert_to_tensor=True)
-            similarities = util.pytorch_cos_sim(req_embedding, embeddings)[0]
-            idx = similarities.argmax().item()
-            score = float(similarities[idx])
-
-            if score > best_match["match_score"]:
-                best_match = {
-                    "original_text": sentences[idx],
-                    "match_score": round(score, 4),
-                    "page": page_number
-                }
-
-        return best_match
+        if not self.page_chunking:
+            return [
+                PageChunk([page_number], page_content)
+                for page_number, page_content in enumerate(page_texts, start=1)
+                if page_content and page_content.strip()
+            ]
+
+        with METRICS.span("page_scheduling"):
+            return PageScheduler(self.chunk_max_tokens, self.chunk_min_words).schedule(page_texts)
+
+    def get_document_index(self, pdf_path, page_texts=None):
+        """
+        Returns the sentence-embedding index of a PDF, building it only the first time.
+        The most recently used indexes are kept in memory.
+        """
+        key = (pdf_path, os.path.getmtime(pdf_path))
+        if key in self._document_indexes:
+            self._document_indexes.move_to_end(key)
+            return self._document_indexes[key]
+
+        if page_texts is None:
+            page_texts = self.pdf_utils.extract_text(pdf_path)
+
+        document_index = self._build_index(page_texts)
+        self._document_indexes[key] = document_index
+        while len(self._document_indexes) > self.index_cache_size:
+            self._document_indexes.popitem(last=False)
+
+        return document_index
+
+    def _build_index(self, page_texts, first_page=1):
+        from .document_index import DocumentIndex
+
+        return DocumentIndex.build(page_texts, self.embedding_model, first_page=first_page)
+
+    def find_most_similar(self, sentence, page_texts):
+        document_index = self._build_index(page_texts)
+        req_embedding = self.encode([sentence])
+        return document_index.best_matches(req_embedding)[0]
     
-    def process_sentence(self, sentence):
-        encodings = self.multitask_tokenizer([sentence], truncation=True, padding= True, max_length=256, return_tensors="pt")
-        input_ids = encodings["input_ids"].to(device)
-        attention_mask = encodings["attention_mask"].to(device)
+    def encode(self, sentences):
+        """
+        L2-normalized embeddings of 'sentences', as a tensor.
+        """
+        with METRICS.span("embedding"):
+            return self._embed_batcher.submit(sentences)
 
-        with torch.no_grad():
-            out = self.multitask_model(input_ids=input_ids, attention_mask=attention_mask)
+    def _encode_now(self, sentences):
+        return self.embedding_model.encode(sentences, convert_to_tensor=True, normalize_embeddings=True)
 
-        logits_bin = out["logits_bin"].softmax(dim=1)[0]
-        logits_cat = out["logits_cat"].softmax(dim=1)[0]
+    def process_sentence(self, sentence):
+        return self.classify_batch([sentence])[0]
 
+    def classify_batch(self, sentences, batch_size=None):
+        """
+        Classifies many sentences with the multitask model.
+        Sentences are sorted by token length and padded per batch, so each forward pass
+        only pads up to its own longest sentence.
+        Returns one result dict per sentence, in the same order as the input.
+        Without an explicit 'batch_size', concurrent calls may be merged by the micro-batcher.
+        """
+        if not sentences:
+            return []
+
+        with METRICS.span("classification"):
+            if batch_size is None:
+                results = self._classify_batcher.submit(sentences)
+            else:
+                results = self._classify_now(sentences, batch_size)
+
+        METRICS.incr("sentences_classified", len(sentences))
+        return results
+
+    def _classify_now(self, sentences, batch_size=None):
+        if self.inference_client is not None:
+            return self.inference_client.classify(sentences)
+        return self._classify_batch(sentences, batch_size or self.classify_batch_size)
+
+    def _classify_batch(self, sentences, batch_size):
+        import torch
+
+        encodings = self.multitask_tokenizer(list(sentences), truncation=True, max_length=256)
+        order = sorted(range(len(sentences)), key=lambda i: len(encodings["input_ids"][i]))
+        results = [None] * len(sentences)
+
+        for start in range(0, len(order), batch_size):
+            batch_idx = order[start:start + batch_size]
+            batch = self.multitask_tokenizer.pad(
+                {
+                    "input_ids": [encodings["input_ids"][i] for i in batch_idx],
+                    "attention_mask": [encodings["attention_mask"][i] for i in batch_idx],
+                },
+                padding=True,
+                return_tensors="pt"
+            )
+            input_ids = batch["input_ids"].to(self.multitask_model.device)
+            attention_mask = batch["attention_mask"].to(self.multitask_model.device)
+
+            with torch.no_grad():
+                out = self.multitask_model(input_ids=input_ids, attention_mask=attention_mask)
+
+            probs_bin = out["logits_bin"].softmax(dim=1).cpu()
+            probs_cat = out["logits_cat"].softmax(dim=1).cpu()
+
+            for row, i in enumerate(batch_idx):
+                results[i] = self._build_result(sentences[i], probs_bin[row], probs_cat[row])
+
+        return results
+
+    def _build_result(self, sentence, logits_bin, logits_cat):
         label_bin_idx = logits_bin.argmax().item()
         type_req = labelMap.get(f"LABEL_{label_bin_idx}", "Unknown")
         confidence = round(logits_bin[label_bin_idx].item(), 4)
@@ -286,42 +618,241 @@ class RequirementsClassifier:
     def process_manual_requirement(self, sentence, pdf_path):
         result = self.process_sentence(sentence)
 
-        page_texts = self.pdf_utils.extract_text(pdf_path)
-        best_match = self.find_most_similar(sentence, page_texts)
+        document_index = self.get_document_index(pdf_path)
+        req_embedding = self.encode([sentence])
+        with METRICS.span("similarity"):
+            best_match = document_index.best_matches(req_embedding)[0]
 
         result.update(best_match)
         return result
     
     def process_page(self, page_content, page_number):
+        candidates = self.generate_candidates(page_content)
+        document_index = self._build_index([page_content], first_page=page_number)
+        return self.classify_pages([(page_number, page_content, candidates)], document_index)
 
-        user_req_text = generate_requirements(self.phi4_pipeline, page_content, self.user_prompt)
-        system_req_text = generate_requirements(self.phi4_pipeline, page_content, self.system_prompt)
+    def generate_candidates(self, page_content):
+        """
+        Generates user and system requirements for a page and returns the candidate sentences,
+        without duplicates, in the order they were generated.
+        """
+        return self.extract_candidates(self.generate_page_requirements(page_content))
 
-        all_requirements = []
+    def generation_prompts(self):
+        """
+        The prompts each page is generated with, in the current generation mode.
+        """
+        if self.generation_mode == "combined":
+            return [self.combined_prompt]
+        return [self.user_prompt, self.system_prompt]
+
+    def generate_page_requirements(self, page_content):
+        """
+        Returns the raw user and system requirement texts generated for a page.
+        """
+        conversations = [(page_content, prompt) for prompt in self.generation_prompts()]
+
+        with METRICS.span("generation"):
+            generated = self.generate_conversations(conversations, batched=False)
+
+        return self._split_generated(generated)
+
+    def generate_conversations(self, conversations, batched=True):
+        """
+        Returns the text generated for each (text, prompt) pair of 'conversations'.
+        - batched: generates them in batches of 'generation_batch_size' (see generate_requirements_batch);
+          otherwise one at a time, reusing the KV cache of the system prompts.
+        - With an inference client, the inference server generates them.
+        """
+        from requirements_classifier.ai.networks import generate_requirements, generate_requirements_batch
+
+        if self.inference_client is not None:
+            return self.inference_client.generate(conversations, batched=batched)
+
+        if batched and self.generation_batch_size > 1:
+            return generate_requirements_batch(
+                self.phi4_pipeline,
+                conversations,
+                generation_cache=self.generation_cache,
+                batch_size=self.generation_batch_size
+            )
+
+        return [
+            generate_requirements(
+                self.phi4_pipeline,
+                text,
+                prompt,
+                generation_cache=self.generation_cache,
+                prefix_cache=self.prefix_cache
+            )
+            for text, prompt in conversations
+        ]
+
+    def _split_generated(self, generated):
+        from requirements_classifier.ai.networks import parse_combined_requirements
+
+        if self.generation_mode == "combined":
+            return list(parse_combined_requirements(generated[0]))
+        return generated
+
+    def generate_pages_requirements(self, page_contents):
+        """
+        Returns the raw user and system requirement texts of many pages, generated in batches
+        of 'generation_batch_size' conversations.
+        With a batch size of 1, they are generated one at a time (see generate_conversations).
+        """
+        prompts = self.generation_prompts()
+        conversations = [(page_content, prompt) for page_content in page_contents for prompt in prompts]
+
+        with METRICS.span("generation"):
+            generated = self.generate_conversations(conversations)
+
+        return [self._split_generated(generated[i:i + len(prompts)]) for i in range(0, len(generated), len(prompts))]
+
+    def extract_candidates(self, req_texts):
+        """
+        Splits the generated texts into sentences and keeps the ones shaped like a requirement.
+        """
+        candidates = []
+        seen = set()
 
-        for req_texts in [user_req_text, system_req_text]:
-            sentences = re.split(r"\.\s*", req_texts)
+        for req_text in req_texts:
+            sentences = re.split(r"\.\s*", req_text)
             sentences = [s.strip() for s in sentences if s.strip()]
             for sentence in sentences:
                 if not re.match(r"^(As a |The )", sentence.strip(), re.IGNORECASE):
                     continue
 
-                result = self.process_sentence(sentence)
-                best_match = self.find_most_similar(sentence, [page_content])
+                txt = sentence.strip().lower()
+                if txt not in seen:
+                    seen.add(txt)
+                    candidates.append(sentence)
 
-                result.update(best_match)
-                result["page"] = page_number
+        return candidates
 
-                all_requirements.append(result)
+    def classify_pages(self, pages, document_index):
+        """
+        Classifies the candidates of several pages in a single batched pass and matches
+        each one to the most similar sentence of its page in 'document_index'.
+        'pages' is a list of (page_number, page_content, candidates) tuples. When 'page_number' is
+        a list of merged pages, each requirement is attributed to the page of its best match.
+        """
+        sentences = [sentence for _, _, candidates in pages for sentence in candidates]
+        if not sentences:
+            return []
 
-        unique_requirements = []
-        seen = set()
-        for req in all_requirements:
-            txt = req["requirement"].strip().lower()
-            if txt not in seen:
-                seen.add(txt)
-                unique_requirements.append(req)
-        
-        return unique_requirements
+        sentence_pages = [page_number for page_number, _, candidates in pages for _ in candidates]
+        classified = self.classify_batch(sentences)
+        req_embeddings = self.encode(sentences)
+        with METRICS.span("similarity"):
+            best_matches = document_index.best_matches(req_embeddings, pages=sentence_pages)
 
-    
+        all_requirements = []
+        for result, best_match, page_number in zip(classified, best_matches, sentence_pages):
+            result.update(best_match)
+            if isinstance(page_number, list):
+                page_number = best_match["page"] if best_match["page"] is not None else page_number[0]
+            result["page"] = page_number
+
+            all_requirements.append(result)
+
+        return all_requirements
+
+
+def build_classifier_from_settings(inference_address=""):
+    """
+    Returns the RequirementsClassifier configured by the Django settings.
+    With an 'inference_address', its models run in the inference server listening there.
+    """
+    from django.conf import settings
+
+    inference_client = None
+    if inference_address:
+        from requirements_classifier.ai.inference_client import InferenceClient
+        inference_client = InferenceClient(
+            inference_address,
+            timeout=settings.INFERENCE_SERVER_TIMEOUT,
+            identity_ttl=settings.INFERENCE_SERVER_IDENTITY_TTL
+        )
+
+    return RequirementsClassifier(
+        phi4_model_path="microsoft/phi-4-mini-instruct",
+        multitask_model_name="distilbert-base-uncased",
+        multitask_bin_path=str(settings.BASE_DIR / "requirements_classifier" / "distilbert" / "multitask_distilbert.bin"),
+        multitask_tokenizer_path=str(settings.BASE_DIR / "requirements_classifier" / "distilbert"),
+        classifier_backend=settings.CLASSIFIER_BACKEND,
+        generation_batch_size=settings.GENERATION_BATCH_SIZE,
+        generation_mode=settings.GENERATION_MODE,
+        page_chunking=settings.PAGE_CHUNKING,
+        chunk_max_tokens=settings.CHUNK_MAX_TOKENS,
+        chunk_min_words=settings.CHUNK_MIN_WORDS,
+        inference_client=inference_client,
+        micro_batch_size=settings.MICRO_BATCH_SIZE,
+        micro_batch_wait_ms=settings.MICRO_BATCH_WAIT_MS,
+        phi4_profile=settings.PHI4_PROFILE
+    )
+
+def append_page(analysis, page):
+    """
+    Adds a page yielded by iter_pdf to 'analysis' (a dict with 'generations' and 'results' lists),
+    recording in its generation the slice of the results it produced.
+    """
+    start = len(analysis["results"])
+    analysis["results"].extend(page["results"])
+    analysis["generations"].append(dict(page["generation"], results=[start, len(analysis["results"])]))
+
+def page_results(analysis):
+    """
+    Yields (generation, its results) for each generation of an analysis, in order.
+    A page split into several chunks has several generations, each with its own results.
+    """
+    results = analysis["results"]
+    replayed_pages = set()
+
+    for generation in analysis["generations"]:
+        if "results" in generation:
+            start, end = generation["results"]
+            yield generation, results[start:end]
+            continue
+
+        # Analyses cached before the slices were recorded: the results of its pages, once
+        pages = tuple(generation.get("pages", [generation["page"]]))
+        if pages in replayed_pages:
+            yield generation, []
+        else:
+            replayed_pages.add(pages)
+            yield generation, [result for result in results if result["page"] in pages]
+
+def _chunk_pages(chunk):
+    # Single pages keep a plain page number, merged pages the list of their page numbers
+    return chunk.pages[0] if len(chunk.pages) == 1 else chunk.pages
+
+def _load_phi4(model_path, profile):
+    from requirements_classifier.ai.networks import load_phi4_model
+
+    return load_phi4_model(model_path, profile)
+
+def _load_prefix_cache(phi_pipeline):
+    from requirements_classifier.ai.networks import PromptPrefixCache
+
+    return PromptPrefixCache(phi_pipeline)
+
+def _load_generation_cache(max_entries):
+    from requirements_classifier.ai.networks import GenerationCache
+
+    return GenerationCache(max_entries=max_entries)
+
+def _load_multitask(model_name, bin_path, tokenizer_path, backend):
+    from requirements_classifier.ai.networks import load_multitask_classifier
+
+    return load_multitask_classifier(
+        model_name=model_name,
+        bin_path=bin_path,
+        tokenizer_path=tokenizer_path,
+        backend=backend
+    )
+
+def _load_embedding_model(model_name):
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(model_name)
@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+import tempfile
+
+
+class ResultCache:
+    """
+    Content-addressed on-disk cache of processed PDFs.
+    - Each entry is a JSON file named after a hash of the PDF's SHA-256 plus the
+      prompts and model identifiers used to process it.
+    - Reading an entry refreshes its mtime; the least recently used entries are
+      evicted when the cache grows past 'max_bytes'.
+    """
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = str(cache_dir)
+        self.max_bytes = max_bytes
+
+    def make_key(self, pdf_path, identity, content_hash=None):
+        """
+        Builds the cache key of a PDF for the given processing identity (prompts, models...).
+        'content_hash' is the SHA-256 of the PDF, when already known (e.g. from the upload store).
+        """
+        if content_hash is None:
+            content_digest = hashlib.sha256()
+            with open(pdf_path, "rb") as pdf_file:
+                for chunk in iter(lambda: pdf_file.read(1024 * 1024), b""):
+                    content_digest.update(chunk)
+            content_hash = content_digest.hexdigest()
+
+        digest = hashlib.sha256(content_hash.encode("ascii"))
+        digest.update(json.dumps(identity, sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key):
+        """
+        Returns the cached entry for 'key', or None when it is missing or unreadable.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as entry_file:
+                entry = json.load(entry_file)
+        except (OSError, ValueError):
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def set(self, key, entry):
+        """
+        Stores 'entry' atomically and evicts old entries if the cache is over its size.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as tmp_file:
+                json.dump(entry, tmp_file)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self._evict()
+
+    def invalidate(self, key):
+        """
+        Removes the entry for 'key'. Returns True if there was one.
+        """
+        try:
+            os.remove(self._path(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _path(self, key):
+        if not key or not all(c in "0123456789abcdef" for c in key):
+            raise ValueError("Invalid cache key")
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".json"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    # Removed meanwhile by another worker's eviction or an invalidation
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
@@ -0,0 +1,118 @@
+import threading
+import fitz
+
+# Width of text in PyMuPDF's built-in fonts, measured once per character.
+#
+# fitz.get_text_length adds up the advance of each character (at font size 1) and multiplies
+# the sum by the font size. It steps through the string by the UTF-8 length of each character,
+# so a non-ASCII character makes it skip the characters that follow it. FontMetrics reproduces
+# that exactly, additions in the same order included, so widths are bit-identical to
+# get_text_length while each character is only measured once.
+
+
+class FontMetrics:
+    """
+    Cached per-character advances of a built-in font.
+    - advance(char) is the width of 'char' at font size 1.
+    - extend(state, text) adds 'text' to a measured line without measuring the line again.
+    """
+
+    def __init__(self, fontname="Times-Roman"):
+        self.fontname = fontname
+        self._glyphs = {}
+        self._lock = threading.Lock()
+
+    def advance(self, char):
+        return self._glyph(char)[0]
+
+    def text_width(self, text, fontsize=10):
+        return self.extend(LineWidth(), text).units * fontsize
+
+    def extend(self, state, text):
+        """
+        Returns the LineWidth of the line measured by 'state' followed by 'text'.
+        """
+        units = state.units
+        pos = state.overshoot
+        length = len(text)
+        while pos < length:
+            advance, step = self._glyph(text[pos])
+            units += advance
+            pos += step
+        return LineWidth(units, pos - length)
+
+    def _glyph(self, char):
+        glyph = self._glyphs.get(char)
+        if glyph is None:
+            glyph = (self._measure(char), len(char.encode("utf-8", "surrogatepass")))
+            with self._lock:
+                self._glyphs[char] = glyph
+        return glyph
+
+    def _measure(self, char):
+        for fontname in [self.fontname, "Times-Roman"]:
+            try:
+                return fitz.get_text_length(char, fontsize=1, fontname=fontname)
+            except Exception:
+                pass
+        # last resort: monospaced approximation
+        return 0.5
+
+
+class LineWidth:
+    """
+    Width of a line being laid out, in units of the font size, plus how many characters
+    past its end the measurement already stepped over (see FontMetrics).
+    """
+
+    __slots__ = ("units", "overshoot")
+
+    def __init__(self, units=0, overshoot=0):
+        self.units = units
+        self.overshoot = overshoot
+
+
+_FONT_METRICS = {}
+
+
+def font_metrics(fontname="Times-Roman"):
+    """
+    Returns the shared FontMetrics of 'fontname'.
+    """
+    metrics = _FONT_METRICS.get(fontname)
+    if metrics is None:
+        metrics = _FONT_METRICS.setdefault(fontname, FontMetrics(fontname))
+    return metrics
+
+
+def wrap_text(text, max_width, fontsize=10, fontname="Times-Roman"):
+    """
+    Greedily wraps each paragraph (line) of 'text' into lines no wider than 'max_width'.
+    Blank paragraphs are kept as empty lines; a single word wider than 'max_width' gets a line of its own.
+    Each word is measured once, by extending the width of the current line.
+    """
+    metrics = font_metrics(fontname)
+    out = []
+
+    for para in text.split("\n"):
+        if not para.strip():
+            out.append("")
+            continue
+
+        cur, cur_width = "", LineWidth()
+        for w in para.split():
+            if cur:
+                test, test_width = cur + " " + w, metrics.extend(cur_width, " " + w)
+            else:
+                test, test_width = w, metrics.extend(LineWidth(), w)
+
+            if test_width.units * fontsize <= max_width:
+                cur, cur_width = test, test_width
+            else:
+                if cur:
+                    out.append(cur)
+                cur, cur_width = w, metrics.extend(LineWidth(), w)
+        if cur:
+            out.append(cur)
+
+    return out
@@ -0,0 +1,199 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from django.conf import settings
+from .metrics import METRICS
+
+# Files used this recently are never evicted for size, since a job may still be reading them
+IN_USE_SECONDS = 600
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+class UploadStore:
+    """
+    Content-addressed store of the uploaded PDFs.
+    - save() streams an upload to disk while hashing it, and names the file after its SHA-256:
+      the same PDF uploaded again reuses the stored file, and with it every cache keyed by its path.
+    - Uploads larger than 'max_upload_bytes' are refused with UploadTooLarge.
+    - Files not used for 'ttl_seconds' are removed, and so are the least recently used ones
+      while the store is over 'max_bytes'. Cleanup runs after saves, at most every 'cleanup_interval' seconds.
+    - resolve() checks that a path sent back by a client is a stored upload, and marks it as used.
+    - lease() keeps an upload marked as used while it is being processed, however long that takes,
+      so neither this process nor another one evicts it meanwhile.
+    """
+
+    def __init__(self, upload_dir, ttl_seconds, max_bytes, max_upload_bytes, cleanup_interval=60):
+        self.upload_dir = os.path.abspath(str(upload_dir))
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.max_upload_bytes = max_upload_bytes
+        self.cleanup_interval = cleanup_interval
+        self._last_cleanup = 0
+        self._lock = threading.Lock()
+        self._leases = Counter()
+        self._lease_thread = None
+
+    def save(self, uploaded_file):
+        """
+        Stores an uploaded file and returns its path.
+        """
+        if uploaded_file.size is not None and uploaded_file.size > self.max_upload_bytes:
+            raise UploadTooLarge(self._too_large_message())
+
+        os.makedirs(self.upload_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.upload_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                for chunk in uploaded_file.chunks():
+                    size += len(chunk)
+                    if size > self.max_upload_bytes:
+                        raise UploadTooLarge(self._too_large_message())
+                    digest.update(chunk)
+                    tmp_file.write(chunk)
+
+            pdf_path = self._path(digest.hexdigest())
+            if os.path.exists(pdf_path):
+                # Already stored: keep the existing file (and its mtime, which keys the text caches)
+                os.remove(tmp_path)
+                METRICS.incr("upload_duplicates")
+            else:
+                os.replace(tmp_path, pdf_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self._mark_used(pdf_path)
+        self.cleanup()
+        return pdf_path
+
+    def resolve(self, pdf_path):
+        """
+        Returns the absolute path of a stored upload and marks it as used.
+        Raises FileNotFoundError when 'pdf_path' is not in the store (or has expired).
+        """
+        path = os.path.abspath(pdf_path)
+        if os.path.dirname(path) != self.upload_dir or not os.path.isfile(path):
+            raise FileNotFoundError("PDF not found, it may have expired: upload it again")
+        self._mark_used(path)
+        return path
+
+    def content_hash(self, pdf_path):
+        """
+        SHA-256 of a stored upload, read from its name. None for files outside the store.
+        """
+        path = os.path.abspath(pdf_path)
+        name, extension = os.path.splitext(os.path.basename(path))
+        if os.path.dirname(path) != self.upload_dir or extension != ".pdf":
+            return None
+        return name
+
+    @contextmanager
+    def lease(self, pdf_path):
+        """
+        Marks 'pdf_path' as used now and every IN_USE_SECONDS / 4 while the block runs.
+        Files outside the store are left alone.
+        """
+        if self.content_hash(pdf_path) is None:
+            yield
+            return
+
+        path = os.path.abspath(pdf_path)
+        self._mark_used(path)
+        with self._lock:
+            self._leases[path] += 1
+            if self._lease_thread is None:
+                self._lease_thread = threading.Thread(target=self._renew_leases, name="upload-leases", daemon=True)
+                self._lease_thread.start()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._leases[path] -= 1
+                if self._leases[path] <= 0:
+                    del self._leases[path]
+
+    def _renew_leases(self):
+        while True:
+            time.sleep(IN_USE_SECONDS / 4)
+            with self._lock:
+                leased = list(self._leases)
+            for path in leased:
+                self._mark_used(path)
+
+    def cleanup(self, force=False):
+        """
+        Removes expired uploads and, past 'max_bytes', the least recently used ones.
+        Returns how many files were removed.
+        """
+        now = time.time()
+        with self._lock:
+            if not force and now - self._last_cleanup < self.cleanup_interval:
+                return 0
+            self._last_cleanup = now
+
+        entries = []
+        try:
+            scanned = list(os.scandir(self.upload_dir))
+        except FileNotFoundError:
+            return 0
+        for entry in scanned:
+            if entry.name.endswith((".pdf", ".tmp")):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((max(stat.st_atime, stat.st_mtime), stat.st_size, entry.path))
+
+        with self._lock:
+            leased = set(self._leases)
+
+        removed = 0
+        total = sum(size for _, size, _ in entries)
+        for used_at, size, path in sorted(entries):
+            if path in leased:
+                continue
+            expired = now - used_at > self.ttl_seconds
+            over_size = total > self.max_bytes and now - used_at > IN_USE_SECONDS
+            if not expired and not over_size:
+                continue
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+
+        METRICS.incr("uploads_removed", removed)
+        return removed
+
+    def _mark_used(self, path):
+        # The access time records the last use, since the modification time keys the text caches
+        try:
+            os.utime(path, ns=(time.time_ns(), os.stat(path).st_mtime_ns))
+        except OSError:
+            pass
+
+    def _path(self, content_hash):
+        return os.path.join(self.upload_dir, f"{content_hash}.pdf")
+
+    def _too_large_message(self):
+        return f"The PDF is larger than the {self.max_upload_bytes // (1024 * 1024)} MB upload limit"
+
+
+UPLOADS = UploadStore(
+    settings.UPLOAD_DIR,
+    ttl_seconds=settings.UPLOAD_TTL_SECONDS,
+    max_bytes=settings.UPLOAD_STORE_MAX_BYTES,
+    max_upload_bytes=settings.UPLOAD_MAX_BYTES
+)
@@ -31,4 +31,38 @@ export async function postForBlob(url, data, isJSON = false) {
     throw new Error(errorMsg || "Request Failed");
   }
   return response.blob();
-}
\ No newline at end of file
+}
+
+export async function getData(url) {
+  const response = await fetch(url);
+  if (!response.ok) {
+    const errorMsg = await response.text();
+    throw new Error(errorMsg || "Request Failed");
+  }
+  return response.json();
+}
+
+// Posts the data and calls onMessage with each JSON line of an NDJSON response as it arrives
+export async function postForNdjson(url, data, onMessage) {
+  const response = await fetch(url, { method: "POST", body: data });
+  if (!response.ok) {
+    const errorMsg = await response.text();
+    throw new Error(errorMsg || "Request Failed");
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split("\n");
+    buffer = lines.pop();
+    lines.filter((line) => line.trim()).forEach((line) => onMessage(JSON.parse(line)));
+  }
+
+  if (buffer.trim()) onMessage(JSON.parse(buffer));
+}
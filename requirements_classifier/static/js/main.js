@@ -1,6 +1,6 @@
 // import { tableHead, generateTable } from './tableFunctions.js';
 import { buildRequirementsTable } from "./tableFunctions.js";
-import { postData, postForBlob } from "./api.js";
+import { postData, postForBlob, getData, postForNdjson } from "./api.js";
 
 // let extracted_requirements = [];
 window.extracted_requirements = [];
@@ -21,6 +21,10 @@ const manualBtn = document.getElementById("manualClassifyBtn")
 const manualForm = document.getElementById("manualForm")
 const manualInput = document.getElementById("manualRequirementInput")
 
+const JOB_POLL_INTERVAL_MS = 2000;
+// Set by the STREAM_RESULTS setting: otherwise PDFs run as background jobs
+const STREAM_RESULTS = document.body.dataset.streamResults === "true";
+
 // Change the input name from Choose PDF to the files name
 fileInput.addEventListener("change", () => {
   const label = document.querySelector("label[for='pdfInput']");
@@ -39,17 +43,13 @@ uploadBtn.addEventListener("click", async () => {
   try {
     const formData = new FormData();
     formData.append("pdf_file", fileInput.files[0]);
-    const response = await postData("/process_pdf/", formData);
-
-    pdfPath = response.pdf_path;
-    window.extracted_requirements = response.results.map((req) => ({
-      text: req.requirement,
-      aiClassification: req.type,
-      confidence: req.confidence,
-      original_text: req.original_text,
-      match_score: req.match_score,
-      page: req.page
-    }));
+    window.extracted_requirements = [];
+
+    if (STREAM_RESULTS && window.ReadableStream) {
+      await streamPdf(formData);
+    } else {
+      await processPdfJob(formData);
+    }
 
     renderResults();
   } catch (err) {
@@ -164,6 +164,67 @@ manualBtn.addEventListener("click", async () => {
 
 // MARK: Auxiliary Functions
 
+// Reads the per-page results of the PDF as they are streamed by the server
+async function streamPdf(formData) {
+  let totalPages = 0;
+  let processedPages = 0;
+
+  await postForNdjson("/process_pdf/stream/", formData, (event) => {
+    if (event.type === "start") {
+      pdfPath = event.pdf_path;
+      totalPages = event.total_pages;
+    } else if (event.type === "page") {
+      processedPages += 1;
+      uploadBtn.textContent = `Analyzing... ${processedPages}/${totalPages}`;
+      window.extracted_requirements.push(...event.results.map(toRequirement));
+      if (window.extracted_requirements.length) renderResults();
+    } else if (event.type === "error") {
+      throw new Error(event.error);
+    }
+    // "heartbeat" events only keep the connection alive while a page is generated
+  });
+}
+
+// Runs the PDF as a background job, polling its results (the default, see STREAM_RESULTS)
+async function processPdfJob(formData) {
+  const job = await postData("/process_pdf/jobs/", formData);
+  pdfPath = job.pdf_path;
+
+  await pollJob(job.job_id, (status) => {
+    window.extracted_requirements.push(...status.results.map(toRequirement));
+    if (status.total_pages) {
+      uploadBtn.textContent = `Analyzing... ${status.processed_pages}/${status.total_pages}`;
+    }
+    if (window.extracted_requirements.length) renderResults();
+  });
+}
+
+// Polls the job status until it finishes, handing the new results of each poll to onProgress
+async function pollJob(jobId, onProgress) {
+  let offset = 0;
+  while (true) {
+    const status = await getData(`/process_pdf/jobs/${jobId}/?offset=${offset}`);
+    offset += status.results.length;
+    onProgress(status);
+
+    if (status.status === "done") return;
+    if (status.status === "failed") throw new Error(status.error || "Job failed");
+
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+  }
+}
+
+function toRequirement(req) {
+  return {
+    text: req.requirement,
+    aiClassification: req.type,
+    confidence: req.confidence,
+    original_text: req.original_text,
+    match_score: req.match_score,
+    page: req.page
+  };
+}
+
 function renderResults() {
   resultsTable.innerHTML = "";
   buildRequirementsTable.render(resultsTable, window.extracted_requirements);
@@ -1,3 +1,804 @@
-from django.test import TestCase
+import asyncio
+import csv
+import datetime
+import fitz
+import io
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils.timezone import now
+from .benchmark.text_cleaning import clean_page_text_reference, random_corpus
+from .services.highlight_index import HighlightWriter
+from .services.micro_batcher import MicroBatcher
+from .ai.classifier_backends import SAMPLE_SENTENCES, build_backend, check_parity
+from .ai.registry import ModelRegistry
+from .models import ProcessingJobs, Requirements
+from .services.db_services import save_requirements_to_db
+from .services.job_services import ACTIVE_STATUSES as ACTIVE_JOB_STATUSES, JobRunner, job_status
+from .services.pdf_services import PDFUtils
+from .services.requirements_classifier import RequirementsClassifier, append_page, page_results
+from .services.text_layout import font_metrics, wrap_text
 
-# Create your tests here.
+
+class CleanPageTextTests(SimpleTestCase):
+    """
+    The single-pass PDFUtils.clean_page_text must give byte-identical output to the original implementation.
+    """
+
+    def setUp(self):
+        self.pdf_utils = PDFUtils()
+
+    def assertSameAsReference(self, text):
+        self.assertEqual(self.pdf_utils.clean_page_text(text), clean_page_text_reference(text), repr(text))
+
+    def test_edge_cases(self):
+        for text in [
+            "",
+            "\n",
+            "\n\n\n",
+            "   ",
+            "single line",
+            "single line.",
+            "broken\n",
+            "broken\nline",
+            "broken\n\nafter blank",
+            "one.\ntwo\nthree\nfour.",
+            "a\nb\nc\nd\ne",
+            "ends with space. \nnext",
+            "ends with colon:\nnext",
+            "question?\n\n\n\nanswer!",
+            "trailing dot after paren (see 4).\nnext",
+            " padded \nline separator\x0cform feed\x85next",
+            "windows\r\nline\r\nendings.\r\n",
+        ]:
+            with self.subTest(text=text):
+                self.assertSameAsReference(text)
+
+    def test_random_corpus(self):
+        for text in random_corpus(2000, seed=15):
+            self.assertSameAsReference(text)
+
+    def test_long_pages(self):
+        for text in random_corpus(50, seed=16, max_lines=400):
+            self.assertSameAsReference(text)
+
+
+def wrap_lines_reference(text, max_width, fontsize=10, fontname="Times-Roman"):
+    """
+    The original PDFUtils._wrap_lines, measuring every candidate line with fitz.get_text_length.
+    """
+    out = []
+    for para in text.split("\n"):
+        if not para.strip():
+            out.append("")
+        else:
+            words = para.split()
+            cur = ""
+            for w in words:
+                test = (cur + " " + w).strip()
+                if fitz.get_text_length(test, fontsize=fontsize, fontname=fontname) <= max_width:
+                    cur = test
+                else:
+                    if cur:
+                        out.append(cur)
+                    cur = w
+            if cur:
+                out.append(cur)
+    return out
+
+
+class WrapTextTests(SimpleTestCase):
+    """
+    wrap_text must break lines exactly where the original _wrap_lines did.
+    """
+
+    def test_widths_match_get_text_length(self):
+        metrics = font_metrics("Times-Roman")
+        for text in ["", "a", "The system shall export reports.", "Ação do usuário", "naïve 日本語 text", "ãb", "€uro"]:
+            with self.subTest(text=text):
+                self.assertEqual(
+                    metrics.text_width(text, fontsize=10),
+                    fitz.get_text_length(text, fontsize=10, fontname="Times-Roman")
+                )
+
+    def test_same_line_breaks(self):
+        rng = random.Random(17)
+        corpus = random_corpus(300, seed=17, max_lines=12)
+        for text in corpus:
+            max_width = rng.choice([20, 80, 150, 300, 495.28])
+            fontsize = rng.choice([9, 10, 12])
+            self.assertEqual(
+                wrap_text(text, max_width, fontsize=fontsize),
+                wrap_lines_reference(text, max_width, fontsize=fontsize),
+                repr(text)
+            )
+
+
+class HighlightWriterTests(SimpleTestCase):
+    """
+    The default 'rect' style must draw exactly what the original one-annotation-per-hit code drew.
+    """
+
+    def highlighted_page(self, draw):
+        doc = fitz.open()
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(50, 50, 300, 300), "The system shall encrypt all stored passwords. " * 6, fontsize=11)
+        rects = page.search_for("stored passwords")
+        self.assertGreater(len(rects), 1)
+        draw(page, rects, (1, 0.6, 0.6), "Requirements: 1")
+        return page.get_pixmap().samples
+
+    def test_rect_style_matches_original_annotations(self):
+        def draw_original(page, rects, color, note):
+            for rect in rects:
+                annot = page.add_rect_annot(rect)
+                annot.set_colors(stroke=color, fill=color)
+                annot.set_opacity(0.4)
+                annot.set_info({"title": "Requirement", "content": note})
+                annot.update()
+
+        def draw_with_writer(page, rects, color, note):
+            writer = HighlightWriter(page)
+            writer.add(rects, color, note)
+            self.assertEqual(writer.write(), len(rects))
+
+        self.assertEqual(self.highlighted_page(draw_with_writer), self.highlighted_page(draw_original))
+
+
+class MicroBatcherTests(SimpleTestCase):
+    """
+    Concurrent calls merged by MicroBatcher must each get back the results of their own items.
+    """
+
+    def test_concurrent_calls_share_batches(self):
+        batches = []
+        lock = threading.Lock()
+
+        def process_batch(items):
+            with lock:
+                batches.append(len(items))
+            return [item * 2 for item in items]
+
+        batcher = MicroBatcher(process_batch, "test", max_batch_size=16, max_wait_ms=20)
+        calls = [list(range(start, start + start % 3 + 1)) for start in range(100)]
+        with ThreadPoolExecutor(max_workers=25) as executor:
+            results = list(executor.map(batcher.submit, calls))
+
+        self.assertEqual(results, [[item * 2 for item in call] for call in calls])
+        self.assertLess(len(batches), len(calls))
+        self.assertLessEqual(max(batches), 16)
+
+    def test_errors_reach_every_caller(self):
+        def process_batch(items):
+            raise ValueError("failed")
+
+        batcher = MicroBatcher(process_batch, "test", max_batch_size=16, max_wait_ms=5)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [executor.submit(batcher.submit, [item]) for item in range(8)]
+        for future in futures:
+            self.assertRaises(ValueError, future.result)
+
+
+def tiny_multitask_model(directory):
+    """
+    A randomly initialized two-layer DistilBERT BertForMultiTask, with a word-level vocabulary
+    built from SAMPLE_SENTENCES, saved under 'directory'. Returns (tokenizer, model).
+    """
+    import torch
+    from transformers import DistilBertConfig, DistilBertModel, DistilBertTokenizerFast
+    from .ai.classifier import BertForMultiTask
+
+    words = sorted({word for sentence in SAMPLE_SENTENCES for word in re.findall(r"\w+|[^\w\s]", sentence.lower())})
+    with open(f"{directory}/vocab.txt", "w", encoding="utf-8") as vocab_file:
+        vocab_file.write("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + words))
+    tokenizer = DistilBertTokenizerFast(vocab_file=f"{directory}/vocab.txt")
+
+    torch.manual_seed(0)
+    config = DistilBertConfig(vocab_size=len(tokenizer), dim=32, n_layers=2, n_heads=2, hidden_dim=64)
+    DistilBertModel(config).save_pretrained(directory)
+
+    model = BertForMultiTask(directory, num_categories=11)
+    model.eval()
+    return tokenizer, model
+
+
+def tiny_classifier(multitask=None, **kwargs):
+    """
+    A RequirementsClassifier with its own registry, optionally running the given (tokenizer, model).
+    """
+    classifier = RequirementsClassifier(
+        phi4_model_path="tiny-phi4",
+        multitask_model_name="tiny-distilbert",
+        multitask_bin_path="tiny-distilbert.bin",
+        multitask_tokenizer_path="tiny-distilbert",
+        registry=ModelRegistry(),
+        **kwargs
+    )
+    if multitask is not None:
+        classifier.override_model("multitask", lambda: multitask)
+    return classifier
+
+
+class ClassifyBatchTests(SimpleTestCase):
+    """
+    classify_batch must return exactly the dicts of the original per-sentence classification,
+    in input order, however the sentences are sorted and padded into batches.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.model_dir = tempfile.TemporaryDirectory()
+        cls.tokenizer, cls.model = tiny_multitask_model(cls.model_dir.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.model_dir.cleanup()
+        super().tearDownClass()
+
+    def classify_one_reference(self, classifier, sentence):
+        # The original process_sentence: one sentence per forward pass
+        import torch
+
+        encodings = self.tokenizer([sentence], truncation=True, padding=True, max_length=256, return_tensors="pt")
+        with torch.no_grad():
+            out = self.model(input_ids=encodings["input_ids"], attention_mask=encodings["attention_mask"])
+        return classifier._build_result(sentence, out["logits_bin"].softmax(dim=1)[0], out["logits_cat"].softmax(dim=1)[0])
+
+    def test_batches_match_single_sentences(self):
+        classifier = tiny_classifier((self.tokenizer, build_backend(self.model, "eager", None, "cpu")))
+        sentences = SAMPLE_SENTENCES + [sentence.upper() for sentence in SAMPLE_SENTENCES[::3]]
+        expected = [self.classify_one_reference(classifier, sentence) for sentence in sentences]
+
+        self.assertEqual(classifier.classify_batch(sentences, batch_size=1), expected)
+        for batch_size in [4, 7, 32]:
+            with self.subTest(batch_size=batch_size):
+                self.assertEqual(classifier.classify_batch(sentences, batch_size=batch_size), expected)
+
+    def test_empty_input(self):
+        self.assertEqual(tiny_classifier().classify_batch([]), [])
+
+
+class ClassifierBackendTests(SimpleTestCase):
+    """
+    Every classifier backend must give the logits and labels of the eager model.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.model_dir = tempfile.TemporaryDirectory()
+        cls.tokenizer, cls.model = tiny_multitask_model(cls.model_dir.name)
+        cls.bin_path = f"{cls.model_dir.name}/multitask.bin"
+
+        import torch
+        torch.save(cls.model.state_dict(), cls.bin_path)
+        cls.reference = build_backend(cls.model, "eager", cls.bin_path, "cpu")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.model_dir.cleanup()
+        super().tearDownClass()
+
+    def test_backends_match_eager(self):
+        for backend in ["eager", "int8", "torchscript", "onnx"]:
+            with self.subTest(backend=backend):
+                if backend == "onnx":
+                    try:
+                        import onnxruntime  # noqa: F401
+                    except ImportError:
+                        self.skipTest("onnxruntime is not installed")
+
+                candidate = build_backend(self.model, backend, self.bin_path, "cpu")
+                report = check_parity(self.tokenizer, self.reference, candidate, SAMPLE_SENTENCES)
+                self.assertTrue(report["passed"], report)
+                self.assertEqual(report["label_agreement_logits_bin"], 1.0, report)
+
+
+def tiny_causal_lm():
+    """
+    A text-generation pipeline over a randomly initialized two-layer Llama, with a word-level
+    tokenizer built from SAMPLE_SENTENCES and a minimal chat template.
+    """
+    import torch
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers
+    from transformers import LlamaConfig, LlamaForCausalLM, PreTrainedTokenizerFast, pipeline
+
+    special = ["<pad>", "<unk>", "<eos>", "<|system|>", "<|user|>", "<|assistant|>", "<|end|>"]
+    words = sorted({word for sentence in SAMPLE_SENTENCES for word in re.findall(r"\w+|[^\w\s]", sentence.lower())})
+    word_level = Tokenizer(models.WordLevel({token: i for i, token in enumerate(special + words)}, unk_token="<unk>"))
+    word_level.pre_tokenizer = pre_tokenizers.Whitespace()
+    word_level.decoder = decoders.WordPiece()
+
+    tokenizer = PreTrainedTokenizerFast(
+        tokenizer_object=word_level,
+        pad_token="<pad>",
+        unk_token="<unk>",
+        eos_token="<eos>",
+        additional_special_tokens=special[3:]
+    )
+    tokenizer.chat_template = (
+        "{% for m in messages %}<|{{ m['role'] }}|> {{ m['content'] }} <|end|> {% endfor %}"
+        "{% if add_generation_prompt %}<|assistant|> {% endif %}"
+    )
+
+    torch.manual_seed(0)
+    config = LlamaConfig(
+        vocab_size=len(tokenizer),
+        hidden_size=32,
+        intermediate_size=64,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        num_key_value_heads=2,
+        pad_token_id=tokenizer.pad_token_id,
+        eos_token_id=tokenizer.eos_token_id,
+        bos_token_id=None
+    )
+    return pipeline("text-generation", model=LlamaForCausalLM(config).eval(), tokenizer=tokenizer, device=-1)
+
+
+class GenerationBatchTests(SimpleTestCase):
+    """
+    In fp32, left-padded batched generation must give the same texts as generating one
+    conversation at a time, with or without the system prompt KV cache.
+    """
+
+    def test_batches_match_sequential_generation(self):
+        from .ai import networks
+
+        phi_pipeline = tiny_causal_lm()
+        prompts = SAMPLE_SENTENCES[:3]
+        conversations = [(text, prompts[i % len(prompts)]) for i, text in enumerate(SAMPLE_SENTENCES)]
+
+        with mock.patch.dict(networks.GENERATION_PARAMS, max_new_tokens=24):
+            sequential = networks.generate_requirements_batch(phi_pipeline, conversations, batch_size=1)
+            prefix_cache = networks.PromptPrefixCache(phi_pipeline)
+            with_prefix = [
+                networks.generate_requirements(phi_pipeline, text, prompt, prefix_cache=prefix_cache)
+                for text, prompt in conversations
+            ]
+            batched = {
+                batch_size: networks.generate_requirements_batch(phi_pipeline, conversations, batch_size=batch_size)
+                for batch_size in [4, 16]
+            }
+
+        self.assertTrue(any(sequential))
+        self.assertEqual(with_prefix, sequential)
+        for batch_size, outputs in batched.items():
+            with self.subTest(batch_size=batch_size):
+                self.assertEqual(outputs, sequential)
+
+
+class PageResultsTests(SimpleTestCase):
+    """
+    Replaying a cached analysis must give each generation its own results, also when a long page
+    was split into several chunks that share the same page number.
+    """
+
+    def test_split_pages_replay_their_own_results(self):
+        from .benchmark.pipeline import STUBBABLE_MODELS, build_classifier, make_synthetic_pdf
+
+        classifier = build_classifier(STUBBABLE_MODELS)
+        classifier.page_chunking = True
+        classifier.chunk_max_tokens = 40
+        classifier.chunk_min_words = 1
+
+        with tempfile.TemporaryDirectory() as directory:
+            pdf_path = f"{directory}/doc.pdf"
+            make_synthetic_pdf(pdf_path, pages=2, sentences_per_page=12)
+
+            analyzed = classifier.analyze_pdf(pdf_path)
+            iterated = {"generations": [], "results": []}
+            for page in classifier.iter_pdf(pdf_path):
+                append_page(iterated, page)
+
+        for analysis in [analyzed, iterated]:
+            pages = [generation["page"] for generation in analysis["generations"]]
+            self.assertGreater(len(pages), len(set(pages)))
+
+            replayed = list(page_results(analysis))
+            self.assertEqual([result for _, results in replayed for result in results], analysis["results"])
+            for generation, results in replayed:
+                self.assertTrue(all(result["page"] == generation["page"] for result in results))
+
+    def test_analyses_without_slices_replay_each_page_once(self):
+        results = [{"requirement": "R1", "page": 1}, {"requirement": "R2", "page": 1}, {"requirement": "R3", "page": 2}]
+        analysis = {"generations": [{"page": 1, "pages": [1]}, {"page": 1, "pages": [1]}, {"page": 2}], "results": results}
+
+        self.assertEqual([replayed for _, replayed in page_results(analysis)], [results[:2], [], results[2:]])
+
+
+class InferenceServerTests(SimpleTestCase):
+    """
+    A classifier using the inference server, over HTTP or a unix socket, must give the same results
+    as the classifier the server runs, without having the model weights itself.
+    """
+
+    def serve(self, address):
+        from .ai.inference_server import make_server
+        from .benchmark.pipeline import STUBBABLE_MODELS, build_classifier
+
+        served = build_classifier(STUBBABLE_MODELS)
+        server = make_server(served, address)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        if address.startswith("http"):
+            address = f"http://127.0.0.1:{server.server_address[1]}"
+        return served, address
+
+    def check_round_trip(self, address):
+        from .ai.inference_client import InferenceClient
+
+        served, address = self.serve(address)
+        remote = tiny_classifier(inference_client=InferenceClient(address, timeout=30))
+        self.assertFalse(os.path.exists(remote.multitask_bin_path))
+
+        sentences = SAMPLE_SENTENCES[:5]
+        conversations = [(sentence, prompt) for sentence in sentences for prompt in served.generation_prompts()]
+        self.assertEqual(remote.generate_conversations(conversations), served.generate_conversations(conversations))
+        self.assertEqual(remote.classify_batch(sentences), served.classify_batch(sentences))
+        self.assertTrue(remote.encode(sentences).allclose(served.encode(sentences)))
+        self.assertEqual(tuple(remote.encode([]).shape), (0, served.embedding_model.get_sentence_embedding_dimension()))
+
+        self.assertEqual(remote.model_identity(), served.model_identity())
+        self.assertEqual(remote.cache_identity()["prompts"], remote.generation_prompts())
+
+    def test_http(self):
+        self.check_round_trip("http://127.0.0.1:0")
+
+    def test_unix_socket(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.check_round_trip(f"unix://{directory}/inference.sock")
+
+    def test_local_identity_without_weights(self):
+        self.assertEqual(tiny_classifier().model_identity()["multitask_bin"], ["tiny-distilbert.bin", None])
+
+    def test_identity_is_cached_until_a_call_fails(self):
+        from .ai.inference_client import InferenceClient, InferenceServerError
+
+        # Nothing listens there: every call to the server fails
+        client = InferenceClient("http://127.0.0.1:1", timeout=5)
+        with mock.patch.object(client, "health", return_value={"model_identity": {"phi4": "stub"}}) as health:
+            self.assertEqual(client.model_identity(), {"phi4": "stub"})
+            self.assertEqual(client.model_identity(), {"phi4": "stub"})
+            self.assertEqual(health.call_count, 1)
+
+            with self.assertRaises(InferenceServerError):
+                client.classify(["The system shall log in users"])
+            client.model_identity()
+            self.assertEqual(health.call_count, 2)
+
+        client = InferenceClient("http://127.0.0.1:1", timeout=5, identity_ttl=0)
+        with mock.patch.object(client, "health", return_value={"model_identity": {"phi4": "stub"}}) as health:
+            client.model_identity()
+            client.model_identity()
+            self.assertEqual(health.call_count, 2)
+
+
+class StubJobClassifier:
+    """
+    Stands in for RequirementsClassifier in JobRunner: one requirement per page, failing on 'fail_on_page'.
+    """
+
+    def __init__(self, pages, fail_on_page=None):
+        self.pages = pages
+        self.fail_on_page = fail_on_page
+        self.pdf_utils = self
+
+    def extract_text(self, pdf_path):
+        return [f"Page {page}" for page in range(1, self.pages + 1)]
+
+    def schedule_pages(self, page_texts):
+        return list(range(1, len(page_texts) + 1))
+
+    def iter_pdf(self, pdf_path, page_texts, chunks):
+        for page in chunks:
+            if page == self.fail_on_page:
+                raise RuntimeError(f"Page {page} failed")
+            generation = {"page": page, "pages": [page], "user": "", "system": ""}
+            yield {"page": page, "pages": [page], "generation": generation, "results": [{"requirement": f"R{page}", "page": page}]}
+
+
+class StubResultCache(dict):
+    def set(self, key, value):
+        self[key] = value
+
+
+class JobRunnerTests(TransactionTestCase):
+
+    def run_job(self, classifier, **kwargs):
+        cache = StubResultCache()
+        runner = JobRunner(classifier, cache, progress_seconds=0, **kwargs)
+        job = runner.submit("doc.pdf", "key")
+        self.assertIn(job_status(job)["status"], ACTIVE_JOB_STATUSES)
+        runner.executor.shutdown(wait=True)
+        job.refresh_from_db()
+        return runner, cache, job
+
+    def test_job_runs_to_done(self):
+        _, cache, job = self.run_job(StubJobClassifier(pages=3))
+
+        status = job_status(job)
+        self.assertEqual(status["status"], ProcessingJobs.STATUS_DONE)
+        self.assertEqual((status["total_pages"], status["processed_pages"], status["results_count"]), (3, 3, 3))
+        self.assertEqual([result["requirement"] for result in job_status(job, offset=1)["results"]], ["R2", "R3"])
+        self.assertEqual(cache["key"]["results"], job.results)
+
+    def test_failed_job_keeps_partial_results(self):
+        _, cache, job = self.run_job(StubJobClassifier(pages=3, fail_on_page=3))
+
+        status = job_status(job)
+        self.assertEqual(status["status"], ProcessingJobs.STATUS_FAILED)
+        self.assertEqual(status["error"], "Page 3 failed")
+        self.assertEqual((status["processed_pages"], status["results_count"]), (2, 2))
+        self.assertNotIn("key", cache)
+
+    def test_stale_jobs_are_failed(self):
+        stale = ProcessingJobs.objects.create(pdf_path="doc.pdf", status=ProcessingJobs.STATUS_RUNNING)
+        fresh = ProcessingJobs.objects.create(pdf_path="doc.pdf", status=ProcessingJobs.STATUS_PENDING)
+        done = ProcessingJobs.objects.create(pdf_path="doc.pdf", status=ProcessingJobs.STATUS_DONE)
+        ProcessingJobs.objects.filter(id__in=[stale.id, done.id]).update(updated_at=now() - datetime.timedelta(hours=1))
+
+        runner = JobRunner(StubJobClassifier(pages=1), StubResultCache(), stale_seconds=60)
+        stale.refresh_from_db()
+        self.assertTrue(runner.is_stale(stale))
+        runner.recover()
+        runner.recover()
+
+        statuses = {job.id: job.status for job in ProcessingJobs.objects.all()}
+        self.assertEqual(statuses[stale.id], ProcessingJobs.STATUS_FAILED)
+        self.assertEqual(statuses[fresh.id], ProcessingJobs.STATUS_PENDING)
+        self.assertEqual(statuses[done.id], ProcessingJobs.STATUS_DONE)
+
+
+def saved_requirement(text, page=1, project="doc.pdf", classification_user="---", confidence=0.9):
+    return {
+        "text": text,
+        "classification_ai": "Funcional",
+        "confidence_ai": confidence,
+        "classification_user": classification_user,
+        "original_text": f"Source of {text}",
+        "match_score": 0.8,
+        "page": page,
+        "project": project
+    }
+
+
+class SaveRequirementsTests(TestCase):
+
+    def setUp(self):
+        self.requirements = [saved_requirement(f"The system shall do {i}", page=i % 3 + 1) for i in range(7)]
+        save_requirements_to_db(self.requirements, batch_size=3)
+
+    def test_append_inserts_every_time(self):
+        self.assertEqual(save_requirements_to_db(self.requirements, batch_size=3, mode="append"), (7, 0))
+        self.assertEqual(Requirements.objects.count(), 14)
+
+    def test_upsert_updates_saved_requirements(self):
+        resaved = [dict(requirement, classification_user="NF") for requirement in self.requirements[:4]]
+        resaved.append(saved_requirement("The system shall do 0", page=3))
+        resaved.append(saved_requirement("The system shall do 0", project="other.pdf"))
+        resaved.append(saved_requirement("The system shall do 0", project="other.pdf"))
+
+        self.assertEqual(save_requirements_to_db(resaved, batch_size=3, mode="upsert"), (2, 4))
+        self.assertEqual(Requirements.objects.count(), 9)
+        self.assertEqual(Requirements.objects.filter(classification_user="NF").count(), 4)
+        self.assertEqual(Requirements.objects.filter(project__document_name="other.pdf").count(), 1)
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            save_requirements_to_db(self.requirements, mode="replace")
+
+
+class ExportRequirementsTests(TransactionTestCase):
+
+    def setUp(self):
+        save_requirements_to_db([saved_requirement(f"The system shall do {i}", page=i + 1) for i in range(5)])
+        save_requirements_to_db([saved_requirement("The report shall list \"all\", items", project="other.pdf")])
+
+    def test_csv(self):
+        response = self.client.get("/requirements/export/", {"project": "doc.pdf"})
+
+        self.assertEqual(response["Content-Type"], "text/csv")
+        rows = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode("utf-8-sig"))))
+        self.assertEqual([row["text"] for row in rows], [f"The system shall do {i}" for i in range(5)])
+        self.assertEqual({row["project"] for row in rows}, {"doc.pdf"})
+
+    def test_jsonl(self):
+        response = self.client.get("/requirements/export/", {"format": "jsonl"})
+
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).decode("utf-8").splitlines()]
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[-1]["text"], 'The report shall list "all", items')
+        self.assertEqual(rows[0]["page"], 1)
+
+    def test_unknown_format(self):
+        response = self.client.get("/requirements/export/", {"format": "xlsx"})
+        self.assertEqual(response.status_code, 400)
+
+    async def test_streams_asynchronously_under_asgi(self):
+        response = await self.async_client.get("/requirements/export/", {"format": "jsonl"})
+
+        self.assertTrue(response.is_async)
+        content = b"".join([piece async for piece in response.streaming_content])
+        self.assertEqual(len(content.decode("utf-8").splitlines()), 6)
+
+
+class ProcessingViewsTests(SimpleTestCase):
+    """
+    The async processing views, run through the ASGI test client with stub models.
+    """
+
+    def setUp(self):
+        from . import views
+        from .benchmark.pipeline import STUBBABLE_MODELS, build_classifier, make_synthetic_pdf
+        from .services.model_executor import ModelExecutor
+        from .services.result_cache import ResultCache
+        from .services.upload_store import UploadStore
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.pdf_path = f"{directory.name}/doc.pdf"
+        make_synthetic_pdf(self.pdf_path, pages=3, sentences_per_page=4)
+
+        self.upload_store = UploadStore(f"{directory.name}/uploads", ttl_seconds=3600, max_bytes=10 ** 8, max_upload_bytes=10 ** 7)
+        self.executor = ModelExecutor(max_workers=2, max_pending=4)
+        for name, value in [
+            ("REQ_CLASSIFIER", build_classifier(STUBBABLE_MODELS)),
+            ("RESULT_CACHE", ResultCache(f"{directory.name}/results", 10 ** 8)),
+            ("MODEL_EXECUTOR", self.executor),
+        ]:
+            patcher = mock.patch.object(views, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(views.PDF_HELPER, "upload_store", self.upload_store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def stream(self):
+        with open(self.pdf_path, "rb") as pdf_file:
+            response = await self.async_client.post("/process_pdf/stream/", {"pdf_file": pdf_file})
+        if response.status_code != 200:
+            return response, None
+        self.assertTrue(response.is_async)
+        lines = b"".join([piece async for piece in response.streaming_content]).decode("utf-8").splitlines()
+        return response, [json.loads(line) for line in lines]
+
+    async def test_stream_sends_every_page(self):
+        for cached in [False, True]:
+            _, events = await self.stream()
+            self.assertEqual([event["type"] for event in events], ["start", "page", "page", "page", "done"])
+            self.assertEqual(events[0]["cached"], cached)
+            self.assertTrue(all(event["results"] for event in events[1:-1]))
+
+    async def test_stream_sends_heartbeats_while_a_page_runs(self):
+        from . import views
+
+        async def slow_events():
+            await asyncio.sleep(0.2)
+            yield {"type": "done"}
+
+        lines = [line async for line in views._ndjson_lines({"type": "start"}, slow_events(), heartbeat_seconds=0.05)]
+        types = [json.loads(line)["type"] for line in lines]
+        self.assertEqual((types[0], types[-1]), ("start", "done"))
+        self.assertEqual(set(types[1:-1]), {"heartbeat"})
+
+    def test_upload_page_uses_jobs_by_default(self):
+        self.assertContains(self.client.get("/"), 'data-stream-results="false"')
+        with self.settings(STREAM_RESULTS=True):
+            self.assertContains(self.client.get("/"), 'data-stream-results="true"')
+
+    async def test_unreachable_inference_server(self):
+        from . import views
+        from .ai.inference_client import InferenceServerError
+
+        error = InferenceServerError("Inference server at http://127.0.0.1:1 is unreachable")
+        with mock.patch.object(views.REQ_CLASSIFIER, "cache_identity", side_effect=error):
+            for url in ["/process_pdf/", "/process_pdf/stream/", "/process_pdf/jobs/"]:
+                with open(self.pdf_path, "rb") as pdf_file:
+                    response = await self.async_client.post(url, {"pdf_file": pdf_file})
+                self.assertEqual(response.status_code, 503, url)
+                self.assertEqual(json.loads(response.content)["error"], str(error))
+
+    async def test_busy_executor_rejects_streams(self):
+        self.executor.max_pending = 0
+        response, _ = await self.stream()
+        self.assertEqual(response.status_code, 503)
+
+    async def test_save_requirements_rejects_invalid_json(self):
+        response = await self.async_client.post("/save_requirements/", "{not json", content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+    async def test_unknown_pdf_paths(self):
+        response = await self.async_client.post(
+            "/classify_manual_requirement/",
+            {"text": "The system shall log in users", "pdfPath": self.pdf_path},
+            content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class UploadStoreTests(SimpleTestCase):
+
+    def setUp(self):
+        from .services.upload_store import UploadStore
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = UploadStore(directory.name, ttl_seconds=3600, max_bytes=200, max_upload_bytes=100)
+
+    def save(self, content):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        return self.store.save(SimpleUploadedFile("doc.pdf", content))
+
+    def age(self, path, seconds):
+        used_at = datetime.datetime.now().timestamp() - seconds
+        os.utime(path, (used_at, used_at))
+
+    def test_same_content_is_stored_once(self):
+        first = self.save(b"%PDF first")
+        self.assertEqual(self.save(b"%PDF first"), first)
+        self.assertNotEqual(self.save(b"%PDF second"), first)
+        self.assertEqual(self.store.resolve(first), first)
+        self.assertEqual(len(os.listdir(self.store.upload_dir)), 2)
+
+    def test_upload_size_limit(self):
+        from .services.upload_store import UploadTooLarge
+
+        with self.assertRaises(UploadTooLarge):
+            self.save(b"x" * 101)
+        self.assertEqual(os.listdir(self.store.upload_dir), [])
+
+    def test_cleanup(self):
+        expired = self.save(b"expired" * 10)
+        oldest = self.save(b"oldest" * 14)
+        older = self.save(b"older" * 16)
+        recent = self.save(b"recent" * 14)
+        self.age(expired, 7200)
+        self.age(oldest, 3000)
+        self.age(older, 2000)
+
+        # Over the size cap, the least recently used files go first, except recently used ones
+        self.assertEqual(self.store.cleanup(force=True), 2)
+        self.assertEqual(sorted(os.listdir(self.store.upload_dir)), sorted(os.path.basename(path) for path in [older, recent]))
+        with self.assertRaises(FileNotFoundError):
+            self.store.resolve(expired)
+
+    def test_leased_uploads_are_kept(self):
+        leased = self.save(b"leased" * 10)
+        with self.store.lease(leased):
+            self.age(leased, 7200)
+            self.assertEqual(self.store.cleanup(force=True), 0)
+        self.age(leased, 7200)
+        self.assertEqual(self.store.cleanup(force=True), 1)
+
+
+class ResultCacheTests(SimpleTestCase):
+
+    def test_eviction_skips_entries_removed_meanwhile(self):
+        from .services.result_cache import ResultCache
+
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResultCache(directory, max_bytes=10 ** 6)
+            cache.set("aa", {"results": []})
+            real_scandir = os.scandir
+
+            def scandir_then_remove(path):
+                entries = list(real_scandir(path))
+                cache.invalidate("aa")
+                return iter(entries)
+
+            with mock.patch("requirements_classifier.services.result_cache.os.scandir", scandir_then_remove):
+                cache.set("bb", {"results": [1]})
+
+            self.assertIsNone(cache.get("aa"))
+            self.assertEqual(cache.get("bb"), {"results": [1]})
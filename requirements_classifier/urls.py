@@ -1,10 +1,18 @@
 from django.urls import path
-from .views import index, process_pdf, save_requirements, export_csv, classify_manual_requirement
+from .views import index, process_pdf, save_requirements, export_csv, classify_manual_requirement, invalidate_cached_result, start_pdf_job, pdf_job_status, process_pdf_stream, metrics, list_saved_requirements, requirements_stats, export_requirements
 
 urlpatterns = [
     path('', index, name='index'),
     path('process_pdf/', process_pdf, name='process_pdf'),
+    path('process_pdf/stream/', process_pdf_stream, name='process_pdf_stream'),
+    path('process_pdf/jobs/', start_pdf_job, name='start_pdf_job'),
+    path('process_pdf/jobs/<uuid:job_id>/', pdf_job_status, name='pdf_job_status'),
     path('save_requirements/', save_requirements, name='save_requirements'),
     path('export_csv/', export_csv, name='export_csv'),
     path('classify_manual_requirement/', classify_manual_requirement, name='classify_manual_requirement'),
+    path('invalidate_cached_result/', invalidate_cached_result, name='invalidate_cached_result'),
+    path('requirements/', list_saved_requirements, name='list_saved_requirements'),
+    path('requirements/stats/', requirements_stats, name='requirements_stats'),
+    path('requirements/export/', export_requirements, name='export_requirements'),
+    path('metrics/', metrics, name='metrics'),
     ]
\ No newline at end of file
@@ -1,13 +1,25 @@
-import csv, io, datetime, json
-from django.http import JsonResponse, HttpResponse
+import asyncio, csv, io, datetime, json
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 from django.shortcuts import render
+from django.views.decorators.http import require_GET
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.timezone import now
 from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
 from pathlib import Path
-from .services.requirements_classifier import RequirementsClassifier
+from .services.requirements_classifier import append_page, build_classifier_from_settings, page_results
 from .services.pdf_services import PDFUtils
-from .services.db_services import save_requirements_to_db
+from .services.db_services import SAVE_MODES, save_requirements_to_db
+from .services.result_cache import ResultCache
+from .services.metrics import METRICS, instrument_view
+from .services.job_services import JobRunner, job_status
+from .services.query_services import aggregate_requirements, list_requirements
+from .services.export_services import EXPORT_FORMATS, check_export_format, iter_export_rows, iterate_in_thread, stream_export
+from .services.model_executor import ExecutorBusy, ModelExecutor
+from .services.upload_store import UploadTooLarge
+from .ai.inference_client import InferenceServerError
+from .models import ProcessingJobs
 
 CSV_FIELDS = [
     "text",
@@ -16,59 +28,226 @@ CSV_FIELDS = [
     "classification_user",
 ]
 
-REQ_CLASSIFIER = RequirementsClassifier(
-    phi4_model_path="microsoft/phi-4-mini-instruct",
-    multitask_model_name="distilbert-base-uncased",
-    multitask_bin_path=str(settings.BASE_DIR / "requirements_classifier" / "distilbert" / "multitask_distilbert.bin"),
-    multitask_tokenizer_path=str(settings.BASE_DIR / "requirements_classifier" / "distilbert")
-)
+# With INFERENCE_SERVER set, the models run in the inference server process instead of this one
+REQ_CLASSIFIER = build_classifier_from_settings(settings.INFERENCE_SERVER)
 
 PDF_HELPER = PDFUtils()
 
+RESULT_CACHE = ResultCache(settings.RESULT_CACHE_DIR, settings.RESULT_CACHE_MAX_BYTES)
+
+JOB_RUNNER = JobRunner(
+    REQ_CLASSIFIER,
+    RESULT_CACHE,
+    max_workers=settings.JOB_WORKERS,
+    progress_seconds=settings.JOB_PROGRESS_SECONDS,
+    heartbeat_seconds=settings.JOB_HEARTBEAT_SECONDS,
+    stale_seconds=settings.JOB_STALE_SECONDS
+)
+
+# Runs the model work of the async views
+MODEL_EXECUTOR = ModelExecutor(settings.MODEL_EXECUTOR_WORKERS, settings.MODEL_EXECUTOR_MAX_PENDING)
+
 def index(request):
-    return render(request, "index.html")
+    return render(request, "index.html", {"stream_results": settings.STREAM_RESULTS})
 
 @csrf_exempt
-def process_pdf(request):
+@instrument_view("process_pdf")
+async def process_pdf(request):
     if request.method != "POST":
         return JsonResponse({"error": "Invalid request method"})
     
-    pdf_file = request.FILES.get("pdf_file")
+    pdf_file = await sync_to_async(_uploaded_pdf, thread_sensitive=False)(request)
     if not pdf_file:
         return JsonResponse({"error": "No PDF file provided"})
     
-    pdf_path = PDF_HELPER.save_pdf(pdf_file)
-    final_results = REQ_CLASSIFIER.process_pdf(pdf_path)
+    try:
+        pdf_path = await sync_to_async(PDF_HELPER.save_pdf, thread_sensitive=False)(pdf_file)
+    except UploadTooLarge as e:
+        return JsonResponse({"error": str(e)}, status=413)
+    try:
+        cache_key, analysis = await sync_to_async(_cached_analysis, thread_sensitive=False)(request, pdf_path)
+    except InferenceServerError as e:
+        return JsonResponse({"error": str(e)}, status=503)
+    cached = analysis is not None
+
+    if not cached:
+        try:
+            analysis = await MODEL_EXECUTOR.run(REQ_CLASSIFIER.analyze_pdf, pdf_path)
+        except (ExecutorBusy, InferenceServerError) as e:
+            return JsonResponse({"error": str(e)}, status=503)
+        await sync_to_async(RESULT_CACHE.set, thread_sensitive=False)(cache_key, analysis)
 
     return JsonResponse({
-        "results": final_results,
-        "pdf_path": pdf_path
+        "results": analysis["results"],
+        "pdf_path": pdf_path,
+        "cache_key": cache_key,
+        "cached": cached
     }, content_type="application/json")
 
 @csrf_exempt
-def save_requirements(request):
+@instrument_view("process_pdf_stream")
+async def process_pdf_stream(request):
+    """
+    Streams the results of a PDF as NDJSON, one line per processed page, between a
+    'start' line (with the number of pages) and a 'done' or 'error' line.
+    Under ASGI each step (text extraction, then every page) runs on the model executor,
+    and its line is sent as soon as it is done, with 'heartbeat' lines in between while a page takes long.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "Invalid request method"}, status=400)
+
+    pdf_file = await sync_to_async(_uploaded_pdf, thread_sensitive=False)(request)
+    if not pdf_file:
+        return JsonResponse({"error": "No PDF file provided"}, status=400)
+
+    try:
+        pdf_path = await sync_to_async(PDF_HELPER.save_pdf, thread_sensitive=False)(pdf_file)
+    except UploadTooLarge as e:
+        return JsonResponse({"error": str(e)}, status=413)
+    try:
+        cache_key, analysis = await sync_to_async(_cached_analysis, thread_sensitive=False)(request, pdf_path)
+    except InferenceServerError as e:
+        return JsonResponse({"error": str(e)}, status=503)
+
+    if analysis is not None:
+        events = _cached_page_events(pdf_path, cache_key, analysis)
+    else:
+        events = _page_events(pdf_path, cache_key)
+
+    if isinstance(request, ASGIRequest):
+        try:
+            # The start event extracts the text: a busy server answers 503 before streaming anything
+            start = await MODEL_EXECUTOR.run(next, events)
+        except ExecutorBusy as e:
+            events.close()
+            return JsonResponse({"error": str(e)}, status=503)
+        content = _ndjson_lines(start, MODEL_EXECUTOR.iterate(events), settings.STREAM_HEARTBEAT_SECONDS or None)
+    else:
+        # WSGI sends a sync iterator as it goes (an async one would be collected whole first)
+        content = (json.dumps(event) + "\n" for event in events)
+
+    response = StreamingHttpResponse(content, content_type="application/x-ndjson")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+@csrf_exempt
+@instrument_view("start_pdf_job")
+def start_pdf_job(request):
+    if request.method != "POST":
+        return JsonResponse({"error": "Invalid request method"}, status=400)
+
+    pdf_file = request.FILES.get("pdf_file")
+    if not pdf_file:
+        return JsonResponse({"error": "No PDF file provided"}, status=400)
+
+    try:
+        pdf_path = PDF_HELPER.save_pdf(pdf_file)
+    except UploadTooLarge as e:
+        return JsonResponse({"error": str(e)}, status=413)
+    try:
+        cache_key, analysis = _cached_analysis(request, pdf_path)
+    except InferenceServerError as e:
+        return JsonResponse({"error": str(e)}, status=503)
+
+    if analysis is not None:
+        job = ProcessingJobs.objects.create(
+            pdf_path=pdf_path,
+            cache_key=cache_key,
+            status=ProcessingJobs.STATUS_DONE,
+            total_pages=len(analysis["generations"]),
+            processed_pages=len(analysis["generations"]),
+            results=analysis["results"]
+        )
+    else:
+        job = JOB_RUNNER.submit(pdf_path, cache_key)
+
+    return JsonResponse({
+        "job_id": str(job.id),
+        "pdf_path": pdf_path,
+        "cached": analysis is not None
+    }, status=202)
+
+@require_GET
+@instrument_view("pdf_job_status")
+def pdf_job_status(request, job_id):
+    JOB_RUNNER.recover()
+    try:
+        job = ProcessingJobs.objects.get(id=job_id)
+    except ProcessingJobs.DoesNotExist:
+        return JsonResponse({"error": "Job not found"}, status=404)
+
+    if JOB_RUNNER.is_stale(job):
+        # Its worker is gone (e.g. the server restarted): report it as failed instead of pending forever
+        JOB_RUNNER.fail_stale_jobs()
+        job.refresh_from_db()
+
+    try:
+        offset = max(int(request.GET.get("offset", 0)), 0)
+    except ValueError:
+        return JsonResponse({"error": "Invalid offset"}, status=400)
+
+    return JsonResponse(job_status(job, offset))
+
+@csrf_exempt
+@instrument_view("invalidate_cached_result")
+def invalidate_cached_result(request):
+    if request.method != "POST":
+        return JsonResponse({"error": "Invalid request method"}, status=400)
+
+    try:
+        data = json.loads(request.body)
+        cache_key = data.get("cache_key")
+        if not cache_key:
+            return JsonResponse({"error": "Missing cache key"}, status=400)
+
+        removed = RESULT_CACHE.invalidate(cache_key)
+        return JsonResponse({"removed": removed})
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+@csrf_exempt
+@instrument_view("save_requirements")
+async def save_requirements(request):
     if request.method != "POST":
         return JsonResponse({"error": "Invalid request Method"}, status=400)
     
-    data = json.loads(request.body)
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({"error": "Invalid JSON body"}, status=400)
     pdf_path = data.get("pdf_path")
     requirements = data.get("requirements")
 
     if not pdf_path or not requirements:
         return JsonResponse({"error": "Missing PDF path or requirements"}, status=400)
+
+    mode = data.get("mode", settings.REQUIREMENTS_SAVE_MODE)
+    if mode not in SAVE_MODES:
+        return JsonResponse({"error": f"Invalid save mode. Expected one of: {', '.join(SAVE_MODES)}"}, status=400)
+
+    try:
+        pdf_path = await sync_to_async(PDF_HELPER.upload_store.resolve, thread_sensitive=False)(pdf_path)
+    except FileNotFoundError as e:
+        return JsonResponse({"error": str(e)}, status=404)
     
-    save_requirements_to_db(requirements)
+    created, updated = await sync_to_async(save_requirements_to_db)(
+        requirements, batch_size=settings.REQUIREMENTS_SAVE_BATCH_SIZE, mode=mode
+    )
 
     grouped_by_page = PDF_HELPER.group_requirements_by_page(requirements)
-    highlighted_url = PDF_HELPER.highligh_pdf(pdf_path, grouped_by_page)
+    highlighted_url = await sync_to_async(PDF_HELPER.highligh_pdf, thread_sensitive=False)(pdf_path, grouped_by_page)
 
     return JsonResponse({
         "message": "Requirements saved successfully",
+        "created": created,
+        "updated": updated,
         "highlighted_pdf_url": highlighted_url
     })
 
 @csrf_exempt
-def export_csv(request):
+@instrument_view("export_csv")
+async def export_csv(request):
     if request.method != "POST":
         return JsonResponse({"error": "Invalid request method"}, status=400)
     
@@ -77,13 +256,7 @@ def export_csv(request):
         reqs = payload.get("requirements", [])
         base_filename = (payload.get("filename") or "requirements").replace('"', '')
 
-        buf = io.StringIO()
-        writer = csv.DictWriter(buf, fieldnames=CSV_FIELDS)
-        writer.writeheader()
-        for req in reqs:
-            writer.writerow({k: req.get(k, "") for k in CSV_FIELDS})
-
-        data = ("\ufeff" + buf.getvalue()).encode('utf-8')
+        data = await sync_to_async(_requirements_csv, thread_sensitive=False)(reqs)
         ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
 
         resp = HttpResponse(data, content_type='text/csv')
@@ -93,7 +266,8 @@ def export_csv(request):
         return JsonResponse({"error": str(e)}, status=400)
     
 @csrf_exempt
-def classify_manual_requirement(request):
+@instrument_view("classify_manual_requirement")
+async def classify_manual_requirement(request):
     try:
         data = json.loads(request.body)
         sentence = data.get("text")
@@ -103,8 +277,142 @@ def classify_manual_requirement(request):
             return JsonResponse({"error":"Missing requirement text"}, status = 400)
         if not pdf_path:
             return JsonResponse({"error": "Missing PDF path."}, status = 400)
+        pdf_path = await sync_to_async(PDF_HELPER.upload_store.resolve, thread_sensitive=False)(pdf_path)
         
-        result = REQ_CLASSIFIER.process_manual_requirement(sentence, pdf_path)
+        result = await MODEL_EXECUTOR.run(REQ_CLASSIFIER.process_manual_requirement, sentence, pdf_path)
         return JsonResponse(result)
+    except FileNotFoundError as e:
+        return JsonResponse({"error": str(e)}, status=404)
+    except ExecutorBusy as e:
+        return JsonResponse({"error": str(e)}, status=503)
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
+
+@require_GET
+@instrument_view("list_saved_requirements")
+def list_saved_requirements(request):
+    try:
+        return JsonResponse(list_requirements(request.GET))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+@require_GET
+@instrument_view("requirements_stats")
+def requirements_stats(request):
+    try:
+        return JsonResponse({"results": aggregate_requirements(request.GET)})
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+@require_GET
+@instrument_view("export_requirements")
+def export_requirements(request):
+    """
+    Streams the saved requirements (filtered like /requirements/, e.g. by project) as csv, jsonl or parquet.
+    Under ASGI the export is sent as an async iterator, so it isn't collected whole before being sent.
+    """
+    export_format = request.GET.get("format", "csv")
+    try:
+        check_export_format(export_format)
+        rows = iter_export_rows(request.GET, chunk_size=settings.EXPORT_CHUNK_SIZE)
+        content = stream_export(rows, export_format, batch_size=settings.EXPORT_CHUNK_SIZE)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    except RuntimeError as e:
+        return JsonResponse({"error": str(e)}, status=501)
+
+    content_type, extension = EXPORT_FORMATS[export_format]
+    base_filename = (request.GET.get("project") or "requirements").replace('"', '')
+    ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    if isinstance(request, ASGIRequest):
+        content = iterate_in_thread(content)
+
+    resp = StreamingHttpResponse(content, content_type=content_type)
+    resp['Content-Disposition'] = f'attachment; filename="{base_filename}_{ts}.{extension}"'
+    return resp
+
+@require_GET
+def metrics(request):
+    return HttpResponse(METRICS.render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+def _uploaded_pdf(request):
+    # Reading request.FILES parses the multipart body, which may spill large uploads to disk
+    return request.FILES.get("pdf_file")
+
+def _requirements_csv(reqs):
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+    for req in reqs:
+        writer.writerow({k: req.get(k, "") for k in CSV_FIELDS})
+
+    return ("\ufeff" + buf.getvalue()).encode('utf-8')
+
+async def _ndjson_lines(first_event, events, heartbeat_seconds=None):
+    """
+    NDJSON lines of the stream events. While the next event takes longer than 'heartbeat_seconds'
+    (a page being generated), a heartbeat line is sent every 'heartbeat_seconds', so proxies
+    don't close the connection as idle.
+    """
+    yield json.dumps(first_event) + "\n"
+    step = None
+    try:
+        while True:
+            if step is None:
+                step = asyncio.ensure_future(events.__anext__())
+            done, _ = await asyncio.wait({step}, timeout=heartbeat_seconds)
+            if not done:
+                yield json.dumps({"type": "heartbeat"}) + "\n"
+                continue
+            try:
+                event = step.result()
+            except StopAsyncIteration:
+                step = None
+                return
+            step = None
+            yield json.dumps(event) + "\n"
+    finally:
+        if step is not None:
+            # The client left while a page was running: cancelling the step also closes 'events'
+            step.cancel()
+        else:
+            await events.aclose()
+
+def _cached_analysis(request, pdf_path):
+    """
+    Returns the cache key of the uploaded PDF and its cached analysis, if any.
+    Sending refresh=1 bypasses the cache.
+    """
+    refresh = request.POST.get("refresh", "").lower() in ("1", "true")
+    cache_key = RESULT_CACHE.make_key(
+        pdf_path, REQ_CLASSIFIER.cache_identity(), content_hash=PDF_HELPER.upload_store.content_hash(pdf_path)
+    )
+    analysis = None if refresh else RESULT_CACHE.get(cache_key)
+    return cache_key, analysis
+
+def _page_events(pdf_path, cache_key):
+    page_texts = REQ_CLASSIFIER.pdf_utils.extract_text(pdf_path)
+    chunks = REQ_CLASSIFIER.schedule_pages(page_texts)
+    yield {"type": "start", "pdf_path": pdf_path, "total_pages": len(chunks), "cached": False}
+
+    analysis = {"page_texts": page_texts, "generations": [], "results": []}
+    try:
+        for page in REQ_CLASSIFIER.iter_pdf(pdf_path, page_texts, chunks):
+            append_page(analysis, page)
+            yield {"type": "page", "page": page["page"], "results": page["results"]}
+    except Exception as e:
+        yield {"type": "error", "error": str(e)}
+        return
+
+    RESULT_CACHE.set(cache_key, analysis)
+    yield {"type": "done", "cache_key": cache_key}
+
+def _cached_page_events(pdf_path, cache_key, analysis):
+    generations = analysis["generations"]
+    yield {"type": "start", "pdf_path": pdf_path, "total_pages": len(generations), "cached": True}
+
+    for generation, results in page_results(analysis):
+        yield {"type": "page", "page": generation["page"], "results": results}
+
+    yield {"type": "done", "cache_key": cache_key}